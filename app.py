@@ -4,6 +4,9 @@ from config import Config
 from routes.main_routes import main_bp
 from routes.env_routes import env_bp
 from routes.file_routes import file_bp
+from services.encoder_registry import registry as encoder_registry
+from services.workspace import sweep_stale_workspaces
+from services.render_pool import start_pool
 import os
 
 # Muat environment variables
@@ -25,6 +28,16 @@ def create_app(config_class=Config):
     app.register_blueprint(env_bp)
     app.register_blueprint(file_bp)
 
+    # Probe encoder ffmpeg sekali saat startup; hasilnya di-cache untuk semua render
+    encoder_registry.probe()
+
+    # Bersihkan workspace render yang ditinggalkan proses yang crash
+    sweep_stale_workspaces()
+
+    # Worker render hangat (opsional): job tidak lagi menanggung biaya import/probe
+    if app.config['RENDER_POOL_SIZE'] > 0:
+        start_pool()
+
     return app
 
 app = create_app()
@@ -0,0 +1,272 @@
+"""Benchmark render video_service yang bisa diulang dan dibandingkan antar commit.
+
+Setiap kasus dijalankan di proses terpisah dengan cache gambar/segmen
+kosong, sehingga wall time dan puncak RSS tidak dipengaruhi kasus lain.
+Gambar sintetis dan audio hening dibuat dari seed tetap.
+
+Exit code 1 jika ada kasus yang gagal, atau (dengan --compare) jika wall
+time / puncak RSS naik lebih dari --max-regression persen. Puncak RSS
+timeline lazy dari N ke 4N gambar diuji di tests/test_timeline_memory.py.
+
+Contoh:
+    python benchmark.py --images 20,80 --seconds-per-image 0.5 --output bench.json
+    python benchmark.py --compare bench_lama.json bench.json
+"""
+import os
+import sys
+import json
+import time
+import wave
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+# Nama kasus -> (fungsi render, effects_config aktif, render_options)
+CASES = {
+    'effects': ('create_video_with_effects', True, {}),
+    'no_effects': ('create_video_with_effects', False, {}),
+    'effects_stream': ('create_video_with_effects', True, {'writer': 'stream'}),
+    # Tanpa fast path segmen diam agar seluruh timeline lewat timeline lazy MoviePy
+    'effects_lazy': ('create_video_with_effects', True, {'lazy_timeline': True, 'still_fast_path': False}),
+    'ffmpeg': ('create_video_with_effects', True, {'backend': 'ffmpeg'}),
+    'segments': ('create_video_with_effects', True, {'backend': 'segments'}),
+    'preview': ('create_video_with_effects', True, 'preview'),
+    'simple': ('create_simple_moviepy_video', False, None),
+    'advanced': ('create_advanced_moviepy_video', True, None),
+}
+
+DEFAULT_CASES = ('effects', 'no_effects', 'effects_lazy', 'ffmpeg', 'segments', 'preview', 'simple', 'advanced')
+
+def make_images(folder, count, size, seed=0):
+    """Gambar JPEG sintetis (gradien + noise) yang sama untuk seed yang sama."""
+    import numpy as np
+    from PIL import Image
+    width, height = size
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    paths = []
+    for i in range(count):
+        tint = rng.integers(0, 256, size=3).astype(np.float32)
+        noise = rng.integers(0, 64, size=(height, width, 3)).astype(np.float32)
+        pixels = np.clip(gradient * 0.6 + tint * 0.3 + noise, 0, 255).astype(np.uint8)
+        path = os.path.join(folder, f"image_{i:04d}.jpg")
+        Image.fromarray(pixels).save(path, quality=85)
+        paths.append(path)
+    return paths
+
+def make_silent_audio(path, duration, sample_rate=44100):
+    """WAV mono hening sepanjang duration detik."""
+    frames = int(round(duration * sample_rate))
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        chunk = b'\x00\x00' * sample_rate
+        for start in range(0, frames, sample_rate):
+            f.writeframes(chunk[:2 * min(sample_rate, frames - start)])
+    return path
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+def run_case(case, images, audio_path, duration, work_dir, fps=30):
+    """Jalankan satu kasus di proses ini (dipanggil oleh proses anak)."""
+    from config import Config
+    # Cache kosong per kasus agar hasil bisa diulang
+    Config.IMAGE_CACHE_FOLDER = os.path.join(work_dir, 'cache', 'frames')
+    Config.SEGMENT_CACHE_FOLDER = os.path.join(work_dir, 'cache', 'segments')
+    from services import video_service
+
+    function_name, effects_enabled, render_options = CASES[case]
+    effects_config = {'enabled': effects_enabled, 'seed': 1234}
+    output_path = os.path.join(work_dir, f"{case}.mp4")
+    if render_options == 'preview':
+        effects_config, render_options = video_service.preview_settings(effects_config, {})
+        fps = render_options['fps']
+
+    start = time.perf_counter()
+    if function_name == 'create_video_with_effects':
+        success, message = video_service.create_video_with_effects(
+            images, audio_path, output_path, duration, False, effects_config, dict(render_options)
+        )
+    elif function_name == 'create_simple_moviepy_video':
+        success, message = video_service.create_simple_moviepy_video(
+            images, audio_path, output_path, duration, work_dir
+        )
+    else:
+        success, message = video_service.create_advanced_moviepy_video(
+            images, audio_path, output_path, duration, effects_config
+        )
+    wall_time = time.perf_counter() - start
+
+    frames = int(round(duration * fps))
+    return {
+        'case': case,
+        'images': len(images),
+        'duration': duration,
+        'success': bool(success),
+        'message': message,
+        'wall_time': round(wall_time, 3),
+        'frames': frames,
+        'fps': round(frames / wall_time, 2) if success and wall_time else None,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'peak_child_rss_mb': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        'output_bytes': os.path.getsize(output_path) if os.path.exists(output_path) else 0,
+    }
+
+def run_isolated(case, images, audio_path, duration, work_dir, timeout):
+    """Jalankan kasus di proses Python baru; return dict hasil."""
+    command = [
+        sys.executable, os.path.abspath(__file__), '--child', case,
+        '--child-audio', audio_path, '--child-duration', str(duration),
+        '--child-work-dir', work_dir, '--child-images', ','.join(images),
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except subprocess.TimeoutExpired:
+        return {'case': case, 'images': len(images), 'success': False, 'message': 'timeout'}
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith('BENCHMARK_RESULT '):
+            return json.loads(line[len('BENCHMARK_RESULT '):])
+    return {'case': case, 'images': len(images), 'success': False,
+            'message': (result.stderr or result.stdout).strip()[-500:]}
+
+def compare(baseline_path, current_path, max_regression=10.0):
+    """Cetak perubahan wall time, fps, RSS dan ukuran output antar dua file hasil.
+
+    Return daftar masalah: kasus yang gagal di hasil terbaru, dan wall time
+    atau puncak RSS yang naik lebih dari max_regression persen.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r['case'], r['images']): r for r in json.load(f)['results']}
+    with open(current_path) as f:
+        current = json.load(f)['results']
+
+    problems = []
+    print(f"{'case':<16}{'images':>7}{'wall':>10}{'fps':>10}{'rss':>10}{'size':>10}")
+    for result in current:
+        label = f"{result['case']} ({result['images']} images)"
+        old = baseline.get((result['case'], result['images']))
+        if not result.get('success'):
+            print(f"{result['case']:<16}{result['images']:>7}  GAGAL: {result.get('message')}")
+            problems.append(f"{label} gagal: {result.get('message')}")
+            continue
+        if not old or not old.get('success'):
+            print(f"{result['case']:<16}{result['images']:>7}  (tidak ada pembanding)")
+            continue
+        deltas = dict(
+            (key, (result[key] - old[key]) / old[key] * 100 if old[key] else 0.0)
+            for key in ('wall_time', 'fps', 'peak_rss_mb', 'output_bytes')
+        )
+        print(f"{result['case']:<16}{result['images']:>7}" + ''.join(f"{delta:>+9.1f}%" for delta in deltas.values()))
+        for key in ('wall_time', 'peak_rss_mb'):
+            if deltas[key] > max_regression:
+                problems.append(f"{label}: {key} naik {deltas[key]:+.1f}% (batas {max_regression:.0f}%)")
+    return problems
+
+def report_problems(problems):
+    """Cetak masalah ke stderr; return exit code (1 jika ada masalah)."""
+    for problem in problems:
+        print(f"FAIL: {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', default=','.join(DEFAULT_CASES),
+                        help=f"Kasus yang dijalankan, pisahkan dengan koma. Tersedia: {', '.join(CASES)}")
+    parser.add_argument('--images', default='10', help="Jumlah gambar, boleh beberapa (mis. 20,80)")
+    parser.add_argument('--seconds-per-image', type=float, default=1.0)
+    parser.add_argument('--image-size', default='1920x1080', help="Ukuran gambar sintetis (LxT)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=int, default=1800, help="Batas waktu per kasus (detik)")
+    parser.add_argument('--output', help="Tulis hasil JSON ke file (default stdout)")
+    parser.add_argument('--keep', action='store_true', help="Jangan hapus folder kerja")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="Bandingkan dua file hasil lalu keluar (exit 1 jika gagal/regresi)")
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help="Kenaikan wall time / puncak RSS (persen) yang dianggap regresi saat --compare")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--child-images', help=argparse.SUPPRESS)
+    parser.add_argument('--child-audio', help=argparse.SUPPRESS)
+    parser.add_argument('--child-duration', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--child-work-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_case(args.child, args.child_images.split(','), args.child_audio,
+                          args.child_duration, args.child_work_dir)
+        print('BENCHMARK_RESULT ' + json.dumps(result))
+        return 0
+
+    if args.compare:
+        return report_problems(compare(*args.compare, max_regression=args.max_regression))
+
+    cases = [case.strip() for case in args.cases.split(',') if case.strip()]
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"Kasus tidak dikenal: {', '.join(unknown)}")
+    image_size = tuple(int(value) for value in args.image_size.lower().split('x'))
+
+    root = tempfile.mkdtemp(prefix='video_benchmark_')
+    results = []
+    try:
+        for count in (int(value) for value in args.images.split(',')):
+            inputs = os.path.join(root, f"inputs_{count}")
+            os.makedirs(inputs)
+            images = make_images(inputs, count, image_size, args.seed)
+            duration = round(count * args.seconds_per_image, 3)
+            audio_path = make_silent_audio(os.path.join(inputs, 'silence.wav'), duration)
+
+            for case in cases:
+                work_dir = os.path.join(root, f"{case}_{count}")
+                os.makedirs(work_dir)
+                print(f"Benchmark {case} ({count} images, {duration:.1f}s)...", file=sys.stderr)
+                result = run_isolated(case, images, audio_path, duration, work_dir, args.timeout)
+                print(f"  -> {result.get('wall_time', '-')}s, {result.get('fps', '-')} fps, "
+                      f"RSS {result.get('peak_rss_mb', '-')} MB, {result['message']}", file=sys.stderr)
+                results.append(result)
+                if not args.keep:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+    finally:
+        if args.keep:
+            print(f"Work folder kept: {root}", file=sys.stderr)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': {
+            'images': args.images,
+            'seconds_per_image': args.seconds_per_image,
+            'image_size': args.image_size,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    return report_problems([
+        f"{result['case']} ({result['images']} images) gagal: {result.get('message')}"
+        for result in results if not result.get('success')
+    ])
+
+if __name__ == '__main__':
+    sys.exit(main())
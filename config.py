@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
@@ -11,4 +12,50 @@ class Config:
     PROMPT_FILE_PATH = os.path.join('data', 'prompts.json')
     
     # Simple API Key Storage
-    API_KEYS_FILE = os.path.join('data', 'api_keys.txt')
\ No newline at end of file
+    API_KEYS_FILE = os.path.join('data', 'api_keys.txt')
+    
+    # Cache frame gambar ternormalisasi (1280x720) yang dipakai ulang antar render
+    IMAGE_CACHE_FOLDER = os.path.join('data', 'cache', 'frames')
+    IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_MB', 2048)) * 1024 * 1024
+    
+    # Cache segmen video yang sudah di-encode, dipakai ulang saat render ulang job
+    SEGMENT_CACHE_FOLDER = os.path.join('data', 'cache', 'segments')
+    SEGMENT_CACHE_MAX_BYTES = int(os.environ.get('SEGMENT_CACHE_MAX_MB', 4096)) * 1024 * 1024
+    
+    # Timeline lazy untuk narasi panjang: klip gambar dibuat tepat sebelum
+    # dipakai dan dilepas sesudahnya, dengan batas keras RSS per render
+    LAZY_TIMELINE_MIN_IMAGES = int(os.environ.get('LAZY_TIMELINE_MIN_IMAGES', 40))
+    LAZY_TIMELINE_LIVE_CLIPS = int(os.environ.get('LAZY_TIMELINE_LIVE_CLIPS', 3))
+    RENDER_MEMORY_LIMIT_BYTES = int(os.environ.get('RENDER_MEMORY_LIMIT_MB', 2048)) * 1024 * 1024
+    
+    # Folder scratch per job render (audio sementara, segmen, potongan video).
+    # Arahkan ke tmpfs (mis. /dev/shm/video_scratch) agar intermediate tidak
+    # menyentuh disk; batas 0 = tanpa kuota per job
+    SCRATCH_FOLDER = os.environ.get('RENDER_SCRATCH_DIR') or os.path.join(tempfile.gettempdir(), 'video_scratch')
+    SCRATCH_MAX_BYTES = int(os.environ.get('RENDER_SCRATCH_MAX_MB', 0)) * 1024 * 1024
+    
+    # Tonton sambil render: job ditulis sebagai MP4 terfragmentasi di folder ini
+    # dan disajikan hanya lewat /watch/<session_id> selagi encoding berjalan.
+    # Sengaja di luar OUTPUT_FOLDER agar /outputs tidak melewati pemeriksaan session
+    LIVE_RENDER_FOLDER = os.path.join('data', 'live')
+    LIVE_FRAGMENT_SECONDS = float(os.environ.get('LIVE_FRAGMENT_SECONDS', 2))
+    LIVE_IDLE_TIMEOUT = int(os.environ.get('LIVE_IDLE_TIMEOUT', 120))
+    
+    # Pengiriman file /outputs dan /images: 'flask' (default), 'x-accel'
+    # (nginx: X-Accel-Redirect ke lokasi internal X_ACCEL_PREFIX/outputs|images)
+    # atau 'x-sendfile' (Apache mod_xsendfile / lighttpd)
+    FILE_DELIVERY = os.environ.get('FILE_DELIVERY', 'flask').lower()
+    X_ACCEL_PREFIX = os.environ.get('X_ACCEL_PREFIX', '/protected').rstrip('/')
+    USE_X_SENDFILE = FILE_DELIVERY == 'x-sendfile'
+    # Cache browser: video bisa ditimpa (render ulang/finalize) sehingga
+    # default selalu validasi ulang dengan ETag; gambar session jarang berubah
+    OUTPUTS_MAX_AGE = int(os.environ.get('OUTPUTS_MAX_AGE', 0))
+    IMAGES_MAX_AGE = int(os.environ.get('IMAGES_MAX_AGE', 3600))
+    
+    # Pool worker render yang hidup lama (default 2 worker, maksimal jumlah CPU;
+    # 0 = render di proses web). Worker di-fork dari proses yang sudah
+    # meng-import MoviePy/NumPy dan diganti setelah sejumlah job atau jika
+    # RSS-nya melewati batas
+    RENDER_POOL_SIZE = int(os.environ.get('RENDER_POOL_SIZE', min(2, os.cpu_count() or 1)))
+    RENDER_POOL_MAX_JOBS = int(os.environ.get('RENDER_POOL_MAX_JOBS', 20))
+    RENDER_POOL_MAX_RSS_BYTES = int(os.environ.get('RENDER_POOL_MAX_RSS_MB', 1536)) * 1024 * 1024
@@ -119,6 +119,43 @@ def create_zip_archive():
             'error': str(e)
         }), 500
 
+@file_bp.route('/compile', methods=['POST'])
+def create_compilation():
+    """Gabungkan video yang dipilih menjadi satu video kompilasi"""
+    try:
+        data = request.json
+        filenames = data.get('filenames', [])
+        output_name = data.get('output_name')
+        
+        if len(filenames) < 2:
+            return jsonify({
+                'success': False,
+                'error': 'Pilih minimal 2 video untuk kompilasi.'
+            }), 400
+        
+        file_service = FileService(current_app.config['OUTPUT_FOLDER'])
+        success, message, output_filename = file_service.create_compilation(filenames, output_name)
+        
+        if success:
+            return jsonify({
+                'success': True,
+                'message': message,
+                'filename': output_filename,
+                'metadata': file_service.load_metadata().get(output_filename, {}),
+                'download_url': f'/outputs/{output_filename}'
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'error': message
+            }), 500
+            
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @file_bp.route('/cleanup', methods=['POST'])
 def cleanup_old_files():
     """Bersihkan file lama"""
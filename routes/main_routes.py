@@ -1,9 +1,14 @@
-from flask import Blueprint, request, render_template, jsonify, send_from_directory, current_app
+from flask import Blueprint, request, render_template, jsonify, current_app, Response, stream_with_context, redirect
 import os
 import uuid
+import random
 import traceback
-from services import ai_service, video_service, prompt_service
+from services import ai_service, video_service, prompt_service, audio_service, rendition_service, rerender_service, live_render, render_pool
+from services.render_plan import RenderPlan, plan_path
+from services.encoder_registry import registry as encoder_registry
 from services.file_service import FileService
+from services.delivery import send_media
+from services.pipeline_render import PipelinedRender
 
 main_bp = Blueprint('main', __name__)
 
@@ -70,8 +75,21 @@ def save_api_key():
             'message': f'Error saving API key: {str(e)}'
         }), 500
 
+def _session_is_new(session_id):
+    """True jika belum ada gambar, video atau metadata untuk session_id ini."""
+    output_folder = current_app.config['OUTPUT_FOLDER']
+    if os.path.exists(os.path.join(current_app.config['IMAGES_FOLDER'], session_id)):
+        return False
+    filenames = [f"{kind}_{session_id}.mp4" for kind in ('video', 'preview')]
+    if any(os.path.exists(os.path.join(output_folder, filename)) for filename in filenames):
+        return False
+    metadata = FileService(output_folder).load_metadata()
+    return not any(filename in metadata for filename in filenames)
+
 @main_bp.route('/generate', methods=['POST'])
 def generate_video_route():
+    live_session_id = None
+    pipeline = None
     try:
         print("🎬 Starting video generation process with QUEUE SYSTEM...")
         
@@ -82,25 +100,52 @@ def generate_video_route():
         image_model = request.form.get('image_model', 'flux')
         gemini_model = request.form.get('gemini_model', 'gemini-2.0-flash')
         processing_mode = 'enhanced' if 'processing_mode' in request.form else 'normal'
+        batch_prompts = 'batch_prompts' in request.form
         images_per_paragraph = int(request.form.get('images_per_paragraph', 3))
         use_gpu = 'gpu_enabled' in request.form
+        render_options = {
+            'backend': request.form.get('render_backend', 'moviepy'),
+            'writer': ('shared' if 'shared_frames' in request.form
+                       else 'stream' if 'stream_writer' in request.form else 'moviepy')
+        }
+        # Tangga rendition: efek dihitung sekali di resolusi tertinggi
+        rendition_ladder = rendition_service.parse_ladder(request.form.getlist('renditions'))
+        hls_output = 'hls_output' in request.form
+        render_options['size'] = rendition_service.master_size(rendition_ladder)
         image_delay = int(request.form.get('image_generation_delay', 6))
         effects_config = {
             'enabled': 'effects_enabled' in request.form,
             'zoom_in': int(request.form.get('zoom_in_prob', 20)),
             'zoom_out': int(request.form.get('zoom_out_prob', 20)),
             'still': int(request.form.get('still_prob', 40)),
-            'fade_transition': int(request.form.get('fade_transition_prob', 20))
+            'fade_transition': int(request.form.get('fade_transition_prob', 20)),
+            'zoom_quality': request.form.get('zoom_quality', 'balanced')
         }
+        # Seed per job: input yang sama + seed yang sama = video yang sama
+        effect_seed = request.form.get('effect_seed', '').strip()
+        effects_config['seed'] = int(effect_seed) if effect_seed.isdigit() else random.randint(0, 2**31 - 1)
+
+        # Mode preview: render murah untuk cek urutan & tempo; final dibuat lewat /finalize
+        preview_mode = 'preview_mode' in request.form
+        final_zoom_quality = effects_config['zoom_quality']
+        if preview_mode:
+            rendition_ladder, hls_output = [], False
+            effects_config, render_options = video_service.preview_settings(effects_config, render_options)
 
         print(f"📋 Configuration:")
         print(f"   - Image model: {image_model}")
         print(f"   - Gemini model: {gemini_model}")
         print(f"   - Processing mode: {processing_mode}")
+        print(f"   - Batched prompts: {batch_prompts}")
         print(f"   - Images per paragraph: {images_per_paragraph}")
         print(f"   - Image delay: {image_delay}s")
-        print(f"   - Effects enabled: {effects_config['enabled']}")
+        print(f"   - Effects enabled: {effects_config['enabled']} (seed {effects_config['seed']})")
         print(f"   - GPU enabled: {use_gpu}")
+        print(f"   - Render backend: {render_options['backend']}{' (PREVIEW)' if preview_mode else ''}")
+        # Encoder dipilih sekali dari hasil probe (tanpa percobaan render penuh)
+        encoder_decision = encoder_registry.choose(use_gpu)
+        print(f"   - Video encoder: {encoder_decision['encoder']} ({encoder_decision['reason']})")
+        print(f"   - Renditions: {', '.join(rendition_ladder) or '-'}{' (HLS)' if hls_output else ''}")
 
         if not narration_file or not audio_file or not prompt_id:
             return jsonify({'error': 'File narasi, audio, dan template prompt harus dipilih.'}), 400
@@ -113,7 +158,19 @@ def generate_video_route():
             print("🔄 Will use fallback prompt generation if needed")
 
         # 3. Simpan file & dapatkan durasi audio
-        session_id = str(uuid.uuid4())
+        # Session ID selalu dari server; untuk mode live ID diambil lebih dulu lewat
+        # /watch/session agar /watch/<session_id> bisa dibuka selagi request berjalan
+        requested_id = request.form.get('session_id', '').strip()
+        if requested_id:
+            if not _session_is_new(requested_id) or not live_render.claim(requested_id):
+                return jsonify({'error': 'Session ID tidak valid atau sudah dipakai.'}), 400
+            session_id = requested_id
+        else:
+            session_id = str(uuid.uuid4())
+            if 'watch_live' in request.form:
+                live_render.register(session_id)
+        if 'watch_live' in request.form:
+            live_session_id = session_id
         narration_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{session_id}_narration.txt")
         audio_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{session_id}_{audio_file.filename}")
         
@@ -132,11 +189,18 @@ def generate_video_route():
         
         print(f"📝 Narration length: {len(narration_text)} characters")
         
-        audio_duration = video_service.get_audio_duration(audio_path)
+        # Probe header audio sekali; hasilnya di-cache dan dipakai lagi oleh renderer
+        try:
+            audio_info = audio_service.get_audio_info(audio_path)
+        except Exception as e:
+            print(f"Error probing audio: {e}")
+            audio_info = {}
+        audio_duration = audio_info.get('duration')
         if audio_duration is None:
             return jsonify({'error': 'Gagal membaca durasi audio.'}), 500
 
         print(f"🎵 Audio duration: {audio_duration:.2f} seconds ({audio_duration/60:.1f} minutes)")
+        print(f"🎵 Audio format: {audio_info.get('codec')}, {audio_info.get('sample_rate')} Hz, {audio_info.get('channels')} channel(s)")
 
         # 4. Dapatkan prompt gaya dari template yang dipilih
         style_prompt = prompt_service.get_prompt_by_id(prompt_id)
@@ -155,6 +219,16 @@ def generate_video_route():
         print(f"🚀 Starting QUEUE SYSTEM for prompt generation and image download...")
         print(f"⏱️ This will process one prompt at a time to avoid rate limits")
         
+        # Render sambil unduh: jumlah gambar & durasi audio sudah diketahui, jadi
+        # segmen gambar N dirender begitu gambar N tersimpan (output live perlu satu proses ffmpeg)
+        if 'overlap_render' in request.form and not live_session_id:
+            expected_count = len(ai_service.prepare_text_segments(narration_text, processing_mode, images_per_paragraph))
+            if expected_count:
+                pipeline = PipelinedRender(
+                    [ai_service.queue_image_path(permanent_image_folder, i) for i in range(expected_count)],
+                    audio_path, audio_duration, effects_config, render_options, use_gpu
+                )
+        
         image_paths = ai_service.generate_prompts_with_queue_system(
             narration_text, 
             processing_mode, 
@@ -163,7 +237,9 @@ def generate_video_route():
             style_prompt,
             permanent_image_folder,
             image_model,
-            image_delay
+            image_delay,
+            on_image=pipeline.image_ready if pipeline else None,
+            batch_prompts=batch_prompts
         )
         
         if not image_paths:
@@ -173,7 +249,7 @@ def generate_video_route():
         print(f"✅ Total images generated: {len(image_paths)}")
 
         # 7. Buat video dengan MoviePy
-        output_filename = f"video_{session_id}.mp4"
+        output_filename = f"{'preview' if preview_mode else 'video'}_{session_id}.mp4"
         output_path = os.path.join(current_app.config['OUTPUT_FOLDER'], output_filename)
         
         print(f"🎬 Creating video with MoviePy: {output_path}")
@@ -182,16 +258,41 @@ def generate_video_route():
         # Pastikan folder output ada
         os.makedirs(current_app.config['OUTPUT_FOLDER'], exist_ok=True)
         
-        success, message = video_service.create_video_with_effects(
-            image_paths, 
-            audio_path, 
-            output_path, 
-            audio_duration,  # Pass audio duration instead of duration per image
-            use_gpu, 
-            effects_config
-        )
+        if pipeline:
+            # Sebagian besar segmen sudah dirender selama unduhan; tinggal sisa + mux
+            success, message = pipeline.finish(output_path)
+            plan = pipeline.plan
+            plan_file = plan.save(plan_path(permanent_image_folder, preview_mode))
+        else:
+            # Plan (gambar, durasi, efek, transisi) disimpan di samping gambar session
+            valid_images = video_service.existing_images(image_paths)
+            if not valid_images:
+                return jsonify({'error': 'Tidak ada gambar yang valid ditemukan.'}), 500
+            plan = video_service.build_render_plan(valid_images, audio_path, audio_duration, effects_config, render_options)
+            plan_file = plan.save(plan_path(permanent_image_folder, preview_mode))
+            print(f"🗂️ Render plan saved: {plan_file}")
+            
+            if live_session_id:
+                # Ditulis sebagai MP4 terfragmentasi, bisa ditonton di /watch/<session_id>
+                render_options['live_path'] = live_render.start(session_id)
+                print(f"📡 Watch while rendering: /watch/{session_id}")
+            success, message = render_pool.render_plan(plan, output_path, use_gpu, render_options)
+            if live_session_id:
+                live_render.finish(session_id, success, f"/outputs/{output_filename}")
+
+        # 8. Turunkan rendition lain dari video master (satu pass ffmpeg)
+        rendition_urls = {}
+        if success and (rendition_ladder or hls_output):
+            rendition_success, rendition_message, rendition_outputs = rendition_service.encode_renditions(
+                output_path, rendition_ladder or ['720p'], render_options['size'], hls=hls_output, use_gpu=use_gpu
+            )
+            print(f"📺 {rendition_message}")
+            output_folder = current_app.config['OUTPUT_FOLDER']
+            for label, path in rendition_outputs.items():
+                relative_path = os.path.relpath(path, output_folder).replace(os.sep, '/')
+                rendition_urls[label] = f"/outputs/{relative_path}"
 
-        # 8. Simpan metadata file
+        # 9. Simpan metadata file
         if success:
             file_service = FileService(current_app.config['OUTPUT_FOLDER'])
             metadata = {
@@ -200,10 +301,24 @@ def generate_video_route():
                 'image_model': image_model,
                 'gemini_model': gemini_model,
                 'processing_mode': processing_mode,
+                'batch_prompts': batch_prompts,
                 'images_per_paragraph': images_per_paragraph,
                 'image_generation_delay': image_delay,
                 'effects_enabled': effects_config['enabled'],
+                'effect_seed': effects_config['seed'],
+                'zoom_quality': effects_config['zoom_quality'],
+                'final_zoom_quality': final_zoom_quality,
+                'preview': preview_mode,
+                'fps': plan.fps,
+                'timeline': plan.segments,
+                'render_plan': plan_file,
                 'gpu_enabled': use_gpu,
+                'render_backend': render_options['backend'],
+                'pipelined_render': pipeline is not None,
+                'video_encoder': encoder_decision['encoder'],
+                'video_encoder_reason': encoder_decision['reason'],
+                'video_size': f"{render_options['size'][0]}x{render_options['size'][1]}",
+                'renditions': rendition_urls,
                 'total_images': len(image_paths),
                 'audio_duration': audio_duration,
                 'narration_length': len(narration_text),
@@ -215,7 +330,7 @@ def generate_video_route():
             file_service.add_file_metadata(output_filename, metadata)
             print("💾 Metadata saved successfully")
 
-        # 9. Bersihkan file sementara (HANYA file upload, BUKAN gambar)
+        # 10. Bersihkan file sementara (HANYA file upload, BUKAN gambar)
         print("🧹 Cleaning up temporary upload files...")
         
         if os.path.exists(narration_path):
@@ -239,9 +354,12 @@ def generate_video_route():
             print(f"🎉 Video generation completed successfully with QUEUE SYSTEM: {output_filename}")
             return jsonify({
                 'video_url': f"/outputs/{output_filename}",
+                'session_id': session_id,
                 'image_folder': permanent_image_folder,
                 'total_images': len(image_paths),
                 'queue_system_used': True,
+                'renditions': rendition_urls,
+                'preview': preview_mode,
                 'gemini_status': gemini_message
             })
         else:
@@ -252,17 +370,224 @@ def generate_video_route():
         print(f"💥 Critical error in video generation:")
         traceback.print_exc()
         return jsonify({'error': f'Terjadi kesalahan server: {str(e)}'}), 500
+    finally:
+        # Penonton live tidak menunggu selamanya jika job berhenti sebelum/selama render
+        if live_session_id:
+            live_render.finish(live_session_id, False)
+        # Worker segmen dan file sementara pipeline dilepas walaupun job berhenti di tengah
+        if pipeline:
+            pipeline.close()
+
+@main_bp.route('/rerender/<session_id>', methods=['POST'])
+def rerender_video_route(session_id):
+    """Ganti/hapus sebagian gambar session lalu render ulang hanya segmen yang berubah.
+
+    Form: file 'image_<indeks>' untuk gambar pengganti, 'remove' berisi
+    indeks gambar yang dihapus (boleh lebih dari satu), 'target' = 'preview'
+    untuk memperbarui video preview alih-alih video final.
+    """
+    try:
+        target = 'preview' if request.form.get('target') == 'preview' else 'video'
+        output_filename = f"{target}_{session_id}.mp4"
+        output_path = os.path.join(current_app.config['OUTPUT_FOLDER'], output_filename)
+        file_service = FileService(current_app.config['OUTPUT_FOLDER'])
+        metadata = file_service.load_metadata().get(output_filename)
+        if not metadata or not os.path.exists(output_path):
+            return jsonify({'error': 'Session atau video tidak ditemukan.'}), 404
+        timeline = metadata.get('timeline')
+        if not timeline:
+            return jsonify({'error': 'Video ini tidak punya data timeline; render ulang penuh diperlukan.'}), 400
+
+        # Validasi semua field dulu agar tidak ada file tersimpan untuk request yang ditolak
+        uploads = {}
+        for field, image_file in request.files.items():
+            if not field.startswith('image_'):
+                continue
+            suffix = field[len('image_'):]
+            if not suffix.isdecimal():
+                return jsonify({'error': f"Nama field '{field}' tidak valid; gunakan image_<indeks>."}), 400
+            index = int(suffix)
+            if not 0 <= index < len(timeline):
+                return jsonify({'error': f'Indeks gambar {index} di luar timeline.'}), 400
+            uploads[index] = image_file
+
+        removals = set()
+        for value in request.form.getlist('remove'):
+            for part in value.split(','):
+                part = part.strip()
+                if not part:
+                    continue
+                if not part.isdecimal():
+                    return jsonify({'error': f"Indeks hapus '{part}' tidak valid."}), 400
+                index = int(part)
+                if index >= len(timeline):
+                    return jsonify({'error': f'Indeks gambar {index} di luar timeline.'}), 400
+                removals.add(index)
+
+        if not uploads and not removals:
+            return jsonify({'error': 'Tidak ada gambar yang diganti atau dihapus.'}), 400
+        if len(removals) >= len(timeline):
+            return jsonify({'error': 'Tidak bisa menghapus semua gambar dari video.'}), 400
+
+        image_folder = os.path.join(current_app.config['IMAGES_FOLDER'], session_id)
+        os.makedirs(image_folder, exist_ok=True)
+        replacements = {}
+        for index, image_file in uploads.items():
+            extension = os.path.splitext(image_file.filename)[1] or '.jpg'
+            image_path = os.path.join(image_folder, f"replaced_{index:03d}_{uuid.uuid4().hex[:8]}{extension}")
+            image_file.save(image_path)
+            replacements[index] = image_path
+
+        print(f"🔁 Incremental re-render {session_id}: replace {sorted(replacements)}, remove {sorted(removals)}")
+        size = tuple(int(value) for value in metadata.get('video_size', '1280x720').split('x'))
+        encode_options = video_service.PREVIEW_RENDER_OPTIONS if metadata.get('preview') else {}
+        success, message, new_timeline = rerender_service.rerender_session(
+            output_path, timeline, replacements, removals,
+            fps=metadata.get('fps', 30),
+            size=size,
+            zoom_quality=metadata.get('zoom_quality', 'balanced'),
+            use_gpu=metadata.get('gpu_enabled', False),
+            preset=encode_options.get('preset', 'medium'),
+            crf=encode_options.get('crf', 23)
+        )
+        if not success:
+            # Video lama tetap dipakai: gambar pengganti yang baru disimpan tidak dirujuk siapa pun
+            for image_path in replacements.values():
+                if os.path.exists(image_path):
+                    os.remove(image_path)
+            return jsonify({'error': message}), 500
+
+        # Rendition lama tidak lagi sesuai: seluruh tangga diturunkan ulang dari video baru
+        # (satu pass ffmpeg; lihat docstring rendition_service soal encode dua kali)
+        renditions = metadata.get('renditions') or {}
+        if renditions:
+            ladder = rendition_service.parse_ladder([label for label in renditions if label != 'master'])
+            rendition_service.encode_renditions(output_path, ladder, size, hls='master' in renditions)
+
+        plan_file = metadata.get('render_plan')
+        if plan_file and os.path.exists(plan_file):
+            plan = RenderPlan.load(plan_file)
+            plan.segments = new_timeline
+            plan.save(plan_file)
+
+        metadata.update({
+            'timeline': new_timeline,
+            'total_images': len(new_timeline),
+            'rerender_count': metadata.get('rerender_count', 0) + 1,
+        })
+        file_service.add_file_metadata(output_filename, metadata)
+
+        return jsonify({
+            'success': True,
+            'message': message,
+            'video_url': f"/outputs/{output_filename}",
+            'total_images': len(new_timeline)
+        })
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': f'Terjadi kesalahan server: {str(e)}'}), 500
+
+@main_bp.route('/finalize/<session_id>', methods=['POST'])
+def finalize_video_route(session_id):
+    """Render video final dari preview: gambar, urutan, efek dan audio yang sama."""
+    try:
+        preview_filename = f"preview_{session_id}.mp4"
+        preview_path = os.path.join(current_app.config['OUTPUT_FOLDER'], preview_filename)
+        file_service = FileService(current_app.config['OUTPUT_FOLDER'])
+        preview_metadata = file_service.load_metadata().get(preview_filename)
+        if not preview_metadata or not os.path.exists(preview_path):
+            return jsonify({'error': 'Preview untuk session ini tidak ditemukan.'}), 404
+
+        preview_plan_file = preview_metadata.get('render_plan')
+        if preview_plan_file and os.path.exists(preview_plan_file):
+            preview_plan = RenderPlan.load(preview_plan_file)
+        else:
+            preview_plan = RenderPlan(
+                preview_metadata['timeline'], fps=preview_metadata.get('fps', 30),
+                audio={'duration': preview_metadata.get('audio_duration')}
+            )
+
+        # Gambar, urutan dan efek sama; fps, ukuran, zoom dan encoder kualitas final.
+        # Audio diambil dari track preview (AAC, stream copy)
+        zoom_quality = preview_metadata.get('final_zoom_quality', 'balanced')
+        final_plan = preview_plan.rescaled(30).copy(
+            size=video_service.DEFAULT_VIDEO_SIZE, zoom_quality=zoom_quality, preset='medium', crf=23,
+            audio=dict(preview_plan.audio, path=preview_path)
+        )
+        use_gpu = preview_metadata.get('gpu_enabled', False)
+        output_filename = f"video_{session_id}.mp4"
+        output_path = os.path.join(current_app.config['OUTPUT_FOLDER'], output_filename)
+
+        print(f"🎬 Finalizing preview {session_id}: {len(final_plan.segments)} images at {final_plan.fps} fps")
+        success, message = render_pool.render_plan(final_plan, output_path, use_gpu, {'backend': 'segments'})
+        if not success:
+            return jsonify({'error': f'Gagal membuat video final: {message}'}), 500
+
+        image_folder = preview_metadata.get('image_folder') or os.path.join(current_app.config['IMAGES_FOLDER'], session_id)
+        plan_file = final_plan.save(plan_path(image_folder))
+
+        metadata = dict(preview_metadata)
+        metadata.update({
+            'preview': False,
+            'fps': final_plan.fps,
+            'zoom_quality': zoom_quality,
+            'timeline': final_plan.segments,
+            'render_plan': plan_file,
+            'render_backend': 'segments',
+            'video_size': '{}x{}'.format(*video_service.DEFAULT_VIDEO_SIZE),
+            'renditions': {},
+            'finalized_from': preview_filename,
+        })
+        file_service.add_file_metadata(output_filename, metadata)
+
+        return jsonify({
+            'success': True,
+            'message': message,
+            'video_url': f"/outputs/{output_filename}"
+        })
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': f'Terjadi kesalahan server: {str(e)}'}), 500
 
-# Rute untuk menyajikan video
-@main_bp.route('/outputs/<filename>')
+# Rute untuk menyajikan video (range request, ETag, opsional X-Accel/X-Sendfile)
+@main_bp.route('/outputs/<path:filename>')
 def serve_video(filename):
-    return send_from_directory(current_app.config['OUTPUT_FOLDER'], filename)
+    return send_media(current_app.config['OUTPUT_FOLDER'], filename, 'outputs', current_app.config['OUTPUTS_MAX_AGE'])
+
+# Session ID untuk mode live dibuat server, lalu dikirim kembali ke /generate (sekali pakai)
+@main_bp.route('/watch/session', methods=['POST'])
+def issue_live_session():
+    job = live_render.issue()
+    return jsonify({'success': True, 'session_id': job.session_id})
+
+# Tonton video selagi dirender (MP4 terfragmentasi yang terus bertambah)
+@main_bp.route('/watch/<session_id>')
+def watch_live_render(session_id):
+    job = live_render.get(session_id)
+    if not job:
+        return jsonify({'error': 'Job live tidak ditemukan.'}), 404
+    if job.status == 'done':
+        return redirect(job.output_url)
+    if job.status == 'failed':
+        return jsonify({'error': 'Render gagal.'}), 410
+    return Response(
+        stream_with_context(live_render.follow(job)),
+        mimetype='video/mp4',
+        headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'}
+    )
+
+@main_bp.route('/watch/<session_id>/status')
+def watch_live_status(session_id):
+    job = live_render.get(session_id)
+    if not job:
+        return jsonify({'error': 'Job live tidak ditemukan.'}), 404
+    return jsonify({'success': True, **job.to_dict()})
 
 # Rute untuk menyajikan gambar dari data/images
 @main_bp.route('/images/<session_id>/<filename>')
 def serve_image(session_id, filename):
-    image_folder = os.path.join(current_app.config['IMAGES_FOLDER'], session_id)
-    return send_from_directory(image_folder, filename)
+    return send_media(current_app.config['IMAGES_FOLDER'], f"{session_id}/{filename}", 'images',
+                      current_app.config['IMAGES_MAX_AGE'])
 
 # --- Rute CRUD untuk Template Prompt ---
 @main_bp.route('/prompts', methods=['GET'])
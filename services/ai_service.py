@@ -2,6 +2,7 @@ import google.generativeai as genai
 import requests
 import re
 import os
+import json
 import uuid
 import time
 from PIL import Image
@@ -18,6 +19,12 @@ AVAILABLE_MODELS = [
     'gemini-1.5-pro'
 ]
 
+# Mode batch: banyak segmen per request Gemini, dibatasi estimasi token input
+BATCH_MAX_INPUT_TOKENS = 3000
+BATCH_MAX_ITEMS = 40  # juga membatasi panjang output (~60 token per prompt)
+BATCH_MAX_RETRIES = 2
+CHARS_PER_TOKEN = 4
+
 # Global API service instance
 api_service = SimpleAPIService()
 
@@ -95,6 +102,15 @@ def save_gemini_api_key(api_key):
     """Simpan API key Gemini"""
     return api_service.save_api_key('GEMINI_API_KEY', api_key)
 
+def clean_prompt_text(text):
+    """Buang penomoran dan prefix "Prompt:" dari prompt hasil Gemini"""
+    clean_prompt = text.strip()
+    # Remove numbering if present
+    clean_prompt = re.sub(r'^\d+\.\s*', '', clean_prompt).strip()
+    # Remove "Prompt:" prefix if present
+    clean_prompt = re.sub(r'^Prompt:\s*', '', clean_prompt, flags=re.IGNORECASE).strip()
+    return clean_prompt
+
 def generate_single_prompt_from_text(text_segment, style_prompt, model_name='gemini-2.0-flash-exp'):
     """Generate single prompt dari satu segmen teks menggunakan Gemini AI"""
     if not text_segment.strip() or not style_prompt:
@@ -132,11 +148,7 @@ def generate_single_prompt_from_text(text_segment, style_prompt, model_name='gem
         try:
             response = model.generate_content(f"{system_prompt}\n\n{user_prompt}")
             if response and response.text:
-                clean_prompt = response.text.strip()
-                # Remove numbering if present
-                clean_prompt = re.sub(r'^\d+\.\s*', '', clean_prompt).strip()
-                # Remove "Prompt:" prefix if present
-                clean_prompt = re.sub(r'^Prompt:\s*', '', clean_prompt, flags=re.IGNORECASE).strip()
+                clean_prompt = clean_prompt_text(response.text)
                 print(f"✓ Generated prompt: {clean_prompt[:50]}...")
                 return clean_prompt
             else:
@@ -153,21 +165,119 @@ def generate_single_prompt_from_text(text_segment, style_prompt, model_name='gem
         print(f"💥 Critical error with Gemini API: {e}")
         return f"{text_segment.strip()}, {style_prompt}"
 
-def generate_prompts_with_queue_system(narration, mode, model_name, images_per_paragraph, style_prompt, image_folder, image_model, image_delay=6):
+def estimate_tokens(text):
+    """Perkiraan kasar jumlah token (tanpa request count_tokens ke API)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def chunk_segments_by_tokens(indexed_segments, max_tokens=BATCH_MAX_INPUT_TOKENS, max_items=BATCH_MAX_ITEMS):
+    """Kelompokkan [(index, teks)] menjadi batch yang muat dalam budget token input"""
+    batches, current, used = [], [], 0
+    for index, text in indexed_segments:
+        # +10 token untuk pembungkus JSON {"id": .., "text": ..}
+        cost = estimate_tokens(text) + 10
+        if current and (used + cost > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append((index, text))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_response(text, expected_ids):
     """
-    Generate prompts dan download images menggunakan sistem antrian
-    Satu prompt -> satu gambar -> prompt berikutnya
+    Ambil prompt valid dari response JSON array [{"id": n, "prompt": "..."}]
+    Return dict id -> prompt; item dengan id asing, duplikat atau prompt kosong diabaikan
     """
-    if not narration.strip() or not style_prompt:
-        print("ERROR: Narasi atau style prompt kosong")
-        return []
+    cleaned = re.sub(r'^```(?:json)?\s*|\s*```$', '', (text or '').strip())
+    start, end = cleaned.find('['), cleaned.rfind(']')
+    if start == -1 or end <= start:
+        return {}
+    try:
+        data = json.loads(cleaned[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(data, list):
+        return {}
 
-    print(f"🎯 Starting QUEUE SYSTEM for prompt generation and image download")
-    print(f"📝 Mode: {mode}, Images per paragraph: {images_per_paragraph}")
-    print(f"🎨 Style prompt: {style_prompt[:50]}...")
-    print(f"⏱️ Image delay: {image_delay} seconds")
+    prompts = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        item_id, prompt = item.get('id'), item.get('prompt')
+        if isinstance(item_id, str) and item_id.strip().isdigit():
+            item_id = int(item_id)
+        if item_id not in expected_ids or item_id in prompts or not isinstance(prompt, str):
+            continue
+        prompt = clean_prompt_text(prompt)
+        if prompt:
+            prompts[item_id] = prompt
+    return prompts
+
+def request_prompt_batch(model, batch, style_prompt):
+    """Satu request Gemini untuk satu batch [(index, teks)]; return dict index -> prompt"""
+    system_prompt = f"""
+        You are an expert AI assistant for creating prompts for a text-to-image generator.
+        Your task is to convert EACH text segment below into ONE descriptive visual prompt.
+        Every prompt MUST incorporate the following visual style for consistency: '{style_prompt}'.
 
-    # Prepare text segments based on mode
+        IMPORTANT RULES:
+        - Respond ONLY with a JSON array, no markdown and no explanation
+        - Each element: {{"id": <id of the segment>, "prompt": "<prompt>"}}
+        - Exactly one element for every segment id, in the same order
+        - Keep every prompt under 200 characters, no numbering or "Prompt:" prefix
+        - Focus on visual elements, not abstract concepts
+        - Make it descriptive and dramatic
+        """
+    segments = json.dumps([{'id': index, 'text': text.strip()} for index, text in batch], ensure_ascii=False)
+    response = model.generate_content(f"{system_prompt}\n\nSegments:\n{segments}")
+    return parse_batch_response(response.text if response else '', {index for index, _ in batch})
+
+def iter_batched_prompts(text_segments, style_prompt, model_name='gemini-2.0-flash-exp'):
+    """
+    Generator (index, prompt) berurutan dengan satu request Gemini per batch segmen
+    Style prompt dan aturan dikirim sekali per batch, bukan sekali per segmen.
+    Item yang hilang/tidak valid di response diminta ulang (hanya item itu saja,
+    maks BATCH_MAX_RETRIES kali); sisanya memakai fallback teks + style.
+    Batch berikutnya baru diminta saat dibutuhkan, jadi unduhan gambar pertama
+    tidak menunggu seluruh narasi selesai diproses.
+    """
+    model = None
+    if configure_gemini():
+        model = init_gemini(model_name)
+    if not model:
+        print("❌ Gemini tidak tersedia. Menggunakan fallback prompt...")
+
+    batches = chunk_segments_by_tokens(list(enumerate(text_segments)))
+    print(f"📦 Batched prompt generation: {len(text_segments)} segments in {len(batches)} request(s)")
+
+    for number, batch in enumerate(batches, 1):
+        prompts = {}
+        pending = [(index, text) for index, text in batch if text.strip()]
+        for attempt in range(BATCH_MAX_RETRIES + 1):
+            if not model or not pending:
+                break
+            if attempt:
+                print(f"🔄 Re-requesting {len(pending)} missing/invalid prompt(s) (retry {attempt}/{BATCH_MAX_RETRIES})...")
+            try:
+                prompts.update(request_prompt_batch(model, pending, style_prompt))
+            except Exception as e:
+                print(f"❌ Error Gemini API for batch {number}/{len(batches)}: {e}")
+            pending = [(index, text) for index, text in pending if index not in prompts]
+        print(f"✓ Batch {number}/{len(batches)}: {len(prompts)}/{len(batch)} prompts from Gemini")
+
+        for index, text in batch:
+            prompt = prompts.get(index)
+            if not prompt:
+                prompt = f"{text.strip()}, {style_prompt}"
+                print(f"⚠️ No valid prompt for segment {index+1}, using fallback: {prompt[:50]}...")
+            yield index, prompt
+
+def prepare_text_segments(narration, mode, images_per_paragraph):
+    """
+    Pecah narasi menjadi segmen teks (satu segmen = satu gambar)
+    Enhanced: per kalimat; normal: per paragraf x images_per_paragraph
+    """
     text_segments = []
     
     if mode == 'enhanced':
@@ -191,6 +301,32 @@ def generate_prompts_with_queue_system(narration, mode, model_name, images_per_p
         
         print(f"📊 Total segments created: {len(text_segments)}")
 
+    return text_segments
+
+def queue_image_path(image_folder, index):
+    """Path gambar ke-index dari sistem antrian"""
+    return os.path.join(image_folder, f"image_{index:03d}.jpg")
+
+def generate_prompts_with_queue_system(narration, mode, model_name, images_per_paragraph, style_prompt, image_folder, image_model, image_delay=6, on_image=None, batch_prompts=False):
+    """
+    Generate prompts dan download images menggunakan sistem antrian
+    Satu prompt -> satu gambar -> prompt berikutnya
+    batch_prompts=True: prompt dibuat per batch segmen (satu request Gemini untuk banyak segmen)
+    on_image(index, path) dipanggil setiap item selesai (path None jika gagal),
+    mis. untuk mulai render segmen selagi gambar berikutnya diunduh
+    """
+    if not narration.strip() or not style_prompt:
+        print("ERROR: Narasi atau style prompt kosong")
+        return []
+
+    print(f"🎯 Starting QUEUE SYSTEM for prompt generation and image download")
+    print(f"📝 Mode: {mode}, Images per paragraph: {images_per_paragraph}")
+    print(f"🎨 Style prompt: {style_prompt[:50]}...")
+    print(f"⏱️ Image delay: {image_delay} seconds")
+
+    text_segments = prepare_text_segments(narration, mode, images_per_paragraph)
+    batched = iter_batched_prompts(text_segments, style_prompt, model_name) if batch_prompts else None
+
     # Queue processing: Generate prompt -> Download image -> Next
     successful_images = []
     total_segments = len(text_segments)
@@ -204,29 +340,38 @@ def generate_prompts_with_queue_system(narration, mode, model_name, images_per_p
         
         # Step 1: Generate prompt using Gemini
         print(f"🤖 Step 1: Generating prompt with Gemini...")
-        prompt = generate_single_prompt_from_text(text_segment, style_prompt, model_name)
+        if batched:
+            _, prompt = next(batched)
+        else:
+            prompt = generate_single_prompt_from_text(text_segment, style_prompt, model_name)
         
         if not prompt:
             print(f"❌ Failed to generate prompt for segment {i+1}, skipping...")
+            if on_image:
+                on_image(i, None)
             continue
         
         print(f"✅ Prompt generated: {prompt[:80]}...")
         
         # Step 2: Download image immediately
         print(f"🖼️ Step 2: Downloading image...")
-        img_path = os.path.join(image_folder, f"image_{i:03d}.jpg")
+        img_path = queue_image_path(image_folder, i)
         
         download_success = download_image_from_pollinations(
             prompt, 1280, 720, image_model, img_path, image_delay
         )
         
-        if download_success and os.path.exists(img_path) and os.path.getsize(img_path) > 0:
+        downloaded = download_success and os.path.exists(img_path) and os.path.getsize(img_path) > 0
+        if downloaded:
             successful_images.append(img_path)
             print(f"✅ Image {i+1} downloaded successfully: {os.path.getsize(img_path)} bytes")
             print(f"📁 Saved to: {img_path}")
         else:
             print(f"❌ Image {i+1} download failed")
         
+        if on_image:
+            on_image(i, img_path if downloaded else None)
+        
         # Step 3: Progress update
         progress = ((i + 1) / total_segments) * 100
         print(f"📊 Progress: {progress:.1f}% ({i+1}/{total_segments})")
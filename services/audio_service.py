@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import threading
+import subprocess
+from services.ffmpeg_backend import get_ffmpeg_binary
+
+# Codec audio yang bisa langsung di-mux ke MP4 dengan stream copy
+PASSTHROUGH_CODECS = ('aac',)
+
+AUDIO_BITRATE = '192k'
+
+# Hasil probe per hash isi file; (path, ukuran, mtime) -> hash agar file
+# yang sama tidak di-hash ulang
+_probe_cache = {}
+_hash_cache = {}
+_cache_lock = threading.Lock()
+
+def parse_ffmpeg_banner(stderr):
+    """Ambil info audio dari output 'ffmpeg -i' (jika ffprobe tidak tersedia)."""
+    info = {'duration': None, 'codec': None, 'sample_rate': None, 'channels': None}
+
+    match = re.search(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)', stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        info['duration'] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    match = re.search(r'Stream #\d+:\d+.*?: Audio: ([^\s,]+)[^\n]*', stderr)
+    if match:
+        line = match.group(0)
+        info['codec'] = match.group(1)
+        rate = re.search(r'(\d+) Hz', line)
+        if rate:
+            info['sample_rate'] = int(rate.group(1))
+        if re.search(r'\bmono\b', line):
+            info['channels'] = 1
+        elif re.search(r'\bstereo\b', line):
+            info['channels'] = 2
+        else:
+            layout = re.search(r'Hz, (\d+) channels', line)
+            if layout:
+                info['channels'] = int(layout.group(1))
+    return info
+
+def probe_audio(filepath):
+    """Baca codec, durasi, sample rate dan jumlah channel file audio."""
+    ffprobe = shutil.which('ffprobe')
+    if ffprobe:
+        command = [
+            ffprobe, '-v', 'error', '-select_streams', 'a:0',
+            '-show_entries', 'stream=codec_name,sample_rate,channels:format=duration',
+            '-of', 'json', filepath
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
+            data = json.loads(result.stdout)
+            stream = (data.get('streams') or [{}])[0]
+            duration = data.get('format', {}).get('duration')
+            return {
+                'duration': float(duration) if duration else None,
+                'codec': stream.get('codec_name'),
+                'sample_rate': int(stream['sample_rate']) if stream.get('sample_rate') else None,
+                'channels': stream.get('channels'),
+            }
+        except Exception as e:
+            print(f"Error probing audio with ffprobe: {e}")
+
+    result = subprocess.run(
+        [get_ffmpeg_binary(), '-hide_banner', '-i', filepath],
+        capture_output=True, text=True
+    )
+    return parse_ffmpeg_banner(result.stderr)
+
+def file_hash(filepath):
+    """Hash sha1 isi file, di-cache per (path, ukuran, mtime)."""
+    stats = os.stat(filepath)
+    stat_key = (os.path.abspath(filepath), stats.st_size, stats.st_mtime_ns)
+    with _cache_lock:
+        cached = _hash_cache.get(stat_key)
+    if cached:
+        return cached
+
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    with _cache_lock:
+        _hash_cache[stat_key] = digest.hexdigest()
+    return digest.hexdigest()
+
+def get_audio_info(filepath):
+    """Info audio (durasi, codec, sample rate, channel) dari header, dengan cache.
+
+    Hanya header container/stream yang dibaca (tanpa membuka reader MoviePy).
+    Route upload dan renderer memanggil fungsi ini untuk file yang sama,
+    sehingga probe hanya berjalan sekali per isi file.
+    """
+    key = file_hash(filepath)
+    with _cache_lock:
+        cached = _probe_cache.get(key)
+    if cached:
+        return dict(cached)
+
+    info = probe_audio(filepath)
+    if info.get('duration'):
+        with _cache_lock:
+            _probe_cache[key] = dict(info)
+    return info
+
+def prepare_audio(audio_path, work_dir, info=None):
+    """Siapkan audio yang bisa di-mux dengan stream copy.
+
+    Audio AAC dipakai apa adanya. Codec lain di-transcode sekali ke AAC di
+    awal, sehingga render utama maupun fallback tidak meng-encode ulang audio.
+    """
+    info = info or get_audio_info(audio_path)
+    if info.get('codec') in PASSTHROUGH_CODECS:
+        print(f"Audio codec '{info['codec']}' compatible, using stream copy")
+        return audio_path
+
+    os.makedirs(work_dir, exist_ok=True)
+    prepared_path = os.path.join(work_dir, 'audio.m4a')
+    print(f"Transcoding audio ({info.get('codec') or 'unknown'}) to AAC once: {prepared_path}")
+    command = [
+        get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+        '-i', audio_path, '-vn', '-c:a', 'aac', '-b:a', AUDIO_BITRATE,
+        prepared_path
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Transcode audio gagal: {result.stderr.strip()[-500:]}")
+    return prepared_path
+
+def mux_audio(video_path, audio_path, output_path, duration=None, audio_codec='copy'):
+    """Gabungkan video (tanpa audio) dengan audio; default tanpa re-encode."""
+    command = [
+        get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+        '-i', video_path, '-i', audio_path,
+        '-map', '0:v', '-map', '1:a',
+        '-c:v', 'copy', '-c:a', audio_codec,
+        '-movflags', '+faststart',
+    ]
+    if duration:
+        command += ['-t', f"{duration:.3f}"]
+    command.append(output_path)
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Mux audio gagal: {result.stderr.strip()[-500:]}")
@@ -0,0 +1,216 @@
+import os
+import re
+import json
+import shutil
+import subprocess
+from services.ffmpeg_backend import get_ffmpeg_binary
+from services.audio_service import parse_ffmpeg_banner, AUDIO_BITRATE
+from services.workspace import RenderWorkspace
+
+# Parameter stream yang harus sama agar file bisa digabung dengan stream copy
+VIDEO_KEYS = ('codec', 'profile', 'width', 'height', 'pix_fmt', 'fps')
+AUDIO_KEYS = ('codec', 'sample_rate', 'channels')
+
+def _parse_video_banner(stderr):
+    """Ambil info stream video dari output 'ffmpeg -i'."""
+    match = re.search(
+        r'Stream #\d+:\d+.*?: Video: (\w+)(?: \((\w[^)]*)\))?.*?, (\w+)(?:\([^)]*\))?, (\d+)x(\d+)[^\n]*',
+        stderr
+    )
+    if not match:
+        return None
+    codec, profile, pix_fmt, width, height = match.groups()[:5]
+    fps = re.search(r'([\d.]+) (?:fps|tbr)', match.group(0))
+    return {
+        'codec': codec,
+        'profile': profile,
+        'width': int(width),
+        'height': int(height),
+        'pix_fmt': pix_fmt,
+        'fps': float(fps.group(1)) if fps else None,
+    }
+
+def _parse_rate(value):
+    try:
+        numerator, denominator = value.split('/')
+        return round(int(numerator) / int(denominator), 3) if int(denominator) else None
+    except (AttributeError, ValueError):
+        return None
+
+def probe_video(filepath):
+    """Baca durasi serta parameter stream video dan audio pertama sebuah file."""
+    ffprobe = shutil.which('ffprobe')
+    if ffprobe:
+        command = [
+            ffprobe, '-v', 'error', '-show_entries',
+            'stream=codec_type,codec_name,profile,width,height,pix_fmt,avg_frame_rate,sample_rate,channels'
+            ':format=duration',
+            '-of', 'json', filepath
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
+            data = json.loads(result.stdout)
+            streams = data.get('streams') or []
+            video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+            audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+            duration = data.get('format', {}).get('duration')
+            return {
+                'duration': float(duration) if duration else None,
+                'video': {
+                    'codec': video.get('codec_name'),
+                    'profile': video.get('profile'),
+                    'width': video.get('width'),
+                    'height': video.get('height'),
+                    'pix_fmt': video.get('pix_fmt'),
+                    'fps': _parse_rate(video.get('avg_frame_rate')),
+                } if video else None,
+                'audio': {
+                    'codec': audio.get('codec_name'),
+                    'sample_rate': int(audio['sample_rate']) if audio.get('sample_rate') else None,
+                    'channels': audio.get('channels'),
+                } if audio else None,
+            }
+        except Exception as e:
+            print(f"Error probing video with ffprobe: {e}")
+
+    result = subprocess.run(
+        [get_ffmpeg_binary(), '-hide_banner', '-i', filepath],
+        capture_output=True, text=True
+    )
+    audio = parse_ffmpeg_banner(result.stderr)
+    duration = audio.pop('duration')
+    return {
+        'duration': duration,
+        'video': _parse_video_banner(result.stderr),
+        'audio': audio if audio['codec'] else None,
+    }
+
+def stream_signature(info):
+    """Tuple parameter stream; file dengan signature sama bisa di-concat tanpa re-encode."""
+    video = info.get('video') or {}
+    audio = info.get('audio')
+    return (
+        tuple(video.get(key) for key in VIDEO_KEYS),
+        tuple(audio.get(key) for key in AUDIO_KEYS) if audio else None,
+    )
+
+def normalize_video(input_path, output_path, target, duration=None):
+    """Re-encode satu file ke parameter stream target (ukuran, fps, pix_fmt, audio).
+
+    Gambar di-scale dengan letterbox agar rasio aspek tetap; file tanpa audio
+    diberi track hening supaya bisa digabung dengan file lain yang beraudio.
+    """
+    video, audio = target['video'], target['audio']
+    width, height = video['width'], video['height']
+    source_audio = (probe_video(input_path).get('audio') is not None) if audio else False
+
+    command = [get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error', '-i', input_path]
+    if audio and not source_audio:
+        layout = 'mono' if audio['channels'] == 1 else 'stereo'
+        command += ['-f', 'lavfi', '-i', f"anullsrc=channel_layout={layout}:sample_rate={audio['sample_rate']}"]
+    command += [
+        '-map', '0:v:0',
+        '-vf', (
+            f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={video['fps']}"
+        ),
+        '-c:v', 'libx264', '-preset', 'medium', '-crf', '23', '-pix_fmt', video['pix_fmt'] or 'yuv420p',
+    ]
+    if audio:
+        command += [
+            '-map', '0:a:0' if source_audio else '1:a:0',
+            '-c:a', 'aac', '-b:a', AUDIO_BITRATE,
+            '-ar', str(audio['sample_rate']), '-ac', str(audio['channels']),
+        ]
+        if not source_audio and duration:
+            command += ['-t', f"{duration:.3f}"]
+    else:
+        command.append('-an')
+    command.append(output_path)
+
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Normalisasi {os.path.basename(input_path)} gagal: {result.stderr.strip()[-500:]}")
+    return output_path
+
+def _concat_copy(video_paths, output_path, list_path):
+    with open(list_path, 'w') as f:
+        for path in video_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    command = [
+        get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+        '-map', '0', '-c', 'copy',
+        '-movflags', '+faststart',
+        output_path
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat gagal: {result.stderr.strip()[-500:]}")
+
+def compile_videos(video_paths, output_path):
+    """Gabungkan beberapa video jadi satu file dengan concat demuxer.
+
+    Jika semua file punya parameter stream yang sama, file digabung dengan
+    stream copy tanpa re-encode. Jika tidak, hanya file yang berbeda dari
+    referensi (video dari file pertama, audio dari file pertama yang punya
+    audio) yang di-encode ulang ke parameter referensi, lalu hasilnya tetap
+    digabung dengan stream copy. File tanpa audio diberi track hening.
+    Return (success, message, info) dengan info berisi metode, file yang
+    di-encode ulang dan durasi total.
+    """
+    if len(video_paths) < 2:
+        return False, "Minimal 2 video untuk membuat kompilasi.", {}
+
+    try:
+        infos = [probe_video(path) for path in video_paths]
+        for path, info in zip(video_paths, infos):
+            if not info.get('video'):
+                return False, f"Stream video tidak ditemukan di {os.path.basename(path)}.", {}
+
+        # Video mengikuti file pertama; audio mengikuti file pertama yang punya audio,
+        # agar audio file lain tidak hilang jika file pertama tanpa track audio
+        target = dict(infos[0], audio=next((info['audio'] for info in infos if info.get('audio')), None))
+        # Referensi non-H.264/AAC tidak bisa dicampur dengan hasil libx264/aac; encode ulang semua
+        target_copyable = target['video']['codec'] == 'h264'
+        if not target_copyable:
+            target['video'] = dict(target['video'], codec='h264')
+        if target['audio'] and target['audio']['codec'] != 'aac':
+            target_copyable = False
+            target['audio'] = dict(target['audio'], codec='aac')
+        target_signature = stream_signature(target)
+        reencode = [
+            index for index, info in enumerate(infos)
+            if not target_copyable or stream_signature(info) != target_signature
+        ]
+
+        with RenderWorkspace('compile_') as workspace:
+            inputs = list(video_paths)
+            for index in reencode:
+                print(f"Re-encoding {os.path.basename(video_paths[index])} to match compilation stream parameters...")
+                inputs[index] = normalize_video(
+                    video_paths[index], workspace.file(f"normalized_{index:03d}.mp4"), target,
+                    duration=infos[index].get('duration')
+                )
+                workspace.check()
+            print(f"Joining {len(inputs)} videos with concat demuxer (stream copy)...")
+            _concat_copy(inputs, output_path, workspace.file('concat_list.txt'))
+
+        duration = sum(info.get('duration') or 0 for info in infos)
+        info = {
+            'method': 'reencode' if reencode else 'copy',
+            'reencoded': [os.path.basename(video_paths[index]) for index in reencode],
+            'duration': round(duration, 3),
+        }
+        if reencode:
+            message = (f"Kompilasi {len(video_paths)} video berhasil dibuat "
+                       f"({len(reencode)} video di-encode ulang karena parameter stream berbeda).")
+        else:
+            message = f"Kompilasi {len(video_paths)} video berhasil dibuat tanpa re-encode."
+        return True, message, info
+
+    except Exception as e:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False, f"Error membuat kompilasi: {str(e)}", {}
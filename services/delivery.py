@@ -0,0 +1,49 @@
+import os
+import mimetypes
+from urllib.parse import quote
+from flask import send_file, abort, current_app
+from werkzeug.security import safe_join
+from config import Config
+
+def file_etag(stat):
+    """ETag kuat dari mtime (ns) dan ukuran; berubah setiap file ditulis ulang."""
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+def _set_cache_headers(response, max_age):
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if not max_age:
+        # Boleh disimpan, tapi selalu divalidasi ulang (304 murah lewat ETag)
+        response.cache_control.no_cache = True
+
+def send_media(folder, filename, location, max_age=0):
+    """Kirim file dari folder dengan range request, ETag dan header cache.
+
+    Mode Config.FILE_DELIVERY:
+    - 'flask': Werkzeug melayani Range (206) dan If-None-Match (304)
+      langsung dari file, tanpa membaca seluruh file ke memori.
+    - 'x-sendfile': body diganti header X-Sendfile (lewat USE_X_SENDFILE);
+      Range dan validasi ditangani web server.
+    - 'x-accel': header X-Accel-Redirect ke lokasi internal nginx
+      X_ACCEL_PREFIX/<location>/<filename>, misalnya:
+          location /protected/outputs/ { internal; alias /app/outputs/; }
+    Dengan dua mode terakhir worker Python langsung bebas setelah header dikirim.
+    """
+    folder = os.path.abspath(folder)
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    if Config.FILE_DELIVERY == 'x-accel':
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        relative = os.path.relpath(path, folder).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = quote(f"{Config.X_ACCEL_PREFIX}/{location}/{relative}")
+    else:
+        response = send_file(
+            path, etag=file_etag(os.stat(path)), max_age=max_age,
+            conditional=Config.FILE_DELIVERY != 'x-sendfile'
+        )
+    _set_cache_headers(response, max_age)
+    return response
@@ -0,0 +1,85 @@
+import os
+import hashlib
+import threading
+
+def file_digest(filepath):
+    """SHA1 isi file (dibaca per 1 MB)."""
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest
+
+class DiskCache:
+    """Dasar cache file di disk yang dibatasi total ukuran.
+
+    Satu file per kunci (<key><extension>). Entri ditulis ke file .tmp lalu
+    di-rename agar pembaca tidak pernah melihat file setengah jadi, dan
+    dihapus berdasarkan waktu akses terlama (mtime, diperbarui lewat touch)
+    jika total ukuran melebihi max_bytes.
+    """
+
+    extension = ''
+    label = 'Cache'
+
+    def __init__(self, cache_folder, max_bytes):
+        self.cache_folder = cache_folder
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_folder, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_folder, f"{key}{self.extension}")
+
+    def _touch(self, path):
+        os.utime(path)  # tandai baru diakses untuk eviction
+
+    def _write_entry(self, key, write):
+        """Panggil write(tmp_path), lalu pindahkan hasilnya ke entri key dan evict."""
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self.evict()
+        return path
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def total_bytes(self):
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        entries = []
+        for filename in os.listdir(self.cache_folder):
+            if filename.endswith(self.extension):
+                path = os.path.join(self.cache_folder, filename)
+                try:
+                    stats = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stats.st_mtime, path, stats.st_size))
+        return entries
+
+    def evict(self):
+        """Hapus entri paling lama diakses sampai total ukuran <= batas."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, _, size in entries)
+            removed = 0
+            for _, path, size in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                removed += 1
+            if removed:
+                print(f"{self.label} evicted {removed} entries ({total / (1024 * 1024):.1f} MB left)")
+            return removed
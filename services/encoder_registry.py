@@ -0,0 +1,116 @@
+import re
+import threading
+import subprocess
+from services.ffmpeg_backend import get_ffmpeg_binary
+
+# Encoder H.264 yang dipakai, urut dari pilihan GPU ke CPU
+GPU_ENCODERS = ('h264_nvenc',)
+CPU_ENCODER = 'libx264'
+
+# Encode 1 frame kecil untuk memastikan encoder benar-benar bisa dibuka
+# (encoder bisa terdaftar di build ffmpeg walaupun tidak ada GPU/driver)
+TEST_ENCODE_INPUT = 'color=black:s=256x144:r=30:d=0.1'
+
+class EncoderRegistry:
+    """Daftar encoder ffmpeg yang tersedia, di-probe sekali lalu di-cache.
+
+    Hasil probe disimpan per path binary ffmpeg, sehingga mengganti
+    FFMPEG_BINARY (mis. binary palsu untuk pengujian) memicu probe ulang.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def list_encoders(self, ffmpeg_binary):
+        """Nama encoder video dari 'ffmpeg -encoders'."""
+        result = subprocess.run(
+            [ffmpeg_binary, '-hide_banner', '-encoders'],
+            capture_output=True, text=True, timeout=30
+        )
+        encoders = set()
+        for line in result.stdout.splitlines():
+            match = re.match(r'\s*V[\w.]{5}\s+(\S+)', line)
+            if match:
+                encoders.add(match.group(1))
+        return encoders
+
+    def test_encoder(self, ffmpeg_binary, codec):
+        """Coba encode satu frame; return (ok, pesan error)."""
+        command = [
+            ffmpeg_binary, '-hide_banner', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', TEST_ENCODE_INPUT,
+            '-frames:v', '1', '-c:v', codec, '-f', 'null', '-'
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=30)
+        except Exception as e:
+            return False, str(e)
+        if result.returncode != 0:
+            return False, result.stderr.strip()[-300:]
+        return True, ''
+
+    def probe(self, force=False):
+        """Probe encoder GPU dan CPU untuk binary ffmpeg saat ini (sekali per binary)."""
+        ffmpeg_binary = get_ffmpeg_binary()
+        with self._lock:
+            if not force and ffmpeg_binary in self._results:
+                return self._results[ffmpeg_binary]
+
+            capabilities = {}
+            try:
+                listed = self.list_encoders(ffmpeg_binary)
+            except Exception as e:
+                print(f"Error listing ffmpeg encoders: {e}")
+                listed = set()
+
+            for codec in GPU_ENCODERS + (CPU_ENCODER,):
+                if codec not in listed:
+                    capabilities[codec] = {'available': False, 'reason': 'tidak ada di build ffmpeg'}
+                    continue
+                ok, error = self.test_encoder(ffmpeg_binary, codec)
+                capabilities[codec] = {'available': ok, 'reason': '' if ok else error}
+
+            summary = ', '.join(
+                f"{codec}={'ok' if info['available'] else 'no'}" for codec, info in capabilities.items()
+            )
+            print(f"Encoder capabilities ({ffmpeg_binary}): {summary}")
+            self._results[ffmpeg_binary] = capabilities
+            return capabilities
+
+    def preload(self, capabilities, ffmpeg_binary=None):
+        """Pakai hasil probe dari proses lain (mis. worker render) tanpa probe ulang."""
+        with self._lock:
+            self._results[ffmpeg_binary or get_ffmpeg_binary()] = dict(capabilities)
+
+    def is_available(self, codec):
+        return self.probe().get(codec, {}).get('available', False)
+
+    def fallback_chain(self, use_gpu=False):
+        """Urutan encoder yang akan dicoba: GPU yang lolos probe, lalu libx264.
+
+        libx264 selalu menjadi pilihan terakhir walaupun probe gagal, agar
+        render tetap dicoba dan error aslinya terlihat.
+        """
+        chain = []
+        if use_gpu:
+            chain += [codec for codec in GPU_ENCODERS if self.is_available(codec)]
+        chain.append(CPU_ENCODER)
+        return chain
+
+    def choose(self, use_gpu=False):
+        """Encoder utama dan alasannya, untuk log dan metadata job."""
+        codec = self.fallback_chain(use_gpu)[0]
+        if not use_gpu:
+            reason = 'GPU tidak diminta'
+        elif codec == CPU_ENCODER:
+            details = '; '.join(
+                f"{gpu}: {self.probe().get(gpu, {}).get('reason', '')}" for gpu in GPU_ENCODERS
+            )
+            reason = f"GPU encoder tidak tersedia ({details})"
+        else:
+            reason = 'GPU encoder lolos probe'
+        return {'encoder': codec, 'reason': reason}
+
+# Registry bersama untuk semua backend render
+registry = EncoderRegistry()
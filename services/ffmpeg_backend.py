@@ -0,0 +1,271 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+# Efek yang bisa diekspresikan langsung sebagai filter ffmpeg
+SUPPORTED_EFFECTS = ('still', 'zoom_in', 'zoom_out', 'fade')
+
+# Batas jumlah input per proses ffmpeg (setiap gambar = satu file descriptor)
+MAX_FFMPEG_INPUTS = 400
+
+CROSSFADE_DURATION = 0.5
+
+ZOOM_RANGES = {
+    'zoom_in': (1.0, 1.3),
+    'zoom_out': (1.3, 1.0),
+}
+
+def get_ffmpeg_binary():
+    """Cari binary ffmpeg: env FFMPEG_BINARY, imageio-ffmpeg, lalu PATH."""
+    binary = os.environ.get('FFMPEG_BINARY')
+    if binary:
+        return binary
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return shutil.which('ffmpeg')
+
+def can_render(segments):
+    """Cek apakah timeline bisa dirender dengan satu filtergraph ffmpeg."""
+    if not get_ffmpeg_binary():
+        return False, "Binary ffmpeg tidak ditemukan."
+    if not segments:
+        return False, "Tidak ada segmen untuk dirender."
+    if len(segments) > MAX_FFMPEG_INPUTS:
+        return False, f"Terlalu banyak gambar untuk satu proses ffmpeg ({len(segments)} > {MAX_FFMPEG_INPUTS})."
+    for segment in segments:
+        if segment['effect'] not in SUPPORTED_EFFECTS:
+            return False, f"Efek '{segment['effect']}' tidak didukung backend ffmpeg."
+        if segment['frames'] < 1:
+            return False, "Durasi segmen terlalu pendek."
+    return True, "OK"
+
+def normalize_filters(size=(1280, 720)):
+    """Filter normalisasi gambar ke ukuran target.
+
+    Samakan dengan MoviePy: resize ke tinggi target, crop tengah jika lebih
+    lebar, dan beri latar hitam di tengah jika lebih sempit.
+    """
+    width, height = size
+    return [
+        f"scale=-2:{height}:flags=lanczos",
+        f"crop='min(iw,{width})':{height}",
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black",
+        "setsar=1",
+    ]
+
+def crossfade_filters(segment, duration):
+    """Crossfade MoviePy (method="compose") = fade dari/ke latar hitam."""
+    filters = []
+    crossfade = min(CROSSFADE_DURATION, duration / 2)
+    if segment.get('fade_in'):
+        filters.append(f"fade=t=in:st=0:d={crossfade:.3f}")
+    if segment.get('fade_out'):
+        filters.append(f"fade=t=out:st={duration - crossfade:.3f}:d={crossfade:.3f}")
+    return filters
+
+def _segment_filter(index, segment, fps, size, zoom_quality, skip_frames=0):
+    """Rantai filter untuk satu gambar: normalisasi, efek, lalu fade.
+
+    skip_frames membuang frame awal segmen (melanjutkan render di tengah segmen).
+    """
+    width, height = size
+    frames = segment['frames']
+    duration = frames / fps
+
+    filters = [
+        f"trim=end_frame={frames}",
+        "setpts=PTS-STARTPTS",
+    ] + normalize_filters(size)
+
+    effect = segment['effect']
+    if effect in ZOOM_RANGES:
+        start_zoom, end_zoom = ZOOM_RANGES[effect]
+        if zoom_quality != 'fast':
+            # zoompan membulatkan posisi crop ke piksel; upscale dulu agar halus
+            filters.append(f"scale={width * 2}:{height * 2}:flags=bicubic")
+        filters.append(
+            f"zoompan=z='{start_zoom}+{end_zoom - start_zoom:.4f}*on/{frames}'"
+            f":x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)'"
+            f":d=1:s={width}x{height}:fps={fps}"
+        )
+    elif effect == 'fade':
+        fade_duration = min(CROSSFADE_DURATION, duration / 4)
+        filters.append(f"fade=t=in:st=0:d={fade_duration:.3f}")
+        filters.append(f"fade=t=out:st={duration - fade_duration:.3f}:d={fade_duration:.3f}")
+
+    filters += crossfade_filters(segment, duration)
+    if skip_frames:
+        filters += [f"trim=start_frame={skip_frames}", "setpts=PTS-STARTPTS"]
+    filters.append("format=yuv420p")
+    return f"[{index}:v]{','.join(filters)}[v{index}]"
+
+def build_filtergraph(segments, fps=30, size=(1280, 720), zoom_quality='balanced', skip_frames=0):
+    """Bangun filter_complex untuk seluruh timeline.
+
+    skip_frames membuang frame awal segmen pertama (lihat remaining_segments).
+    """
+    chains = [
+        _segment_filter(i, segment, fps, size, zoom_quality, skip_frames if i == 0 else 0)
+        for i, segment in enumerate(segments)
+    ]
+    labels = ''.join(f"[v{i}]" for i in range(len(segments)))
+    chains.append(f"{labels}concat=n={len(segments)}:v=1:a=0[outv]")
+    return ';\n'.join(chains)
+
+def remaining_segments(segments, first_frame):
+    """Segmen yang memuat frame first_frame..akhir dan jumlah frame awal segmen pertama yang dilewati."""
+    for index, segment in enumerate(segments):
+        if first_frame < segment['frames']:
+            return segments[index:], first_frame
+        first_frame -= segment['frames']
+    return [], 0
+
+def segment_start_frames(segments):
+    """Indeks frame awal setiap segmen kecuali yang pertama."""
+    starts = []
+    total = 0
+    for segment in segments[:-1]:
+        total += segment['frames']
+        starts.append(total)
+    return starts
+
+def keyframe_params(frame_indices, fps):
+    """Argumen -force_key_frames untuk indeks frame tertentu (mis. awal setiap segmen).
+
+    Keyframe di setiap batas segmen membuat segmen video final bisa dipotong
+    dengan stream copy saat render ulang inkremental (rerender_service).
+    Waktu dibulatkan ke frame terdekat oleh ffmpeg (time base encoder 1/fps).
+    """
+    frames = sorted(set(index for index in frame_indices if index > 0))
+    if not frames:
+        return []
+    return ['-force_key_frames', ','.join(f"{index / fps:.6f}" for index in frames)]
+
+def encoder_args(codec, preset='medium', crf=23):
+    """Argumen encoder video."""
+    if codec == 'h264_nvenc':
+        return ['-c:v', 'h264_nvenc', '-preset', 'fast', '-cq', str(crf)]
+    return ['-c:v', codec, '-preset', preset, '-crf', str(crf)]
+
+def build_ffmpeg_command(segments, audio_path, output_path, filter_script, audio_duration,
+                         fps=30, codec='libx264', preset='medium', crf=23, audio_codec='aac', ffmpeg_params=None):
+    """Susun argumen ffmpeg untuk render satu langkah.
+
+    audio_path None menghasilkan video tanpa audio (potongan render yang bisa dilanjutkan).
+    """
+    command = [get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error']
+    for segment in segments:
+        # Satu frame ekstra agar trim selalu punya cukup frame
+        input_duration = (segment['frames'] + 1) / fps
+        command += ['-loop', '1', '-framerate', str(fps), '-t', f"{input_duration:.3f}", '-i', segment['image']]
+    if audio_path:
+        command += ['-i', audio_path]
+
+    command += ['-filter_complex_script', filter_script, '-map', '[outv]']
+    if audio_path:
+        command += ['-map', f"{len(segments)}:a", '-c:a', audio_codec]
+    else:
+        command += ['-an']
+    command += encoder_args(codec, preset, crf)
+    command += keyframe_params(segment_start_frames(segments), fps)
+    command += [
+        '-r', str(fps),
+        '-t', f"{audio_duration:.3f}",
+        '-movflags', '+faststart',
+    ]
+    # ffmpeg_params (mis. movflags output live) menimpa faststart
+    command += list(ffmpeg_params or [])
+    command.append(output_path)
+    return command
+
+def render_with_ffmpeg(segments, audio_path, output_path, audio_duration, use_gpu=False,
+                       fps=30, size=(1280, 720), zoom_quality='balanced', audio_codec='aac',
+                       preset='medium', crf=23, work_dir=None, ffmpeg_params=None):
+    """Render timeline dengan satu proses ffmpeg (tanpa kerja per frame di Python).
+
+    Skrip filtergraph ditulis ke work_dir (workspace job) jika diberikan.
+    Dengan work_dir dan lebih dari satu encoder, video ditulis sebagai
+    potongan sehingga jika encoder gagal di tengah hanya sisa frame yang
+    di-render ulang (lihat frame_writer.encode_chunks_resumable). Output
+    dengan ffmpeg_params (mis. MP4 live) harus satu file progresif dan
+    diulang dari awal dengan encoder berikutnya.
+    """
+    ok, reason = can_render(segments)
+    if not ok:
+        return False, reason
+
+    # Import di sini: encoder_registry memakai get_ffmpeg_binary dari modul ini
+    from services.encoder_registry import registry
+    codecs = registry.fallback_chain(use_gpu)
+    if work_dir and len(codecs) > 1 and not ffmpeg_params:
+        return _render_resumable(segments, audio_path, output_path, audio_duration, codecs,
+                                 fps, size, zoom_quality, audio_codec, preset, crf, work_dir)
+
+    fd, filter_script = tempfile.mkstemp(suffix='.txt', prefix='filtergraph_', dir=work_dir)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(build_filtergraph(segments, fps, size, zoom_quality))
+
+        last_error = ''
+        for codec in codecs:
+            command = build_ffmpeg_command(
+                segments, audio_path, output_path, filter_script, audio_duration,
+                fps=fps, codec=codec, preset=preset, crf=crf, audio_codec=audio_codec,
+                ffmpeg_params=ffmpeg_params
+            )
+            print(f"Rendering with ffmpeg filtergraph ({codec}): {len(segments)} segments")
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode == 0:
+                return True, f"Video berhasil dibuat dengan ffmpeg ({codec})."
+            last_error = result.stderr.strip()[-500:]
+            print(f"ffmpeg render with {codec} failed: {last_error}")
+
+        return False, f"ffmpeg gagal: {last_error}"
+    except Exception as e:
+        print(f"Error in ffmpeg render backend: {e}")
+        return False, f"ffmpeg gagal: {str(e)}"
+    finally:
+        if os.path.exists(filter_script):
+            os.remove(filter_script)
+
+def _render_resumable(segments, audio_path, output_path, audio_duration, codecs,
+                      fps, size, zoom_quality, audio_codec, preset, crf, work_dir):
+    """Render filtergraph sebagai potongan video, lanjutkan dari potongan terakhir yang lengkap jika encoder gagal."""
+    # Import di sini untuk menghindari import melingkar (keduanya memakai modul ini)
+    from services.frame_writer import encode_chunks_resumable
+    from services.segment_renderer import concat_segments
+
+    frame_count = sum(segment['frames'] for segment in segments)
+    filter_script = os.path.join(work_dir, 'filtergraph_resume.txt')
+
+    def encode_from(codec, first_frame, pattern, chunk_params):
+        remaining, skip_frames = remaining_segments(segments, first_frame)
+        with open(filter_script, 'w') as f:
+            f.write(build_filtergraph(remaining, fps, size, zoom_quality, skip_frames))
+        # -force_key_frames di chunk_params (relatif terhadap first_frame) menimpa milik perintah ini
+        command = build_ffmpeg_command(
+            remaining, None, pattern, filter_script, (frame_count - first_frame) / fps,
+            fps=fps, codec=codec, preset=preset, crf=crf, ffmpeg_params=chunk_params
+        )
+        print(f"Rendering with ffmpeg filtergraph ({codec}): {len(remaining)} segments from frame {first_frame}")
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip()[-500:])
+
+    try:
+        chunk_paths, used_codecs = encode_chunks_resumable(
+            encode_from, codecs, work_dir, frame_count, fps,
+            keyframes=segment_start_frames(segments), prefix='ffmpeg_chunk', preset=preset, crf=crf
+        )
+        concat_segments(chunk_paths, audio_path, output_path, audio_duration,
+                        os.path.join(work_dir, 'ffmpeg_chunks.txt'), audio_codec)
+        return True, f"Video berhasil dibuat dengan ffmpeg ({' + '.join(used_codecs)})."
+    except Exception as e:
+        print(f"Error in ffmpeg render backend: {e}")
+        return False, f"ffmpeg gagal: {str(e)}"
+    finally:
+        if os.path.exists(filter_script):
+            os.remove(filter_script)
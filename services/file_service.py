@@ -201,6 +201,39 @@ class FileService:
         except Exception as e:
             return False, f"Error membuat ZIP archive: {str(e)}", ""
     
+    def create_compilation(self, filenames: List[str], output_name: str = None) -> Tuple[bool, str, str]:
+        """Gabungkan beberapa video output menjadi satu video kompilasi"""
+        # Import di sini agar FileService tetap ringan untuk operasi file biasa
+        from services.compilation_service import compile_videos
+        
+        video_paths = []
+        for filename in filenames:
+            video_path = os.path.join(self.output_folder, os.path.basename(filename))
+            if os.path.splitext(filename)[1].lower() not in ['.mp4', '.mov', '.mkv'] or not os.path.isfile(video_path):
+                return False, f"Video '{filename}' tidak ditemukan.", ""
+            video_paths.append(video_path)
+        
+        if not output_name:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            output_name = f"compilation_{timestamp}.mp4"
+        output_name = os.path.splitext(os.path.basename(output_name))[0] + '.mp4'
+        output_path = os.path.join(self.output_folder, output_name)
+        if os.path.exists(output_path):
+            return False, f"File '{output_name}' sudah ada.", ""
+        
+        success, message, info = compile_videos(video_paths, output_path)
+        if not success:
+            return False, message, ""
+        
+        self.add_file_metadata(output_name, {
+            'type': 'compilation',
+            'sources': [os.path.basename(path) for path in video_paths],
+            'compile_method': info['method'],
+            'reencoded': info['reencoded'],
+            'duration': info['duration'],
+        })
+        return True, message, output_name
+    
     def get_storage_info(self) -> Dict:
         """Dapatkan informasi storage untuk semua file"""
         try:
@@ -0,0 +1,307 @@
+import os
+import glob
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from services.ffmpeg_backend import get_ffmpeg_binary, encoder_args, keyframe_params
+
+DEFAULT_QUEUE_DEPTH = 32
+
+class FrameWriter:
+    """Tulis frame RGB mentah langsung ke stdin ffmpeg.
+
+    Sekumpulan thread producer menghitung frame berikutnya (efek, compose)
+    sementara ffmpeg meng-encode frame saat ini. Frame yang menunggu ditulis
+    dibatasi oleh ring buffer berukuran queue_depth sehingga memori tetap
+    konstan.
+
+    Gauge antrean (lihat stats()):
+    - antrean hampir selalu penuh  -> terikat encoder
+    - antrean hampir selalu kosong -> terikat perhitungan efek
+    """
+
+    def __init__(self, output_path, size, fps=30, codec='libx264', preset='medium', crf=23,
+                 audio_path=None, duration=None, queue_depth=DEFAULT_QUEUE_DEPTH, workers=None,
+                 ffmpeg_params=None, audio_codec='aac'):
+        self.output_path = output_path
+        self.size = tuple(size)
+        self.fps = fps
+        self.codec = codec
+        self.preset = preset
+        self.crf = crf
+        self.audio_path = audio_path
+        self.audio_codec = audio_codec
+        self.duration = duration
+        self.queue_depth = max(1, int(queue_depth))
+        self.workers = workers or 4
+        self.ffmpeg_params = ffmpeg_params or []
+
+        self.frames_written = 0
+        self.ready_samples = 0
+        self.ready_total = 0
+        self.ready_full = 0
+        self.producer_wait = 0.0
+        self.encoder_wait = 0.0
+        self._current_ready = 0
+        self._lock = threading.Lock()
+
+    def build_command(self):
+        width, height = self.size
+        command = [
+            get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+            '-f', 'rawvideo', '-vcodec', 'rawvideo',
+            '-s', f"{width}x{height}", '-pix_fmt', 'rgb24',
+            '-r', str(self.fps), '-i', '-',
+        ]
+        if self.audio_path:
+            command += ['-i', self.audio_path, '-map', '0:v', '-map', '1:a', '-c:a', self.audio_codec]
+        else:
+            command += ['-an']
+        command += encoder_args(self.codec, self.preset, self.crf)
+        # moov di depan agar bisa diputar sebelum terunduh penuh; ffmpeg_params boleh menimpa
+        command += ['-pix_fmt', 'yuv420p', '-movflags', '+faststart'] + list(self.ffmpeg_params)
+        if self.duration:
+            command += ['-t', f"{self.duration:.3f}"]
+        command.append(self.output_path)
+        return command
+
+    def queue_gauge(self):
+        """Jumlah frame siap yang sedang menunggu encoder (gauge live)."""
+        return self._current_ready
+
+    def stats(self):
+        """Ringkasan gauge antrean dan klasifikasi bottleneck."""
+        average = self.ready_total / self.ready_samples if self.ready_samples else 0.0
+        if self.encoder_wait > self.producer_wait:
+            bound = 'encoder'
+        else:
+            bound = 'effects'
+        return {
+            'frames_written': self.frames_written,
+            'queue_capacity': self.queue_depth,
+            'avg_queue_depth': round(average, 2),
+            'queue_full_ratio': round(self.ready_full / self.ready_samples, 3) if self.ready_samples else 0.0,
+            'producer_wait_seconds': round(self.producer_wait, 3),
+            'encoder_wait_seconds': round(self.encoder_wait, 3),
+            'bound': bound,
+        }
+
+    def _frame_bytes(self, make_frame, index):
+        frame = make_frame(index / self.fps)
+        if frame.dtype != np.uint8:
+            frame = np.clip(frame, 0, 255).astype(np.uint8)
+        return np.ascontiguousarray(frame[:, :, :3]).tobytes()
+
+    def write_frames(self, make_frame, frame_count, first_frame=0):
+        """Hitung frame first_frame..frame_count-1 dengan make_frame(t) dan encode."""
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            submit = lambda index: executor.submit(self._frame_bytes, make_frame, index)
+            return self.encode(self.ordered_frames(submit, frame_count, first_frame))
+
+    def ordered_frames(self, submit, frame_count, first_frame=0):
+        """Hasil submit(indeks) (future) berurutan, maksimal queue_depth frame dalam proses.
+
+        Frame ke-i baru di-submit setelah frame ke-(i - queue_depth) selesai
+        ditulis, sehingga producer boleh memakai ulang slot i % queue_depth.
+        """
+        pending = deque()
+        next_index = first_frame
+        while next_index < frame_count or pending:
+            # Isi ring buffer sampai kapasitas
+            while next_index < frame_count and len(pending) < self.queue_depth:
+                pending.append(submit(next_index))
+                next_index += 1
+
+            ready = sum(1 for future in pending if future.done())
+            self._record_gauge(ready)
+
+            future = pending.popleft()
+            start = time.perf_counter()
+            data = future.result()
+            self.producer_wait += time.perf_counter() - start
+            yield data
+
+    def encode(self, frames):
+        """Tulis setiap frame (bytes/memoryview RGB) dari iterator ke ffmpeg."""
+        process = subprocess.Popen(
+            self.build_command(), stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        # stderr dibaca di thread terpisah agar pipe tidak penuh
+        stderr_chunks = []
+        stderr_thread = threading.Thread(
+            target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True
+        )
+        stderr_thread.start()
+
+        try:
+            for data in frames:
+                start = time.perf_counter()
+                process.stdin.write(data)
+                self.encoder_wait += time.perf_counter() - start
+                self.frames_written += 1
+
+            process.stdin.close()
+            returncode = process.wait()
+        except Exception:
+            process.kill()
+            process.wait()
+            stderr_thread.join(timeout=5)
+            raise
+
+        stderr_thread.join(timeout=5)
+        if returncode != 0:
+            error = b''.join(chunk for chunk in stderr_chunks if chunk).decode(errors='replace')
+            raise RuntimeError(f"ffmpeg ({self.codec}) gagal: {error.strip()[-500:]}")
+        return self.stats()
+
+    def _record_gauge(self, ready):
+        with self._lock:
+            self._current_ready = ready
+            self.ready_samples += 1
+            self.ready_total += ready
+            if ready >= self.queue_depth:
+                self.ready_full += 1
+
+def write_clip_streaming(clip, output_path, fps=30, codec='libx264', preset='medium', crf=23,
+                         audio_path=None, audio_codec='aac', workers=None,
+                         queue_depth=DEFAULT_QUEUE_DEPTH, ffmpeg_params=None):
+    """Render clip MoviePy ke file dengan FrameWriter (pengganti write_videofile)."""
+    frame_count = int(round(clip.duration * fps))
+    writer = FrameWriter(
+        output_path, clip.size, fps=fps, codec=codec, preset=preset, crf=crf,
+        audio_path=audio_path, audio_codec=audio_codec, duration=clip.duration,
+        queue_depth=queue_depth, workers=workers, ffmpeg_params=ffmpeg_params
+    )
+    stats = writer.write_frames(clip.get_frame, frame_count)
+    print(f"Streaming writer: {stats['frames_written']} frames, "
+          f"avg queue {stats['avg_queue_depth']}/{stats['queue_capacity']}, bound by {stats['bound']}")
+    return stats
+
+def chunk_params(first_frame, frame_count, fps, chunk_seconds=2, keyframes=()):
+    """Argumen ffmpeg untuk menulis potongan MP4 chunk_seconds detik (muxer segment).
+
+    Setiap potongan diawali keyframe, begitu juga indeks frame di keyframes.
+    Potongan dipotong di nomor frame (bukan waktu) agar keyframe tambahan
+    tidak memendekkan potongan: setiap potongan lengkap tepat chunk_frames.
+    Indeks relatif terhadap first_frame (frame pertama percobaan ini).
+    """
+    chunk_frames = int(fps * chunk_seconds)
+    boundaries = list(range(chunk_frames, frame_count - first_frame, chunk_frames))
+    forced = boundaries + [index - first_frame for index in keyframes]
+    command = ['-g', str(chunk_frames), '-keyint_min', str(chunk_frames)]
+    command += keyframe_params(forced, fps)
+    command += ['-f', 'segment', '-segment_format', 'mp4', '-reset_timestamps', '1']
+    if boundaries:
+        command += ['-segment_frames', ','.join(str(index) for index in boundaries)]
+    return command
+
+def reencode_chunk(path, output_path, codec, fps=30, preset='medium', crf=23, keyframes=()):
+    """Encode ulang satu potongan dengan codec (keyframes relatif terhadap awal potongan)."""
+    command = [
+        get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+        '-i', path, '-map', '0:v', '-an',
+    ] + encoder_args(codec, preset, crf) + ['-pix_fmt', 'yuv420p', '-r', str(fps)]
+    command += keyframe_params(keyframes, fps) + [output_path]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Encode ulang potongan {path} gagal: {result.stderr.strip()[-500:]}")
+
+def encode_chunks_resumable(encode_from, codecs, work_dir, frame_count, fps, chunk_seconds=2, keyframes=(),
+                            prefix='chunk', preset='medium', crf=23):
+    """Encode frame_count frame sebagai potongan MP4 dengan fallback encoder yang bisa dilanjutkan.
+
+    encode_from(codec, first_frame, output_pattern, ffmpeg_params) meng-encode
+    frame first_frame..akhir ke pola file potongan dan raise jika gagal. Jika
+    encoder gagal di tengah jalan, potongan yang sudah lengkap dipertahankan
+    dan hanya sisa frame yang di-encode ulang dengan encoder berikutnya.
+    Potongan ditulis ke work_dir sebagai <prefix>_<percobaan>_<nomor>.mp4.
+
+    Potongan dari encoder berbeda (mis. h264_nvenc dan libx264) punya SPS/PPS
+    dan profil berbeda; banyak player gagal di batasnya jika digabung dengan
+    stream copy. Jadi potongan lama di-encode ulang (dari hasil decode-nya,
+    bukan render ulang) dengan encoder terakhir, dengan preset dan crf yang sama.
+    Return (path potongan berurutan, encoder yang dipakai).
+    """
+    chunk_frames = int(fps * chunk_seconds)
+    chunk_paths = []
+    chunk_codecs = []
+    used_codecs = []
+    start_frame = 0
+    last_error = None
+
+    for attempt, codec in enumerate(codecs):
+        pattern = os.path.join(work_dir, f"{prefix}_{attempt}_%05d.mp4")
+        try:
+            encode_from(codec, start_frame, pattern,
+                        chunk_params(start_frame, frame_count, fps, chunk_seconds, keyframes))
+            written = sorted(glob.glob(os.path.join(work_dir, f"{prefix}_{attempt}_*.mp4")))
+            chunk_paths += written
+            chunk_codecs += [codec] * len(written)
+            used_codecs.append(codec)
+            break
+        except Exception as e:
+            last_error = e
+            # Potongan terakhir mungkin belum lengkap: buang dan ulangi dari awalnya
+            written = sorted(glob.glob(os.path.join(work_dir, f"{prefix}_{attempt}_*.mp4")))
+            complete = written[:-1]
+            for path in written[-1:]:
+                os.remove(path)
+            if complete:
+                chunk_paths += complete
+                chunk_codecs += [codec] * len(complete)
+                used_codecs.append(codec)
+            start_frame += len(complete) * chunk_frames
+            print(f"Encoder {codec} failed at frame {start_frame}/{frame_count}: {e}")
+    else:
+        raise RuntimeError(f"Semua encoder gagal: {last_error}")
+
+    if start_frame > 0 and len(used_codecs) > 1:
+        print(f"Resumed from frame {start_frame} with {used_codecs[-1]}, kept {start_frame} frames from {used_codecs[0]}")
+
+    final_codec = used_codecs[-1]
+    mixed = [index for index, codec in enumerate(chunk_codecs) if codec != final_codec]
+    for index in mixed:
+        first = index * chunk_frames
+        output_path = os.path.join(work_dir, f"{prefix}_reencoded_{index:05d}.mp4")
+        reencode_chunk(
+            chunk_paths[index], output_path, final_codec, fps, preset, crf,
+            [frame - first for frame in keyframes if first < frame < first + chunk_frames]
+        )
+        chunk_paths[index] = output_path
+    if mixed:
+        print(f"Re-encoded {len(mixed)} chunk(s) with {final_codec} so the stream-copy join uses one encoder")
+    return chunk_paths, used_codecs
+
+def write_clip_resumable(clip, output_path, codecs, work_dir, fps=30, preset='medium', crf=23,
+                         audio_path=None, audio_codec='copy', workers=None,
+                         queue_depth=DEFAULT_QUEUE_DEPTH, chunk_seconds=2, keyframes=()):
+    """Render clip MoviePy dengan fallback encoder yang bisa dilanjutkan (lihat encode_chunks_resumable).
+
+    Potongan digabung dengan stream copy dan audio di-mux sekali.
+    Return encoder yang dipakai (list, urut).
+    """
+    # Import di sini untuk menghindari import melingkar dengan segment_renderer
+    from services.segment_renderer import concat_segments
+
+    frame_count = int(round(clip.duration * fps))
+
+    def encode_from(codec, first_frame, pattern, ffmpeg_params):
+        writer = FrameWriter(
+            pattern, clip.size, fps=fps, codec=codec, preset=preset, crf=crf,
+            duration=(frame_count - first_frame) / fps, queue_depth=queue_depth, workers=workers,
+            ffmpeg_params=ffmpeg_params
+        )
+        writer.write_frames(clip.get_frame, frame_count, first_frame=first_frame)
+
+    chunk_paths, used_codecs = encode_chunks_resumable(
+        encode_from, codecs, work_dir, frame_count, fps, chunk_seconds, keyframes, preset=preset, crf=crf
+    )
+    concat_segments(
+        chunk_paths, audio_path, output_path, clip.duration,
+        os.path.join(work_dir, 'chunks.txt'), audio_codec
+    )
+    return used_codecs
@@ -0,0 +1,120 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from config import Config
+from services.disk_cache import DiskCache, file_digest
+
+# Naikkan jika cara normalisasi berubah agar entri lama tidak dipakai
+CACHE_VERSION = 1
+
+def normalize_image(img_path, size=(1280, 720)):
+    """Decode gambar lalu resize ke tinggi target dan crop tengah ke lebar target.
+
+    Sama dengan ImageClip(...).resize(height=720) + crop tengah di MoviePy.
+    Gambar yang lebih sempit dari target dibiarkan (dipusatkan saat compose).
+    """
+    target_w, target_h = size
+    with Image.open(img_path) as img:
+        src_w, src_h = img.size
+        new_w = max(1, round(src_w * target_h / src_h))
+
+        # JPEG besar: decode langsung pada skala 1/2, 1/4 atau 1/8
+        if img.format == 'JPEG':
+            img.draft('RGB', (new_w, target_h))
+
+        img = img.convert('RGB')
+        if img.size != (new_w, target_h):
+            img = img.resize((new_w, target_h), Image.LANCZOS)
+
+        if new_w > target_w:
+            left = (new_w - target_w) // 2
+            img = img.crop((left, 0, left + target_w, target_h))
+
+        return np.asarray(img, dtype=np.uint8)
+
+class ImageCache(DiskCache):
+    """Cache frame RGB ternormalisasi (.npy memory-mapped) berbasis hash konten.
+
+    Kunci = hash isi file + ukuran target, sehingga render ulang, render
+    fallback dan session lain dengan gambar yang sama tidak decode/resize lagi.
+    Entri dihapus berdasarkan waktu akses terlama jika total ukuran melebihi
+    batas (lihat DiskCache).
+    """
+
+    extension = '.npy'
+    label = 'Image cache'
+
+    def __init__(self, cache_folder=None, max_bytes=None, size=(1280, 720)):
+        super().__init__(
+            cache_folder or Config.IMAGE_CACHE_FOLDER,
+            max_bytes if max_bytes is not None else Config.IMAGE_CACHE_MAX_BYTES
+        )
+        self.size = tuple(size)
+
+    def cache_key(self, img_path):
+        """Hash isi file + ukuran target."""
+        digest = file_digest(img_path)
+        digest.update(f"{self.size[0]}x{self.size[1]}v{CACHE_VERSION}".encode())
+        return digest.hexdigest()
+
+    def get(self, img_path):
+        """Ambil frame dari cache (memmap read-only) atau None jika belum ada."""
+        return self._get_entry(self.cache_key(img_path))
+
+    def _get_entry(self, key):
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            array = np.load(path, mmap_mode='r')
+            self._touch(path)
+            return array
+        except Exception as e:
+            print(f"Warning: Corrupt image cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+    def load(self, img_path):
+        """Ambil frame ternormalisasi; decode dan simpan ke cache jika belum ada."""
+        key = self.cache_key(img_path)
+        cached = self._get_entry(key)
+        if cached is not None:
+            return cached
+
+        array = normalize_image(img_path, self.size)
+        try:
+            self._write_entry(key, lambda tmp_path: self._write_array(tmp_path, array))
+        except Exception as e:
+            print(f"Warning: Failed to write image cache for {img_path}: {e}")
+        return array
+
+    def prefetch(self, image_paths, max_workers=None, keep_arrays=True):
+        """Decode & normalisasi semua gambar secara paralel sebelum render.
+
+        keep_arrays=False hanya mengisi cache disk tanpa menahan array di
+        memori (untuk timeline panjang yang klipnya dibuat lazy).
+        """
+        max_workers = max_workers or min(8, os.cpu_count() or 1)
+        load = self._safe_load if keep_arrays else self._safe_warm
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            arrays = list(executor.map(load, image_paths))
+        loaded = sum(1 for array in arrays if array is not None)
+        print(f"Image cache ready: {loaded}/{len(image_paths)} images normalized")
+        return dict(zip(image_paths, arrays)) if keep_arrays else loaded
+
+    def _safe_load(self, img_path):
+        try:
+            return self.load(img_path)
+        except Exception as e:
+            print(f"Warning: Failed to normalize image {img_path}: {e}")
+            return None
+
+    def _safe_warm(self, img_path):
+        return True if self._safe_load(img_path) is not None else None
+
+    def _write_array(self, tmp_path, array):
+        mapped = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=array.shape)
+        mapped[:] = array
+        mapped.flush()
+        del mapped
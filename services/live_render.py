@@ -0,0 +1,172 @@
+import os
+import time
+import uuid
+import threading
+import subprocess
+from config import Config
+from services.ffmpeg_backend import get_ffmpeg_binary
+
+# MP4 terfragmentasi: moov kosong di awal, lalu satu fragmen (moof+mdat) per
+# keyframe, sehingga bagian yang sudah di-encode langsung bisa diputar
+FRAGMENT_MOVFLAGS = 'frag_keyframe+empty_moov+default_base_moof'
+
+# Job yang selesai lebih lama dari ini dihapus dari registry
+FINISHED_JOB_TTL = 3600
+
+# Session ID yang dikeluarkan tapi tidak pernah dipakai /generate dihapus setelah ini
+ISSUED_SESSION_TTL = 600
+
+def fragment_params(fps):
+    """Argumen ffmpeg untuk output MP4 terfragmentasi dengan fragmen tiap LIVE_FRAGMENT_SECONDS."""
+    gop = max(1, int(round(fps * Config.LIVE_FRAGMENT_SECONDS)))
+    return ['-g', str(gop), '-movflags', FRAGMENT_MOVFLAGS]
+
+class LiveRender:
+    """Status satu job yang bisa ditonton selagi dirender."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.path = None
+        self.status = 'pending'  # pending -> rendering -> done / failed
+        self.output_url = None
+        self.finished_at = None
+        self.issued_at = time.time()
+        self.claimed = False
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def bytes_written(self):
+        if self.path and os.path.exists(self.path):
+            return os.path.getsize(self.path)
+        return 0
+
+    def to_dict(self):
+        return {
+            'session_id': self.session_id,
+            'status': self.status,
+            'bytes_written': self.bytes_written(),
+            'output_url': self.output_url,
+        }
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def _expire_jobs(now):
+    for key, job in list(_jobs.items()):
+        if job.finished and now - job.finished_at > FINISHED_JOB_TTL:
+            del _jobs[key]
+        elif not job.claimed and now - job.issued_at > ISSUED_SESSION_TTL:
+            del _jobs[key]
+
+def register(session_id):
+    """Daftarkan job baru untuk session_id dari server (status pending sampai render dimulai)."""
+    with _jobs_lock:
+        _expire_jobs(time.time())
+        job = LiveRender(session_id)
+        job.claimed = True
+        _jobs[session_id] = job
+    return job
+
+def issue():
+    """Buat session ID baru di server sebelum /generate dipanggil.
+
+    Browser butuh ID lebih awal untuk membuka /watch/<session_id>; ID ini
+    hanya bisa dipakai sekali lewat claim() dan kedaluwarsa jika tidak dipakai.
+    """
+    with _jobs_lock:
+        _expire_jobs(time.time())
+        job = LiveRender(str(uuid.uuid4()))
+        _jobs[job.session_id] = job
+    return job
+
+def claim(session_id):
+    """Tandai session ID dari issue() sebagai terpakai; False jika tidak dikenal atau sudah dipakai."""
+    with _jobs_lock:
+        job = _jobs.get(session_id)
+        if not job or job.claimed or job.status != 'pending':
+            return False
+        job.claimed = True
+        return True
+
+def get(session_id):
+    with _jobs_lock:
+        return _jobs.get(session_id)
+
+def start(session_id):
+    """Tandai render dimulai; return path file terfragmentasi yang akan ditulis."""
+    job = get(session_id) or register(session_id)
+    os.makedirs(Config.LIVE_RENDER_FOLDER, exist_ok=True)
+    job.path = os.path.join(Config.LIVE_RENDER_FOLDER, f"live_{session_id}.mp4")
+    job.status = 'rendering'
+    return job.path
+
+def finish(session_id, success, output_url=None):
+    """Tandai render selesai dan hapus file live.
+
+    Penonton yang sedang membaca file tetap bisa menyelesaikan streaming
+    (file sudah terbuka); penonton baru diarahkan ke output_url.
+    """
+    job = get(session_id)
+    if not job or job.finished:
+        return
+    job.status = 'done' if success else 'failed'
+    job.output_url = output_url if success else None
+    job.finished_at = time.time()
+    if job.path and os.path.exists(job.path):
+        try:
+            os.remove(job.path)
+        except OSError as e:
+            print(f"Warning: Could not remove live render file {job.path}: {e}")
+
+def remux_to_mp4(live_path, output_path, duration=None):
+    """Ubah MP4 terfragmentasi menjadi MP4 biasa (stream copy) untuk seek dan unduhan."""
+    command = [
+        get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+        '-i', live_path, '-map', '0', '-c', 'copy',
+        '-movflags', '+faststart',
+    ]
+    if duration:
+        command += ['-t', f"{duration:.3f}"]
+    command.append(output_path)
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Remux live render gagal: {result.stderr.strip()[-500:]}")
+
+def follow(job, chunk_size=256 * 1024, poll_interval=0.5):
+    """Generator isi file live yang terus bertambah, sampai render selesai.
+
+    Berhenti jika file tidak bertambah selama LIVE_IDLE_TIMEOUT detik
+    (mis. proses render mati tanpa memanggil finish).
+    """
+    idle_since = time.time()
+    handle = None
+    try:
+        while handle is None:
+            if job.path and os.path.exists(job.path):
+                handle = open(job.path, 'rb')
+            elif job.finished or time.time() - idle_since > Config.LIVE_IDLE_TIMEOUT:
+                return
+            else:
+                time.sleep(poll_interval)
+
+        while True:
+            chunk = handle.read(chunk_size)
+            if chunk:
+                idle_since = time.time()
+                yield chunk
+                continue
+            if job.finished:
+                # Sisa data yang ditulis sebelum finish
+                rest = handle.read()
+                if rest:
+                    yield rest
+                return
+            if time.time() - idle_since > Config.LIVE_IDLE_TIMEOUT:
+                print(f"Live render {job.session_id}: no new data for {Config.LIVE_IDLE_TIMEOUT}s, closing stream")
+                return
+            time.sleep(poll_interval)
+    finally:
+        if handle:
+            handle.close()
@@ -0,0 +1,52 @@
+import os
+import resource
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def current_rss_bytes():
+    """RSS proses saat ini (dari /proc, fallback ke puncak getrusage)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+def peak_rss_bytes():
+    """Puncak RSS proses sejak start (ru_maxrss dalam KB di Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class MemoryLimitExceeded(MemoryError):
+    """RSS tetap di atas batas walaupun semua klip yang bisa dilepas sudah dilepas."""
+
+class MemoryBudget:
+    """Batas keras RSS untuk satu render.
+
+    check() dipanggil sebelum materi baru dimuat. Jika RSS di atas batas,
+    release() dipanggil untuk melepas semua yang bisa dilepas; jika masih
+    di atas batas, render dihentikan dengan MemoryLimitExceeded daripada
+    proses worker dibunuh OOM killer.
+
+    Batas hanya berlaku sejauh check() dipanggil: TimelineCompositor
+    memanggilnya saat membuat klip dan setiap MEMORY_CHECK_FRAMES frame
+    selama encode, jadi RSS bisa melewati batas di antara dua pemeriksaan.
+    Memori proses ffmpeg (encoder) tidak ikut dihitung.
+    """
+
+    def __init__(self, limit_bytes):
+        self.limit_bytes = limit_bytes
+        self.peak_bytes = 0
+
+    def check(self, release=None):
+        rss = current_rss_bytes()
+        self.peak_bytes = max(self.peak_bytes, rss)
+        if not self.limit_bytes or rss <= self.limit_bytes:
+            return rss
+        if release:
+            release()
+            rss = current_rss_bytes()
+        if rss > self.limit_bytes:
+            raise MemoryLimitExceeded(
+                f"RSS {rss / (1024 * 1024):.0f} MB melebihi batas render "
+                f"{self.limit_bytes / (1024 * 1024):.0f} MB"
+            )
+        return rss
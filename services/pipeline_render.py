@@ -0,0 +1,145 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from services import audio_service, segment_renderer
+from services.encoder_registry import registry
+from services.workspace import RenderWorkspace
+
+def _worker_ready(_):
+    return os.getpid()
+
+class PipelinedRender:
+    """Render segmen per gambar selagi gambar berikutnya masih diunduh.
+
+    Jumlah gambar dan durasi audio diketahui sebelum unduhan dimulai, jadi
+    posisi (frame) dan efek setiap gambar di timeline sudah pasti. Segmen
+    gambar ke-N mulai dirender begitu gambar N tersedia (image_ready);
+    finish() menunggu segmen terakhir lalu menggabungkan semua segmen dan
+    mux audio sekali. Segmen MoviePy mandiri (crossfade = fade dari/ke
+    hitam di dalam klip), jadi hasilnya sama dengan backend 'segments'.
+    """
+
+    def __init__(self, image_paths, audio_path, audio_duration, effects_config, render_options=None,
+                 use_gpu=False, use_cache=True):
+        # Import di sini untuk menghindari import melingkar dengan video_service
+        from services.video_service import build_render_plan
+
+        render_options = render_options or {}
+        self.plan = build_render_plan(image_paths, audio_path, audio_duration, effects_config, render_options)
+        self.use_cache = use_cache
+        self.workspace = RenderWorkspace('pipeline_')
+        self.jobs = segment_renderer.build_segment_jobs(
+            [[segment] for segment in self.plan.segments], self.workspace.path,
+            fps=self.plan.fps, size=self.plan.size, zoom_quality=self.plan.zoom_quality,
+            codecs=registry.fallback_chain(use_gpu),
+            still_fast_path=render_options.get('still_fast_path', True),
+            preset=self.plan.preset, crf=self.plan.crf
+        )
+        self.futures = {}
+        self.failed = set()
+        self.cached = set()
+        self.started_at = time.time()
+        self._max_workers = render_options.get('workers') or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+        # Worker di-fork sebelum ffmpeg audio berjalan: worker yang di-fork sesudahnya
+        # ikut memegang pipe stdout/stderr ffmpeg sehingga prepare_audio tidak pernah selesai
+        list(self._executor.map(_worker_ready, range(self._max_workers)))
+        # Audio disiapkan (stream copy / satu kali transcode AAC) selagi unduhan berjalan
+        self._io = ThreadPoolExecutor(max_workers=1)
+        self._audio = self._io.submit(audio_service.prepare_audio, audio_path, self.workspace.path)
+        self._closed = False
+        print(f"Pipelined render: {len(self.jobs)} segments planned for {self.plan.duration:.2f}s of audio")
+
+    def image_ready(self, index, path):
+        """Callback sistem antrian: gambar index selesai (path None jika gagal).
+
+        Segmen memakai path yang dilaporkan, bukan path yang diperkirakan saat plan dibuat.
+        """
+        if self._closed or not 0 <= index < len(self.jobs):
+            return
+        if path is None:
+            self.failed.add(index)
+            return
+        self.plan.segments[index]['image'] = path
+        self._submit(index)
+
+    def _submit(self, index):
+        job = self.jobs[index]
+        job['segments'] = [self.plan.segments[index]]
+        if self.use_cache and not segment_renderer.fetch_cached_segments([job]):
+            self.cached.add(index)
+            return
+        self.futures[index] = self._executor.submit(segment_renderer.render_segment_job, dict(job))
+
+    def _mark_unreported(self):
+        """Gambar yang tidak pernah dilaporkan image_ready dianggap gagal.
+
+        Terjadi jika sistem antrian berhenti lebih awal (error, kuota habis);
+        tanpa ini file segmennya tidak pernah ada dan concat gagal.
+        """
+        reported = set(self.futures) | self.cached | self.failed
+        missing = [index for index in range(len(self.jobs)) if index not in reported]
+        if missing:
+            print(f"Pipelined render: {len(missing)} image(s) never reported, filling their segments")
+            self.failed.update(missing)
+
+    def _fill_failed(self):
+        """Gambar gagal diganti gambar berhasil terdekat (sebelumnya, lalu sesudahnya)."""
+        available = [i for i in range(len(self.jobs)) if i not in self.failed]
+        if not available:
+            return False
+        for index in sorted(self.failed):
+            previous = [i for i in available if i < index]
+            substitute = previous[-1] if previous else min(available)
+            self.plan.segments[index]['image'] = self.plan.segments[substitute]['image']
+            print(f"Image {index + 1} missing, reusing image {substitute + 1} for its segment")
+            self._submit(index)
+        self.failed.clear()
+        return True
+
+    def finish(self, output_path):
+        """Tunggu semua segmen, gabungkan dengan stream copy dan mux audio."""
+        try:
+            self._mark_unreported()
+            if not self._fill_failed():
+                return False, "Tidak ada gambar yang berhasil diunduh."
+
+            waited_at = time.time()
+            cache = segment_renderer.get_segment_cache()
+            # Segmen dari cache selalu dibuat encoder utama (store_segment)
+            job_codecs = [job['codecs'][0] for job in self.jobs]
+            for index, future in sorted(self.futures.items()):
+                job_codecs[index] = future.result()
+                if self.use_cache:
+                    segment_renderer.store_segment(cache, self.jobs[index], job_codecs[index])
+            print(f"Pipelined render: waited {time.time() - waited_at:.1f}s for remaining segments after last "
+                  f"image ({len(self.futures)} rendered, {len(self.cached)} from cache, "
+                  f"{', '.join(sorted(set(job_codecs)))})")
+            # Audio ditunggu sebelum unify: pool re-render di-fork saat ffmpeg audio sudah selesai
+            try:
+                audio_path, audio_codec = self._audio.result(), 'copy'
+            except Exception as e:
+                print(f"Audio preparation failed, encoding original upload during mux: {e}")
+                audio_path, audio_codec = self.plan.audio['path'], 'aac'
+            segment_renderer.unify_segment_encoders(self.jobs, job_codecs, self._max_workers)
+            self.workspace.check()
+
+            segment_renderer.concat_segments(
+                [job['output_path'] for job in self.jobs], audio_path, output_path,
+                self.plan.duration, self.workspace.file('segments.txt'), audio_codec
+            )
+            return True, f"Video berhasil dibuat dari {len(self.jobs)} segmen (render selagi gambar diunduh)."
+        except Exception as e:
+            print(f"Error in pipelined render: {e}")
+            return False, f"Render pipeline gagal: {str(e)}"
+        finally:
+            self.close()
+
+    def close(self):
+        """Hentikan worker dan hapus file segmen (aman dipanggil berulang)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._io.shutdown(wait=True)
+        self.workspace.cleanup()
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+
+# Naikkan jika format file plan berubah secara tidak kompatibel
+PLAN_VERSION = 1
+
+PLAN_FILENAME = 'render_plan.json'
+PREVIEW_PLAN_FILENAME = 'render_plan_preview.json'
+
+SEGMENT_FIELDS = ('image', 'frames', 'effect', 'fade_in', 'fade_out')
+SETTING_FIELDS = ('fps', 'size', 'zoom_quality', 'preset', 'crf')
+
+class RenderPlan:
+    """Edit decision list satu video: gambar, durasi (frame), efek dan transisi.
+
+    Plan dibuat sekali (lihat video_service.build_render_plan), disimpan
+    sebagai JSON di samping gambar session, lalu bisa dirender oleh backend
+    mana pun, di proses atau mesin lain, tanpa memilih ulang efek. Segmen
+    memakai format yang sama dengan timeline lama (plan_segments).
+    """
+
+    def __init__(self, segments, audio=None, fps=30, size=(1280, 720), zoom_quality='balanced',
+                 preset='medium', crf=23, effects_config=None, created_at=None):
+        self.segments = [dict(segment) for segment in segments]
+        self.audio = dict(audio or {})
+        self.fps = fps
+        self.size = tuple(size)
+        self.zoom_quality = zoom_quality
+        self.preset = preset
+        self.crf = crf
+        self.effects_config = dict(effects_config or {})
+        self.created_at = created_at or time.strftime('%Y-%m-%dT%H:%M:%S')
+
+    @property
+    def total_frames(self):
+        return sum(segment['frames'] for segment in self.segments)
+
+    @property
+    def duration(self):
+        """Durasi output: durasi audio, atau total frame jika audio tidak diketahui."""
+        return self.audio.get('duration') or self.total_frames / self.fps
+
+    @property
+    def images(self):
+        return [segment['image'] for segment in self.segments]
+
+    def to_dict(self):
+        return {
+            'version': PLAN_VERSION,
+            'created_at': self.created_at,
+            'fps': self.fps,
+            'size': list(self.size),
+            'zoom_quality': self.zoom_quality,
+            'preset': self.preset,
+            'crf': self.crf,
+            'audio': self.audio,
+            'effects_config': self.effects_config,
+            'segments': [
+                {field: segment.get(field) for field in SEGMENT_FIELDS}
+                for segment in self.segments
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        version = data.get('version')
+        if version != PLAN_VERSION:
+            raise ValueError(f"Versi render plan tidak didukung: {version}")
+        segments = data.get('segments') or []
+        for index, segment in enumerate(segments):
+            missing = [field for field in ('image', 'frames', 'effect') if field not in segment]
+            if missing:
+                raise ValueError(f"Segmen {index} tidak lengkap: {', '.join(missing)}")
+        return cls(
+            segments,
+            audio=data.get('audio'),
+            fps=data.get('fps', 30),
+            size=data.get('size', (1280, 720)),
+            zoom_quality=data.get('zoom_quality', 'balanced'),
+            preset=data.get('preset', 'medium'),
+            crf=data.get('crf', 23),
+            effects_config=data.get('effects_config'),
+            created_at=data.get('created_at'),
+        )
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+
+    def save(self, path):
+        """Tulis plan ke path (atomik: tulis file sementara lalu rename)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def copy(self, **changes):
+        """Salinan plan dengan sebagian pengaturan diganti (mis. size, fps, audio)."""
+        data = self.to_dict()
+        data.update(changes)
+        if 'size' in changes:
+            data['size'] = list(changes['size'])
+        return RenderPlan.from_dict(data)
+
+    def rescaled(self, fps):
+        """Plan yang sama pada fps lain; batas segmen dibulatkan kumulatif tanpa drift."""
+        segments = []
+        source_end = 0
+        previous_end = 0
+        for segment in self.segments:
+            source_end += segment['frames']
+            frame_end = int(round(source_end * fps / self.fps))
+            segments.append(dict(segment, frames=frame_end - previous_end))
+            previous_end = frame_end
+        plan = self.copy(fps=fps)
+        plan.segments = segments
+        return plan
+
+    def diff(self, other):
+        """Perbedaan plan ini dengan other: pengaturan dan indeks segmen yang berubah."""
+        mine, theirs = self.to_dict(), other.to_dict()
+        settings = {
+            field: (mine[field], theirs[field])
+            for field in SETTING_FIELDS + ('audio',)
+            if mine[field] != theirs[field]
+        }
+        changed = [
+            index for index, (a, b) in enumerate(zip(mine['segments'], theirs['segments']))
+            if a != b
+        ]
+        return {
+            'settings': settings,
+            'changed_segments': changed,
+            'added_segments': max(0, len(theirs['segments']) - len(mine['segments'])),
+            'removed_segments': max(0, len(mine['segments']) - len(theirs['segments'])),
+        }
+
+def plan_path(image_folder, preview=False):
+    """Lokasi file plan di folder gambar session."""
+    return os.path.join(image_folder, PREVIEW_PLAN_FILENAME if preview else PLAN_FILENAME)
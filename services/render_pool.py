@@ -0,0 +1,217 @@
+import os
+import queue
+import atexit
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future
+from config import Config
+from services.encoder_registry import registry as encoder_registry
+
+# Di-import sekali di proses forkserver; setiap worker di-fork dari proses
+# itu sehingga MoviePy/NumPy/PIL sudah termuat saat worker mulai
+PRELOAD_MODULES = ['services.video_service']
+
+# Interval cek worker yang mati tanpa pamit (crash, OOM killer)
+MONITOR_INTERVAL = 1.0
+
+def _worker_main(worker_id, tasks, results, capabilities, max_jobs, max_rss_bytes):
+    """Loop worker: ambil (job_id, plan, ...) dari tasks, render, kirim hasil ke results."""
+    from services import video_service
+    from services.render_plan import RenderPlan
+    from services.memory_budget import current_rss_bytes
+
+    # Hasil probe encoder dari proses web; tidak perlu menjalankan ffmpeg lagi
+    encoder_registry.preload(capabilities)
+    results.put(('ready', worker_id, os.getpid(), None))
+
+    jobs_done = 0
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, plan_data, output_path, use_gpu, render_options = task
+        results.put(('started', worker_id, job_id, None))
+        try:
+            result = video_service.render_plan(RenderPlan.from_dict(plan_data), output_path, use_gpu, render_options)
+        except Exception as e:
+            result = (False, f"Render worker error: {e}")
+        jobs_done += 1
+        results.put(('done', worker_id, job_id, tuple(result)))
+
+        rss = current_rss_bytes()
+        if jobs_done >= max_jobs or (max_rss_bytes and rss > max_rss_bytes):
+            results.put(('retired', worker_id, os.getpid(),
+                         f"{jobs_done} job(s), RSS {rss / (1024 * 1024):.0f} MB"))
+            break
+
+class RenderPool:
+    """Pool proses render yang hidup lama dan menerima RenderPlan.
+
+    Worker di-fork dari forkserver yang sudah meng-import modul render,
+    memakai hasil probe encoder dari proses web, lalu merender plan satu
+    per satu. Worker berhenti sendiri setelah max_jobs job atau jika RSS
+    melewati max_rss_bytes, dan langsung diganti worker baru. Worker yang
+    mati di tengah job membuat job itu gagal (bukan menggantung).
+    """
+
+    def __init__(self, size, max_jobs=20, max_rss_bytes=0):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_bytes
+        self.jobs_completed = 0
+        self.workers_started = 0
+        self._ctx = None
+        self._tasks = None
+        self._results = None
+        self._workers = {}    # worker_id -> Process
+        self._assigned = {}   # worker_id -> job_id yang sedang dikerjakan
+        self._futures = {}    # job_id -> Future
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._monitor = None
+
+    def start(self):
+        self._ctx = multiprocessing.get_context('forkserver')
+        self._ctx.set_forkserver_preload(PRELOAD_MODULES)
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._capabilities = encoder_registry.probe()
+        for worker_id in range(self.size):
+            self._spawn(worker_id)
+        self._monitor = threading.Thread(target=self._monitor_loop, name='render-pool-monitor', daemon=True)
+        self._monitor.start()
+        print(f"Render pool started: {self.size} worker(s), recycle after {self.max_jobs} job(s) "
+              f"or {self.max_rss_bytes / (1024 * 1024):.0f} MB RSS")
+        return self
+
+    def _spawn(self, worker_id):
+        # Bukan daemon: worker boleh membuat pool sendiri (render segmen / frame paralel)
+        process = self._ctx.Process(
+            target=_worker_main, name=f"render-worker-{worker_id}",
+            args=(worker_id, self._tasks, self._results, self._capabilities, self.max_jobs, self.max_rss_bytes)
+        )
+        process.start()
+        self._workers[worker_id] = process
+        self.workers_started += 1
+
+    def submit(self, plan, output_path, use_gpu=False, render_options=None):
+        """Antrekan RenderPlan; return Future berisi (success, message)."""
+        if self._stopping:
+            raise RuntimeError("Render pool sudah dihentikan.")
+        future = Future()
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._futures[job_id] = future
+        self._tasks.put((job_id, plan.to_dict(), output_path, use_gpu, dict(render_options or {})))
+        return future
+
+    def _finish_job(self, job_id, result):
+        with self._lock:
+            future = self._futures.pop(job_id, None)
+            self.jobs_completed += 1
+        if future and not future.done():
+            future.set_result(result)
+
+    def _handle(self, message):
+        kind, worker_id, value, detail = message
+        if kind == 'started':
+            self._assigned[worker_id] = value
+        elif kind == 'done':
+            self._assigned.pop(worker_id, None)
+            self._finish_job(value, detail)
+        elif kind == 'retired':
+            print(f"Render worker {worker_id} (pid {value}) recycled after {detail}")
+            # Pengganti langsung dibuat agar job berikutnya tidak menunggu
+            process = self._workers[worker_id]
+            process.join(timeout=5)
+            if not self._stopping and not process.is_alive():
+                self._spawn(worker_id)
+
+    def _monitor_loop(self):
+        while not self._stopping:
+            try:
+                self._handle(self._results.get(timeout=MONITOR_INTERVAL))
+            except queue.Empty:
+                pass
+            except (EOFError, OSError):
+                break
+
+            # Worker yang keluar (recycle atau crash) diganti di sini
+            for worker_id, process in list(self._workers.items()):
+                if process.is_alive() or self._stopping:
+                    continue
+                # Pesan terakhir worker sudah di pipe sebelum proses keluar
+                try:
+                    while True:
+                        self._handle(self._results.get_nowait())
+                except queue.Empty:
+                    pass
+                if self._workers[worker_id] is not process:
+                    continue  # sudah diganti saat pesan 'retired' diproses
+                job_id = self._assigned.pop(worker_id, None)
+                if job_id is not None:
+                    print(f"Render worker {worker_id} died (exit code {process.exitcode}) during job {job_id}")
+                    self._finish_job(job_id, (False, f"Worker render berhenti tiba-tiba (exit code {process.exitcode})."))
+                process.join()
+                self._spawn(worker_id)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._futures)
+        return {
+            'size': self.size,
+            'alive': sum(1 for process in self._workers.values() if process.is_alive()),
+            'busy': len(self._assigned),
+            'pending_jobs': pending,
+            'jobs_completed': self.jobs_completed,
+            'workers_started': self.workers_started,
+        }
+
+    def stop(self, timeout=10):
+        if self._stopping:
+            return
+        self._stopping = True
+        for _ in self._workers:
+            self._tasks.put(None)
+        for process in self._workers.values():
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+        with self._lock:
+            futures, self._futures = list(self._futures.values()), {}
+        for future in futures:
+            if not future.done():
+                future.set_result((False, "Render pool dihentikan sebelum job selesai."))
+
+_pool = None
+
+def start_pool(size=None, max_jobs=None, max_rss_bytes=None):
+    """Jalankan pool bersama (dipanggil sekali saat app dibuat).
+
+    Tanpa forkserver (Windows) pool tidak dijalankan dan render tetap di proses web.
+    """
+    global _pool
+    if _pool is None and 'forkserver' not in multiprocessing.get_all_start_methods():
+        print("Warning: Render pool needs the 'forkserver' start method, rendering in the web process")
+        return None
+    if _pool is None:
+        _pool = RenderPool(
+            size if size is not None else Config.RENDER_POOL_SIZE,
+            max_jobs=max_jobs or Config.RENDER_POOL_MAX_JOBS,
+            max_rss_bytes=max_rss_bytes if max_rss_bytes is not None else Config.RENDER_POOL_MAX_RSS_BYTES
+        ).start()
+        atexit.register(_pool.stop)
+    return _pool
+
+def get_pool():
+    return _pool
+
+def render_plan(plan, output_path, use_gpu=False, render_options=None):
+    """Render plan di pool worker jika pool berjalan, selain itu di proses ini."""
+    if _pool is None:
+        from services import video_service
+        return video_service.render_plan(plan, output_path, use_gpu, render_options)
+    print(f"Submitting render plan to worker pool: {os.path.basename(output_path)}")
+    return _pool.submit(plan, output_path, use_gpu, render_options).result()
@@ -0,0 +1,153 @@
+"""Rendition (tangga resolusi) dan paket HLS yang diturunkan dari video master.
+
+Rendition di-decode dari file master yang sudah di-encode (lossy), bukan dari
+frame render. Rung yang lebih rendah jadi melewati dua kali encode: artefak
+master ikut di-scale lalu di-encode ulang. Ini sengaja ditukar dengan biaya
+render: efek dan compose hanya dihitung sekali dan setiap backend render
+cukup menghasilkan satu file. Konsekuensi lain:
+/rerender meng-encode ulang seluruh tangga dari master baru, walaupun hanya
+satu gambar yang diganti.
+"""
+import os
+import subprocess
+from services.ffmpeg_backend import get_ffmpeg_binary, encoder_args
+from services.encoder_registry import registry
+
+# Tangga resolusi yang didukung: label -> ukuran kanvas dan bitrate maksimum
+RENDITION_PRESETS = {
+    '1080p': {'size': (1920, 1080), 'max_bitrate': 5000},
+    '720p': {'size': (1280, 720), 'max_bitrate': 2800},
+    '480p': {'size': (854, 480), 'max_bitrate': 1400},
+    '360p': {'size': (640, 360), 'max_bitrate': 800},
+}
+
+DEFAULT_MASTER_SIZE = (1280, 720)
+HLS_SEGMENT_SECONDS = 4
+HLS_AUDIO_BANDWIDTH = 192000
+
+def parse_ladder(labels):
+    """Validasi daftar label rendition, urut dari resolusi tertinggi."""
+    ladder = []
+    for label in labels or []:
+        label = label.strip()
+        if label in RENDITION_PRESETS and label not in ladder:
+            ladder.append(label)
+        elif label:
+            print(f"Warning: Unknown rendition '{label}' ignored")
+    return sorted(ladder, key=lambda label: RENDITION_PRESETS[label]['size'][1], reverse=True)
+
+def master_size(ladder):
+    """Ukuran kanvas render utama: rendition tertinggi (minimal 1280x720).
+
+    Efek dan compose hanya dihitung sekali pada ukuran ini; rendition lain
+    diturunkan dari hasilnya.
+    """
+    sizes = [RENDITION_PRESETS[label]['size'] for label in ladder]
+    return max(sizes + [DEFAULT_MASTER_SIZE], key=lambda size: size[1])
+
+def rendition_path(output_path, label):
+    base, ext = os.path.splitext(output_path)
+    return f"{base}_{label}{ext}"
+
+def hls_folder(output_path):
+    base, _ = os.path.splitext(output_path)
+    return f"{base}_hls"
+
+def _rate_args(label):
+    max_bitrate = RENDITION_PRESETS[label]['max_bitrate']
+    return ['-maxrate', f"{max_bitrate}k", '-bufsize', f"{max_bitrate * 2}k"]
+
+def build_ladder_command(master_path, outputs, fps=30, codec='libx264', preset='medium', crf=23, hls=False):
+    """Satu proses ffmpeg: decode master sekali, split, scale dan encode semua rendition.
+
+    outputs: list (label, path) yang perlu di-encode.
+    """
+    count = len(outputs)
+    graph = [f"[0:v]split={count}" + ''.join(f"[s{i}]" for i in range(count))]
+    for i, (label, _) in enumerate(outputs):
+        width, height = RENDITION_PRESETS[label]['size']
+        graph.append(f"[s{i}]scale={width}:{height}:flags=bicubic,setsar=1,format=yuv420p[v{i}]")
+
+    command = [
+        get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+        '-i', master_path,
+        '-filter_complex', ';'.join(graph),
+    ]
+    for i, (label, path) in enumerate(outputs):
+        command += ['-map', f"[v{i}]", '-map', '0:a?']
+        command += encoder_args(codec, preset, crf) + _rate_args(label)
+        command += ['-r', str(fps), '-c:a', 'copy']
+        if hls:
+            # Keyframe sejajar di semua rendition agar player bisa pindah kualitas
+            gop = fps * HLS_SEGMENT_SECONDS
+            segment_pattern = os.path.join(os.path.dirname(path), f"{label}_%04d.ts")
+            command += [
+                '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0',
+                '-f', 'hls', '-hls_time', str(HLS_SEGMENT_SECONDS),
+                '-hls_playlist_type', 'vod',
+                '-hls_segment_filename', segment_pattern,
+            ]
+        else:
+            command += ['-movflags', '+faststart']
+        command.append(path)
+    return command
+
+def write_master_playlist(folder, ladder):
+    """Tulis master.m3u8 yang menunjuk playlist setiap rendition."""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for label in ladder:
+        width, height = RENDITION_PRESETS[label]['size']
+        bandwidth = RENDITION_PRESETS[label]['max_bitrate'] * 1000 + HLS_AUDIO_BANDWIDTH
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={width}x{height}")
+        lines.append(f"{label}.m3u8")
+    master_path = os.path.join(folder, 'master.m3u8')
+    with open(master_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return master_path
+
+def encode_renditions(master_path, ladder, size, hls=False, use_gpu=False, fps=30, crf=23):
+    """Turunkan semua rendition dari video master dalam satu pass ffmpeg.
+
+    Mode MP4: rendition seukuran master adalah file master itu sendiri,
+    sisanya di-encode bersamaan. Mode HLS: semua rendition di-encode ulang
+    dengan GOP sejajar lalu dibungkus master playlist.
+
+    Return (success, message, outputs) dengan outputs = {label: path}.
+    """
+    if not ladder:
+        return True, "Tidak ada rendition tambahan.", {}
+
+    outputs = {}
+    to_encode = []
+    if hls:
+        folder = hls_folder(master_path)
+        os.makedirs(folder, exist_ok=True)
+        for label in ladder:
+            to_encode.append((label, os.path.join(folder, f"{label}.m3u8")))
+    else:
+        for label in ladder:
+            if RENDITION_PRESETS[label]['size'] == tuple(size):
+                outputs[label] = master_path
+            else:
+                to_encode.append((label, rendition_path(master_path, label)))
+
+    if to_encode:
+        codecs = registry.fallback_chain(use_gpu)
+        last_error = ''
+        for codec in codecs:
+            command = build_ladder_command(master_path, to_encode, fps=fps, codec=codec, crf=crf, hls=hls)
+            print(f"Encoding {len(to_encode)} rendition(s) in one ffmpeg pass ({codec}): "
+                  f"{', '.join(label for label, _ in to_encode)}")
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode == 0:
+                break
+            last_error = result.stderr.strip()[-500:]
+            print(f"Rendition encode with {codec} failed: {last_error}")
+        else:
+            return False, f"Gagal membuat rendition: {last_error}", outputs
+        outputs.update(dict(to_encode))
+
+    if hls:
+        outputs['master'] = write_master_playlist(hls_folder(master_path), ladder)
+
+    return True, f"{len(ladder)} rendition berhasil dibuat.", outputs
@@ -0,0 +1,166 @@
+import os
+import re
+import shutil
+import subprocess
+from services import segment_renderer
+from services.ffmpeg_backend import get_ffmpeg_binary
+from services.encoder_registry import registry
+from services.workspace import RenderWorkspace
+
+def apply_image_changes(timeline, replacements=None, removals=None):
+    """Terapkan penggantian/penghapusan gambar ke timeline segmen.
+
+    replacements: {indeks: path gambar baru}; removals: kumpulan indeks.
+    Frame gambar yang dihapus dibagi ke tetangga sebelum dan sesudahnya,
+    sehingga total durasi tetap sama dan segmen lain tidak berubah.
+
+    Return (timeline baru, daftar 'source' per segmen baru). source berisi
+    indeks segmen lama yang identik atau None jika segmen harus dirender ulang.
+    """
+    replacements = replacements or {}
+    removals = set(removals or [])
+    if len(removals) >= len(timeline):
+        raise ValueError("Tidak bisa menghapus semua gambar dari timeline.")
+
+    new_timeline = []
+    sources = []
+    carry_frames = 0
+    for index, segment in enumerate(timeline):
+        if index in removals:
+            # Setengah untuk segmen sebelumnya, sisanya untuk segmen berikutnya
+            to_previous = segment['frames'] // 2 if new_timeline else 0
+            if new_timeline:
+                new_timeline[-1]['frames'] += to_previous
+                sources[-1] = None
+            carry_frames += segment['frames'] - to_previous
+            continue
+
+        updated = dict(segment)
+        changed = index in replacements
+        if changed:
+            updated['image'] = replacements[index]
+        if carry_frames:
+            updated['frames'] += carry_frames
+            carry_frames = 0
+            changed = True
+        new_timeline.append(updated)
+        sources.append(None if changed else index)
+
+    if carry_frames:
+        # Gambar terakhir dihapus: sisa frame ke segmen terakhir yang tersisa
+        new_timeline[-1]['frames'] += carry_frames
+        sources[-1] = None
+
+    # Crossfade awal/akhir mengikuti posisi baru
+    for position, segment in enumerate(new_timeline):
+        fade_in = position > 0
+        fade_out = position < len(new_timeline) - 1
+        if (segment.get('fade_in'), segment.get('fade_out')) != (fade_in, fade_out):
+            segment['fade_in'] = fade_in
+            segment['fade_out'] = fade_out
+            sources[position] = None
+
+    return new_timeline, sources
+
+def keyframe_indices(video_path, fps=30):
+    """Keyframe video sebagai {indeks frame: pts_time} (hanya keyframe yang di-decode)."""
+    command = [
+        get_ffmpeg_binary(), '-hide_banner', '-skip_frame', 'nokey',
+        '-i', video_path, '-map', '0:v', '-vf', 'showinfo', '-f', 'null', '-'
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    return {
+        int(round(float(match) * fps)): float(match)
+        for match in re.findall(r'pts_time:\s*([\d.]+)', result.stderr)
+    }
+
+def cut_segment(video_path, start_time, frames, output_path, fps=30):
+    """Salin frames frame mulai keyframe pada start_time tanpa re-encode."""
+    # Seek setengah frame setelah keyframe: ffmpeg mundur ke keyframe itu
+    # sendiri, bukan ke keyframe sebelumnya karena pembulatan pts_time
+    command = [
+        get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+        '-ss', f"{start_time + 0.5 / fps:.6f}", '-i', video_path,
+        '-map', '0:v', '-frames:v', str(frames),
+        '-c', 'copy', '-an', '-avoid_negative_ts', 'make_zero',
+        output_path
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Gagal memotong segmen: {result.stderr.strip()[-300:]}")
+
+def rerender_session(video_path, timeline, replacements=None, removals=None, fps=30,
+                     size=(1280, 720), zoom_quality='balanced', use_gpu=False, max_workers=None,
+                     preset='medium', crf=23):
+    """Render ulang hanya segmen yang berubah lalu sambung dengan bagian lama.
+
+    Segmen yang tidak berubah diambil dari cache segmen, atau dipotong dari
+    video lama dengan stream copy jika batasnya jatuh di keyframe (semua
+    writer memaksa keyframe di awal setiap segmen). Sisanya dirender ulang.
+    Audio video lama dipakai apa adanya.
+
+    Return (success, message, timeline baru).
+    """
+    try:
+        new_timeline, sources = apply_image_changes(timeline, replacements, removals)
+    except ValueError as e:
+        return False, str(e), timeline
+
+    codecs = registry.fallback_chain(use_gpu)
+    workspace = RenderWorkspace('rerender_')
+    work_dir = workspace.path
+    try:
+        jobs = segment_renderer.build_segment_jobs(
+            [[segment] for segment in new_timeline], work_dir, fps, size, zoom_quality, codecs,
+            preset=preset, crf=crf
+        )
+        old_starts = []
+        total = 0
+        for segment in timeline:
+            old_starts.append(total)
+            total += segment['frames']
+        keyframes = keyframe_indices(video_path, fps)
+
+        pending_jobs = segment_renderer.fetch_cached_segments(jobs)
+        to_render = []
+        copied = 0
+        for job in pending_jobs:
+            position = jobs.index(job)
+            source = sources[position]
+            start = old_starts[source] if source is not None else None
+            if source is not None and start in keyframes and (
+                    source + 1 == len(timeline) or old_starts[source + 1] in keyframes):
+                try:
+                    cut_segment(video_path, keyframes[start], timeline[source]['frames'], job['output_path'], fps)
+                    copied += 1
+                    continue
+                except Exception as e:
+                    print(f"Stream copy of segment {source} failed, rendering instead: {e}")
+            to_render.append(job)
+
+        reused = len(jobs) - len(pending_jobs)
+        print(f"Incremental render: {reused} cached, {copied} copied from old video, "
+              f"{len(to_render)} re-rendered")
+        rendered = segment_renderer.render_segment_jobs(to_render, max_workers)
+        # Segmen dari cache dan dari video lama dianggap dibuat encoder utama;
+        # jika ada segmen baru yang jatuh ke encoder lain, semuanya dirender ulang
+        rendered_codecs = {job['output_path']: codec for job, codec in zip(to_render, rendered)}
+        segment_renderer.unify_segment_encoders(
+            jobs, [rendered_codecs.get(job['output_path'], codecs[0]) for job in jobs], max_workers
+        )
+        workspace.check()
+
+        tmp_output = os.path.join(work_dir, 'output.mp4')
+        duration = sum(segment['frames'] for segment in new_timeline) / fps
+        segment_renderer.concat_segments(
+            [job['output_path'] for job in jobs], video_path, tmp_output, duration,
+            os.path.join(work_dir, 'segments.txt'), audio_codec='copy'
+        )
+        shutil.move(tmp_output, video_path)
+        return True, (f"Video diperbarui: {len(to_render)} segmen dirender ulang, "
+                      f"{reused + copied} segmen dipakai ulang."), new_timeline
+    except Exception as e:
+        print(f"Error in incremental re-render: {e}")
+        return False, f"Render ulang gagal: {str(e)}", timeline
+    finally:
+        workspace.cleanup()
@@ -0,0 +1,72 @@
+import os
+import json
+import shutil
+import hashlib
+from config import Config
+from services.disk_cache import DiskCache, file_digest
+
+# Naikkan jika cara render segmen berubah agar entri lama tidak dipakai
+CACHE_VERSION = 3
+
+class SegmentCache(DiskCache):
+    """Cache file segmen video yang sudah di-encode (tanpa audio).
+
+    Kunci = hash isi gambar + efek + jumlah frame + crossfade + resolusi +
+    pengaturan encoder. Render ulang job dengan audio yang diganti (durasi
+    sama) atau satu gambar yang diganti memakai ulang semua segmen lain.
+    Entri dihapus berdasarkan waktu akses terlama jika total ukuran melebihi
+    batas (lihat DiskCache).
+    """
+
+    extension = '.mp4'
+    label = 'Segment cache'
+
+    def __init__(self, cache_folder=None, max_bytes=None):
+        super().__init__(
+            cache_folder or Config.SEGMENT_CACHE_FOLDER,
+            max_bytes if max_bytes is not None else Config.SEGMENT_CACHE_MAX_BYTES
+        )
+
+    def image_hash(self, img_path):
+        return file_digest(img_path).hexdigest()
+
+    def cache_key(self, segments, settings):
+        """Hash semua parameter yang mempengaruhi isi file segmen."""
+        description = {
+            'version': CACHE_VERSION,
+            'segments': [
+                {
+                    'image': self.image_hash(segment['image']),
+                    'frames': segment['frames'],
+                    'effect': segment['effect'],
+                    'fade_in': bool(segment.get('fade_in')),
+                    'fade_out': bool(segment.get('fade_out')),
+                }
+                for segment in segments
+            ],
+            'settings': settings,
+        }
+        return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def fetch(self, key, output_path):
+        """Salin segmen dari cache ke output_path; return True jika ada."""
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return False
+        try:
+            try:
+                os.link(path, output_path)
+            except OSError:
+                shutil.copyfile(path, output_path)
+            self._touch(path)
+            return True
+        except OSError as e:
+            print(f"Warning: Failed to read segment cache entry {path}: {e}")
+            return False
+
+    def store(self, key, segment_path):
+        """Simpan file segmen yang baru dirender ke cache."""
+        try:
+            self._write_entry(key, lambda tmp_path: shutil.copyfile(segment_path, tmp_path))
+        except OSError as e:
+            print(f"Warning: Failed to write segment cache for {segment_path}: {e}")
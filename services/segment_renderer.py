@@ -0,0 +1,339 @@
+import os
+import subprocess
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from moviepy.editor import ColorClip
+from services.ffmpeg_backend import (
+    get_ffmpeg_binary, normalize_filters, crossfade_filters, encoder_args, keyframe_params, segment_start_frames
+)
+from services.timeline_compositor import compose_timeline
+from services.encoder_registry import registry
+from services.segment_cache import SegmentCache
+from services import shared_frames
+from services.workspace import RenderWorkspace
+
+# Pengaturan encoder yang sama untuk semua segmen agar bisa digabung dengan
+# stream copy: GOP tetap, tanpa keyframe tambahan dari deteksi scene
+SEGMENT_PROFILE = ['-profile:v', 'high', '-pix_fmt', 'yuv420p']
+
+def segment_encoder_params(fps):
+    """Parameter ffmpeg tambahan untuk setiap file segmen."""
+    return SEGMENT_PROFILE + [
+        '-g', str(fps * 2),
+        '-keyint_min', str(fps * 2),
+        '-sc_threshold', '0',
+    ]
+
+def group_segments(segments, images_per_segment=1, split_still=False):
+    """Kelompokkan segmen per-gambar menjadi potongan N gambar.
+
+    split_still: setiap segmen diam menjadi kelompok sendiri (fast path
+    render_still_segment); segmen bergerak di antaranya dikelompokkan per N.
+    """
+    images_per_segment = max(1, int(images_per_segment))
+    if not split_still:
+        return [segments[i:i + images_per_segment] for i in range(0, len(segments), images_per_segment)]
+
+    groups = []
+    run = []
+    for segment in segments:
+        if not is_time_invariant([segment]):
+            run.append(segment)
+            continue
+        groups += group_segments(run, images_per_segment)
+        groups.append([segment])
+        run = []
+    return groups + group_segments(run, images_per_segment)
+
+def _segment_clip(segment, fps, size, zoom_quality):
+    """Klip MoviePy satu segmen (klip hitam jika gambar gagal diproses)."""
+    # Import di sini untuk menghindari import melingkar dengan video_service
+    from services.video_service import build_image_clip
+
+    duration = segment['frames'] / fps
+    try:
+        return build_image_clip(segment['image'], duration, segment['effect'], zoom_quality, size=size, fps=fps)
+    except Exception as e:
+        print(f"Error processing image {segment['image']}: {e}")
+        return ColorClip(size=size, color=(0, 0, 0), duration=duration)
+
+def build_segment_clip(segments, fps=30, size=(1280, 720), zoom_quality='balanced'):
+    """Compose sekelompok segmen menjadi satu klip; klip gambar dibuat lazy."""
+    timeline = [
+        {
+            'factory': functools.partial(_segment_clip, segment, fps, size, zoom_quality),
+            'duration': segment['frames'] / fps,
+            'fade_in': segment.get('fade_in', False),
+            'fade_out': segment.get('fade_out', False),
+        }
+        for segment in segments
+    ]
+    return compose_timeline(timeline, size=size)
+
+def render_segment_file(segments, output_path, fps=30, size=(1280, 720), zoom_quality='balanced',
+                        codecs=('libx264',), preset='medium', crf=23, frame_processes=None):
+    """Render sekelompok segmen (tanpa audio) ke satu file video.
+
+    Crossfade MoviePy adalah fade dari/ke hitam di dalam klip itu sendiri,
+    jadi setiap segmen mandiri dan hasil gabungannya identik dengan render
+    satu langkah. frame_processes > 1 menghitung frame segmen secara paralel
+    di beberapa proses (lihat shared_frames).
+    """
+    total_frames = sum(segment['frames'] for segment in segments)
+    # Keyframe di awal setiap gambar dalam kelompok (images_per_segment > 1)
+    keyframes = segment_start_frames(segments)
+    if frame_processes and frame_processes > 1:
+        return shared_frames.render_segments_shared(
+            segments, output_path, fps=fps, size=size, zoom_quality=zoom_quality, codecs=codecs,
+            preset=preset, crf=crf, processes=frame_processes,
+            ffmpeg_params=segment_encoder_params(fps), keyframes=keyframes
+        )
+    encoder_params = segment_encoder_params(fps) + keyframe_params(keyframes, fps)
+
+    video = build_segment_clip(segments, fps, size, zoom_quality)
+
+    # Setengah frame lebih pendek agar jumlah frame tepat = total frame segmen
+    video = video.set_duration((total_frames - 0.5) / fps)
+
+    last_error = None
+    try:
+        for codec in codecs:
+            try:
+                video.write_videofile(
+                    output_path,
+                    codec=codec,
+                    audio=False,
+                    fps=fps,
+                    preset=preset,
+                    ffmpeg_params=encoder_params + ['-crf', str(crf)],
+                    logger=None
+                )
+                return codec
+            except Exception as e:
+                print(f"Segment render with {codec} failed: {e}")
+                last_error = e
+        raise RuntimeError(f"Semua encoder gagal untuk segmen {output_path}: {last_error}")
+    finally:
+        video.close()
+        video.compositor.close()
+
+def is_time_invariant(segments):
+    """True jika isi gambar tidak berubah sepanjang segmen (hanya crossfade)."""
+    return all(segment['effect'] == 'still' for segment in segments)
+
+def render_still_segment(segment, output_path, fps=30, size=(1280, 720),
+                         codecs=('libx264',), preset='medium', crf=23):
+    """Fast path segmen diam: decode & normalisasi gambar sekali, lalu ulangi frame.
+
+    Filter loop mengulang satu frame yang sudah dinormalisasi tanpa decode
+    ulang; encoder hanya menghasilkan skip block untuk frame identik. Hanya
+    jendela crossfade yang benar-benar berubah per frame.
+    """
+    frames = segment['frames']
+    duration = frames / fps
+    filters = normalize_filters(size) + [
+        f"loop=loop={frames - 1}:size=1:start=0",
+        f"setpts=N/{fps}/TB",
+    ] + crossfade_filters(segment, duration) + ["format=yuv420p"]
+
+    last_error = ''
+    for codec in codecs:
+        command = [
+            get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+            '-i', segment['image'],
+            '-vf', ','.join(filters),
+            '-frames:v', str(frames),
+            '-r', str(fps),
+            '-an',
+        ] + encoder_args(codec, preset, crf) + segment_encoder_params(fps) + [output_path]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode == 0:
+            return codec
+        last_error = result.stderr.strip()[-500:]
+        print(f"Still segment render with {codec} failed: {last_error}")
+    raise RuntimeError(f"Semua encoder gagal untuk segmen diam {output_path}: {last_error}")
+
+def render_segment_job(job):
+    """Worker process pool: render satu file segmen; return encoder yang dipakai."""
+    segments = job['segments']
+    if job.pop('still_fast_path', True) and len(segments) == 1 and is_time_invariant(segments):
+        try:
+            return render_still_segment(
+                segments[0], job['output_path'], fps=job['fps'], size=job['size'], codecs=job['codecs'],
+                preset=job['preset'], crf=job['crf']
+            )
+        except Exception as e:
+            print(f"Still fast path failed, using MoviePy for segment: {e}")
+    return render_segment_file(**job)
+
+def concat_segments(segment_paths, audio_path, output_path, audio_duration, list_path, audio_codec='aac'):
+    """Gabungkan segmen dengan concat demuxer (stream copy) dan mux audio sekali.
+
+    audio_codec='copy' untuk audio AAC yang sudah disiapkan (tanpa re-encode);
+    audio_path None menghasilkan video tanpa audio.
+    """
+    with open(list_path, 'w') as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    command = [
+        get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+    ]
+    if audio_path:
+        command += ['-i', audio_path, '-map', '0:v', '-map', '1:a', '-c:v', 'copy', '-c:a', audio_codec]
+    else:
+        command += ['-map', '0:v', '-c:v', 'copy', '-an']
+    command += [
+        '-t', f"{audio_duration:.3f}",
+        '-movflags', '+faststart',
+        output_path
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat gagal: {result.stderr.strip()[-500:]}")
+
+_segment_cache = None
+
+def get_segment_cache():
+    """SegmentCache bersama (dibuat saat pertama dipakai)."""
+    global _segment_cache
+    if _segment_cache is None:
+        _segment_cache = SegmentCache()
+    return _segment_cache
+
+def segment_cache_settings(job):
+    """Pengaturan render job yang ikut menentukan kunci cache segmen."""
+    return {
+        'fps': job['fps'],
+        'size': list(job['size']),
+        'zoom_quality': job['zoom_quality'],
+        'codecs': list(job['codecs']),
+        'preset': job['preset'],
+        'crf': job['crf'],
+        'encoder_params': segment_encoder_params(job['fps']),
+        'still_fast_path': job['still_fast_path'],
+    }
+
+def build_segment_jobs(groups, work_dir, fps=30, size=(1280, 720), zoom_quality='balanced',
+                       codecs=('libx264',), still_fast_path=True, preset='medium', crf=23):
+    """Satu job render per kelompok segmen, output ke work_dir."""
+    jobs = []
+    for index, group in enumerate(groups):
+        jobs.append({
+            'segments': group,
+            'output_path': os.path.join(work_dir, f"segment_{index:04d}.mp4"),
+            'fps': fps,
+            'size': tuple(size),
+            'zoom_quality': zoom_quality,
+            'codecs': tuple(codecs),
+            'still_fast_path': still_fast_path,
+            'preset': preset,
+            'crf': crf,
+        })
+    return jobs
+
+def fetch_cached_segments(jobs):
+    """Salin segmen yang ada di cache; return job yang masih harus dirender."""
+    cache = get_segment_cache()
+    pending_jobs = []
+    for job in jobs:
+        key = cache.cache_key(job['segments'], segment_cache_settings(job))
+        if not cache.fetch(key, job['output_path']):
+            pending_jobs.append(job)
+    return pending_jobs
+
+def render_segment_jobs(jobs, max_workers=None, use_cache=True):
+    """Render job di process pool lalu simpan hasilnya ke cache segmen."""
+    if not jobs:
+        return []
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers > 1 and len(jobs) * 2 <= max_workers:
+        # Segmen lebih sedikit dari core: paralel per frame di dalam setiap segmen
+        print(f"Rendering {len(jobs)} segment(s) frame-parallel with {max_workers} process(es)...")
+        used_codecs = [render_segment_job(dict(job, frame_processes=max_workers)) for job in jobs]
+    else:
+        print(f"Rendering {len(jobs)} segments with {max_workers} worker(s)...")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            used_codecs = list(executor.map(render_segment_job, jobs))
+    print(f"Segments rendered with: {', '.join(sorted(set(used_codecs)))}")
+
+    if use_cache:
+        cache = get_segment_cache()
+        for job, codec in zip(jobs, used_codecs):
+            store_segment(cache, job, codec)
+    return used_codecs
+
+def store_segment(cache, job, codec):
+    """Simpan segmen ke cache hanya jika dibuat encoder utama.
+
+    Segmen dari cache dianggap memakai job['codecs'][0] (lihat unify_segment_encoders).
+    """
+    if codec == job['codecs'][0]:
+        cache.store(cache.cache_key(job['segments'], segment_cache_settings(job)), job['output_path'])
+
+def unify_segment_encoders(jobs, job_codecs, max_workers=None):
+    """Render ulang segmen yang tidak memakai encoder fallback terakhir; return encoder per job.
+
+    Segmen h264_nvenc dan libx264 punya SPS/PPS dan profil berbeda; jika
+    digabung concat demuxer dengan stream copy, banyak player gagal di
+    segmen pertama yang parameternya berubah. Begitu satu segmen jatuh ke
+    encoder berikutnya, semua segmen dirender ulang dengan encoder itu.
+    """
+    used = set(job_codecs)
+    if len(used) <= 1:
+        return list(job_codecs)
+    chain = list(jobs[0]['codecs'])
+    target = max(used, key=chain.index)
+    mismatched = [dict(job, codecs=(target,)) for job, codec in zip(jobs, job_codecs) if codec != target]
+    print(f"Segments used {', '.join(sorted(used))}: re-rendering {len(mismatched)} segment(s) with {target}")
+    render_segment_jobs(mismatched, max_workers, use_cache=False)
+    return [target] * len(jobs)
+
+def render_segments_parallel(segments, audio_path, output_path, audio_duration, use_gpu=False,
+                             fps=30, size=(1280, 720), zoom_quality='balanced',
+                             images_per_segment=1, max_workers=None, still_fast_path=True,
+                             audio_codec='aac', use_cache=True, preset='medium', crf=23, work_dir=None):
+    """Render timeline per segmen secara paralel lalu gabungkan tanpa re-encode.
+
+    Segmen yang sudah ada di cache (gambar, efek, durasi dan pengaturan
+    encoder sama) disalin langsung tanpa dirender ulang. Dengan
+    still_fast_path, segmen diam selalu dirender sendiri lewat fast path. File segmen ditulis
+    di subfolder work_dir (workspace job) atau workspace sendiri.
+    """
+    if not segments:
+        return False, "Tidak ada segmen untuk dirender."
+
+    # Encoder dipilih sebelum render; segmen yang gagal mencoba encoder berikutnya
+    codecs = registry.fallback_chain(use_gpu)
+    groups = group_segments(segments, images_per_segment, split_still=still_fast_path)
+    workspace = RenderWorkspace('segments_', parent=work_dir)
+    work_dir = workspace.path
+
+    try:
+        jobs = build_segment_jobs(groups, work_dir, fps, size, zoom_quality, codecs, still_fast_path, preset, crf)
+
+        pending_jobs = jobs
+        if use_cache:
+            pending_jobs = fetch_cached_segments(jobs)
+            print(f"Segment cache: {len(jobs) - len(pending_jobs)}/{len(jobs)} segments reused")
+        rendered = render_segment_jobs(pending_jobs, max_workers, use_cache)
+        # Segmen dari cache selalu dibuat encoder utama (store_segment)
+        rendered_codecs = {job['output_path']: codec for job, codec in zip(pending_jobs, rendered)}
+        unify_segment_encoders(
+            jobs, [rendered_codecs.get(job['output_path'], codecs[0]) for job in jobs], max_workers
+        )
+        workspace.check()
+
+        print("Joining segments with concat demuxer (stream copy)...")
+        concat_segments(
+            [job['output_path'] for job in jobs], audio_path, output_path,
+            audio_duration, os.path.join(work_dir, 'segments.txt'), audio_codec
+        )
+        return True, f"Video berhasil dibuat dari {len(jobs)} segmen paralel."
+    except Exception as e:
+        print(f"Error in segment-parallel rendering: {e}")
+        return False, f"Render paralel gagal: {str(e)}"
+    finally:
+        workspace.cleanup()
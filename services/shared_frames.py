@@ -0,0 +1,152 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from services.frame_writer import FrameWriter, encode_chunks_resumable
+from services.ffmpeg_backend import keyframe_params
+
+# Slot per proses worker: cukup untuk menutupi variasi waktu per frame
+SLOTS_PER_PROCESS = 3
+
+class SharedFrameRing:
+    """Ring slot frame RGB di multiprocessing.shared_memory.
+
+    Worker menulis frame langsung ke slot; encoder membaca slot sebagai
+    memoryview dan menulisnya ke stdin ffmpeg tanpa salinan atau pickle.
+    """
+
+    def __init__(self, slots, size):
+        width, height = size
+        self.slots = slots
+        self.size = tuple(size)
+        self.frame_bytes = width * height * 3
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * self.frame_bytes)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot):
+        start = slot * self.frame_bytes
+        return self.shm.buf[start:start + self.frame_bytes]
+
+    def close(self):
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # memoryview slot yang masih dipegang traceback; unlink tetap jalan
+        self.shm.unlink()
+
+# State proses worker (diisi oleh _init_worker)
+_worker = {}
+
+def _init_worker(shm_name, slots, size, segments, fps, zoom_quality):
+    # Import di sini untuk menghindari import melingkar dengan segment_renderer
+    from services.segment_renderer import build_segment_clip
+
+    # Worker memakai resource tracker proses induk; unlink tetap dilakukan induk
+    shm = shared_memory.SharedMemory(name=shm_name)
+    width, height = size
+    _worker['shm'] = shm
+    _worker['frames'] = np.ndarray((slots, height, width, 3), dtype=np.uint8, buffer=shm.buf)
+    _worker['clip'] = build_segment_clip(segments, fps, size, zoom_quality)
+    _worker['fps'] = fps
+
+def _worker_ready(_):
+    return os.getpid()
+
+def _render_frame(index, slot):
+    """Hitung frame ke-index langsung ke slot; return slot."""
+    frame = _worker['clip'].get_frame(index / _worker['fps'])
+    np.copyto(_worker['frames'][slot], frame[:, :, :3], casting='unsafe')
+    return slot
+
+def write_frames_shared(writer, segments, frame_count, zoom_quality='balanced', processes=None, first_frame=0):
+    """Encode frame segmen dengan FrameWriter; frame dihitung paralel di beberapa proses.
+
+    Setiap worker membangun timeline segmen sekali (klip lazy) lalu menghitung
+    frame yang diminta ke slot ring shared memory. Frame ke-i memakai slot
+    i % slots; writer baru meminta frame i + slots setelah frame i ditulis.
+    """
+    processes = processes or os.cpu_count() or 1
+    ring = SharedFrameRing(writer.queue_depth, writer.size)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker,
+            initargs=(ring.name, ring.slots, writer.size, segments, writer.fps, zoom_quality)
+        ) as executor:
+            # Semua worker di-fork sebelum ffmpeg dijalankan: worker yang di-fork
+            # sesudahnya ikut memegang pipe stdin ffmpeg sehingga EOF tidak sampai
+            list(executor.map(_worker_ready, range(processes)))
+            submit = lambda index: executor.submit(_render_frame, index, index % ring.slots)
+
+            def frames():
+                for slot in writer.ordered_frames(submit, frame_count, first_frame):
+                    view = ring.view(slot)
+                    try:
+                        yield view
+                    finally:
+                        view.release()
+
+            frame_views = frames()
+            try:
+                return writer.encode(frame_views)
+            finally:
+                # Jika encoder gagal di tengah, lepas slot yang masih dipegang sebelum ring ditutup
+                frame_views.close()
+    finally:
+        ring.close()
+
+def render_segments_shared(segments, output_path, fps=30, size=(1280, 720), zoom_quality='balanced',
+                           codecs=('libx264',), preset='medium', crf=23, processes=None,
+                           audio_path=None, audio_codec='aac', ffmpeg_params=None, keyframes=(), work_dir=None):
+    """Render segmen ke file dengan evaluasi frame paralel; return encoder yang dipakai.
+
+    keyframes: indeks frame yang dipaksa menjadi keyframe. Dengan work_dir dan
+    lebih dari satu encoder, video ditulis sebagai potongan sehingga jika
+    encoder gagal di tengah hanya sisa frame yang diulang (lihat
+    encode_chunks_resumable); tanpa work_dir (mis. output live) render
+    diulang dari awal dengan encoder berikutnya.
+    """
+    processes = processes or os.cpu_count() or 1
+    frame_count = sum(segment['frames'] for segment in segments)
+    queue_depth = processes * SLOTS_PER_PROCESS
+
+    def report(stats):
+        print(f"Shared-memory writer: {stats['frames_written']} frames from {processes} process(es), "
+              f"avg queue {stats['avg_queue_depth']}/{stats['queue_capacity']}, bound by {stats['bound']}")
+
+    if work_dir and len(codecs) > 1:
+        # Import di sini untuk menghindari import melingkar dengan segment_renderer
+        from services.segment_renderer import concat_segments
+
+        def encode_from(codec, first_frame, pattern, chunk_params):
+            writer = FrameWriter(
+                pattern, size, fps=fps, codec=codec, preset=preset, crf=crf,
+                duration=(frame_count - first_frame) / fps, queue_depth=queue_depth,
+                ffmpeg_params=list(ffmpeg_params or []) + chunk_params
+            )
+            report(write_frames_shared(writer, segments, frame_count, zoom_quality, processes, first_frame))
+
+        chunk_paths, used_codecs = encode_chunks_resumable(
+            encode_from, codecs, work_dir, frame_count, fps, keyframes=keyframes, prefix='shared_chunk',
+            preset=preset, crf=crf
+        )
+        concat_segments(chunk_paths, audio_path, output_path, frame_count / fps,
+                        os.path.join(work_dir, 'shared_chunks.txt'), audio_codec)
+        return ' + '.join(used_codecs)
+
+    last_error = None
+    for codec in codecs:
+        writer = FrameWriter(
+            output_path, size, fps=fps, codec=codec, preset=preset, crf=crf,
+            audio_path=audio_path, audio_codec=audio_codec, duration=frame_count / fps,
+            queue_depth=queue_depth, ffmpeg_params=list(ffmpeg_params or []) + keyframe_params(keyframes, fps)
+        )
+        try:
+            report(write_frames_shared(writer, segments, frame_count, zoom_quality, processes))
+            return codec
+        except Exception as e:
+            print(f"Shared-memory render with {codec} failed: {e}")
+            last_error = e
+    raise RuntimeError(f"Semua encoder gagal untuk {output_path}: {last_error}")
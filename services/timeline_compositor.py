@@ -0,0 +1,160 @@
+import gc
+import bisect
+import threading
+from collections import OrderedDict
+import numpy as np
+from moviepy.editor import VideoClip
+
+CROSSFADE_DURATION = 0.5
+
+# Selama encode, memory_budget juga diperiksa setiap sekian frame
+MEMORY_CHECK_FRAMES = 30
+
+class TimelineCompositor:
+    """Compositor timeline ringan pengganti concatenate_videoclips(method="compose").
+
+    CompositeVideoClip mengevaluasi mask dan mem-blit setiap klip di setiap
+    frame. Di sini hanya satu klip yang aktif per waktu: di luar jendela
+    crossfade frame diteruskan apa adanya, dan di dalam jendela crossfade
+    frame dicampur dengan latar hitam (sama dengan hasil compose + crossfade)
+    ke buffer output yang sudah dialokasikan. CPU dan memori per frame tetap
+    sama berapapun jumlah gambarnya.
+
+    Mode lazy: entri boleh berisi 'factory' (callable tanpa argumen) sebagai
+    ganti 'clip'. Klip dibuat tepat sebelum dipakai dan hanya max_live_clips
+    klip terakhir yang disimpan, sehingga memori tidak tumbuh dengan jumlah
+    gambar. memory_budget (MemoryBudget) diperiksa setiap kali klip baru
+    dibuat (boleh melepas klip lazy) dan setiap MEMORY_CHECK_FRAMES frame
+    (tanpa melepas klip, karena thread writer lain mungkin sedang memakainya).
+    """
+
+    def __init__(self, entries, size=(1280, 720), crossfade=CROSSFADE_DURATION, max_live_clips=None,
+                 memory_budget=None):
+        """entries: list dict {'clip' atau 'factory', 'duration', 'fade_in', 'fade_out'} berurutan."""
+        self.size = tuple(size)
+        self.crossfade = crossfade
+        self.entries = list(entries)
+        self.max_live_clips = max(1, max_live_clips or 2)
+        self.memory_budget = memory_budget
+        self.clips_built = 0
+        self._frames_since_check = 0
+        self._live_clips = OrderedDict()
+        self._clips_lock = threading.Lock()
+        self.starts = []
+        total = 0.0
+        for entry in self.entries:
+            self.starts.append(total)
+            total += entry['duration']
+        self.duration = total
+        # Buffer per thread: streaming writer memanggil make_frame dari banyak thread
+        self._buffers = threading.local()
+
+    def _output_buffers(self):
+        buffers = getattr(self._buffers, 'value', None)
+        if buffers is None:
+            width, height = self.size
+            buffers = (
+                np.zeros((height, width, 3), dtype=np.uint8),
+                np.zeros((height, width, 3), dtype=np.float32),
+            )
+            self._buffers.value = buffers
+        return buffers
+
+    def entry_at(self, t):
+        """Indeks entri yang aktif pada waktu t."""
+        index = bisect.bisect_right(self.starts, t) - 1
+        return min(max(index, 0), len(self.entries) - 1)
+
+    def clip_at(self, index):
+        """Klip entri ke-index; dibuat dari factory jika belum ada (mode lazy)."""
+        entry = self.entries[index]
+        if 'clip' in entry:
+            return entry['clip']
+        with self._clips_lock:
+            clip = self._live_clips.get(index)
+            if clip is not None:
+                self._live_clips.move_to_end(index)
+                return clip
+            while len(self._live_clips) >= self.max_live_clips:
+                self._release(self._live_clips.popitem(last=False)[1])
+            if self.memory_budget:
+                self.memory_budget.check(self._release_all)
+            clip = entry['factory']()
+            self._live_clips[index] = clip
+            self.clips_built += 1
+            return clip
+
+    def _release(self, clip):
+        try:
+            clip.close()
+        except Exception:
+            pass
+
+    def _release_all(self):
+        """Lepas semua klip lazy yang masih hidup (dipanggil dengan lock dipegang)."""
+        while self._live_clips:
+            self._release(self._live_clips.popitem(last=False)[1])
+        gc.collect()
+
+    def close(self):
+        with self._clips_lock:
+            self._release_all()
+
+    def fade_alpha(self, entry, local_t):
+        """Opasitas klip (0..1) pada waktu lokal; 1.0 di luar jendela crossfade."""
+        duration = entry['duration']
+        crossfade = min(self.crossfade, duration)
+        alpha = 1.0
+        if entry.get('fade_in') and local_t < crossfade:
+            alpha *= max(local_t, 0.0) / crossfade
+        if entry.get('fade_out') and local_t > duration - crossfade:
+            alpha *= max(duration - local_t, 0.0) / crossfade
+        return alpha
+
+    def make_frame(self, t):
+        if self.memory_budget:
+            # Hitungan antar thread tidak perlu tepat: cukup agar RSS diperiksa berkala
+            self._frames_since_check += 1
+            if self._frames_since_check >= MEMORY_CHECK_FRAMES:
+                self._frames_since_check = 0
+                self.memory_budget.check()
+        index = self.entry_at(t)
+        entry = self.entries[index]
+        local_t = t - self.starts[index]
+        frame = self.clip_at(index).get_frame(local_t)
+        alpha = self.fade_alpha(entry, local_t)
+
+        height, width = frame.shape[:2]
+        full_size = (width, height) == self.size
+        if full_size and alpha >= 1.0:
+            return frame  # pass-through, tanpa salinan
+
+        output, scratch = self._output_buffers()
+        if full_size:
+            np.multiply(frame[:, :, :3], alpha, out=scratch)
+            np.copyto(output, scratch, casting='unsafe')
+            return output
+
+        # Gambar lebih sempit/pendek dari kanvas: tempatkan di tengah latar hitam
+        output.fill(0)
+        x = (self.size[0] - width) // 2
+        y = (self.size[1] - height) // 2
+        region = output[y:y + height, x:x + width]
+        if alpha >= 1.0:
+            region[:] = frame[:, :, :3]
+        else:
+            region_scratch = scratch[y:y + height, x:x + width]
+            np.multiply(frame[:, :, :3], alpha, out=region_scratch)
+            np.copyto(region, region_scratch, casting='unsafe')
+        return output
+
+def compose_timeline(entries, size=(1280, 720), crossfade=CROSSFADE_DURATION, max_live_clips=None,
+                     memory_budget=None):
+    """Buat VideoClip MoviePy dari daftar entri timeline.
+
+    Compositor tersedia sebagai atribut 'compositor' pada klip hasil.
+    """
+    compositor = TimelineCompositor(entries, size, crossfade, max_live_clips, memory_budget)
+    clip = VideoClip(make_frame=compositor.make_frame, duration=compositor.duration)
+    clip.compositor = compositor
+    return clip
@@ -1,155 +1,414 @@
-import subprocess
 import os
-import tempfile
 import random
+import functools
 from moviepy.editor import *
 from moviepy.video.fx import resize, fadein, fadeout
 from moviepy.video.fx.all import crop
-import numpy as np
+from config import Config
+from services.zoom_engine import KenBurnsZoom, DEFAULT_ZOOM_QUALITY
+from services import ffmpeg_backend, segment_renderer, frame_writer, audio_service, encoder_registry, shared_frames, live_render
+from services.image_cache import ImageCache
+from services.timeline_compositor import compose_timeline
+from services.memory_budget import MemoryBudget
+from services.workspace import RenderWorkspace
+from services.render_plan import RenderPlan
+
+DEFAULT_VIDEO_SIZE = (1280, 720)
+
+# Mode preview: resolusi & fps rendah, encoder tercepat, zoom nearest tanpa
+# upscale, satu filtergraph ffmpeg (fallback ke MoviePy jika tidak bisa)
+PREVIEW_RENDER_OPTIONS = {
+    'backend': 'ffmpeg',
+    'size': (640, 360),
+    'fps': 12,
+    'preset': 'ultrafast',
+    'crf': 30,
+}
+PREVIEW_ZOOM_QUALITY = 'fast'
+
+# Laju zoom metode advanced (faktor per detik)
+ADVANCED_ZOOM_PER_SECOND = 0.02
+
+# Cache frame ternormalisasi per ukuran kanvas, dipakai bersama oleh semua jalur render
+_image_caches = {}
+
+def get_image_cache(size=DEFAULT_VIDEO_SIZE):
+    """ImageCache untuk ukuran kanvas tertentu (dibuat sekali per ukuran)."""
+    size = tuple(size)
+    if size not in _image_caches:
+        _image_caches[size] = ImageCache(size=size)
+    return _image_caches[size]
+
+image_cache = get_image_cache(DEFAULT_VIDEO_SIZE)
 
 def get_audio_duration(filepath):
-    """Mendapatkan durasi file audio menggunakan moviepy."""
+    """Mendapatkan durasi file audio dari header (hasil probe di-cache)."""
     try:
-        audio_clip = AudioFileClip(filepath)
-        duration = audio_clip.duration
-        audio_clip.close()
-        return duration
+        return audio_service.get_audio_info(filepath).get('duration')
     except Exception as e:
-        print(f"Error getting audio duration with MoviePy: {e}")
-        # Fallback ke ffprobe
-        command = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', filepath]
-        try:
-            result = subprocess.run(command, capture_output=True, text=True, check=True)
-            return float(result.stdout.strip())
-        except Exception as e2:
-            print(f"Error getting audio duration with ffprobe: {e2}")
-            return None
-
-def create_video_with_effects(image_paths, audio_path, output_path, audio_duration, use_gpu, effects_config):
-    """Membuat video dari gambar dan audio menggunakan MoviePy dengan efek visual."""
+        print(f"Error getting audio duration: {e}")
+        return None
+
+def effect_rng(effects_config, image_index):
+    """Random generator per gambar dari seed job (None = acak seperti biasa).
+
+    Seed digabung dengan indeks gambar, sehingga efek gambar lain tetap sama
+    walaupun satu gambar diganti atau durasi audio berubah.
+    """
+    seed = effects_config.get('seed')
+    if seed is None:
+        return random
+    return random.Random(f"{seed}:{image_index}")
+
+def effect_for_image(effects_config, image_index):
+    """Efek untuk gambar ke-image_index ('still' jika efek dimatikan)."""
+    if not effects_config.get('enabled', False):
+        return 'still'
+    return choose_effect(effects_config, effect_rng(effects_config, image_index))
+
+def preview_settings(effects_config, render_options=None):
+    """Salinan effects_config & render_options untuk render preview."""
+    preview_effects = dict(effects_config, zoom_quality=PREVIEW_ZOOM_QUALITY)
+    preview_options = dict(render_options or {}, **PREVIEW_RENDER_OPTIONS)
+    return preview_effects, preview_options
+
+def plan_segments(image_paths, total_duration, effects_config, fps=30):
+    """Bagi durasi total ke setiap gambar (dalam frame) dan pilih efeknya."""
+    count = len(image_paths)
+    segments = []
+    previous_end = 0
+    for i, img_path in enumerate(image_paths):
+        # Batas frame kumulatif agar total frame = durasi audio tanpa drift
+        frame_end = int(round(total_duration * fps * (i + 1) / count))
+        effect = effect_for_image(effects_config, i)
+        segments.append({
+            'image': img_path,
+            'frames': frame_end - previous_end,
+            'effect': effect,
+            'fade_in': i > 0,
+            'fade_out': i < count - 1
+        })
+        previous_end = frame_end
+    return segments
+
+def build_image_clip(img_path, duration, effect='still', zoom_quality=DEFAULT_ZOOM_QUALITY, fade_in=False, fade_out=False,
+                     size=DEFAULT_VIDEO_SIZE, fps=30):
+    """Buat satu image clip seukuran kanvas lengkap dengan efek dan crossfade."""
+    # Frame sudah di-resize ke tinggi kanvas dan di-crop tengah (dari cache)
+    img_clip = ImageClip(get_image_cache(size).load(img_path), duration=duration)
     
-    if not image_paths:
-        return False, "Tidak ada gambar untuk dibuat video."
+    img_clip = apply_effect(img_clip, effect, zoom_quality, fps)
     
-    # Validasi semua file gambar ada
+    # Add fade transitions
+    if fade_in:
+        img_clip = img_clip.crossfadein(0.5)
+    if fade_out:
+        img_clip = img_clip.crossfadeout(0.5)
+    
+    return img_clip
+
+def _build_timeline_clip(img_path, duration, effect, zoom_quality, size, fps):
+    """Klip satu gambar untuk compositor (crossfade ditangani compositor)."""
+    try:
+        return build_image_clip(img_path, duration, effect, zoom_quality=zoom_quality, size=size, fps=fps)
+    except Exception as e:
+        print(f"Error processing image {img_path}: {e}")
+        # Create a black clip as fallback
+        return ColorClip(size=size, color=(0,0,0), duration=duration)
+
+def existing_images(image_paths):
+    """Gambar yang file-nya ada (yang hilang dilewati dengan peringatan)."""
     valid_images = []
     for img_path in image_paths:
         if os.path.exists(img_path):
             valid_images.append(img_path)
         else:
             print(f"Warning: Image not found: {img_path}")
+    return valid_images
+
+def create_video_with_effects(image_paths, audio_path, output_path, audio_duration, use_gpu, effects_config, render_options=None):
+    """Membuat video dari gambar dan audio menggunakan MoviePy dengan efek visual.
+
+    render_options['backend']:
+    - 'ffmpeg'   : satu filtergraph ffmpeg, kembali ke MoviePy jika tidak bisa
+    - 'segments' : render per segmen paralel di process pool lalu digabung
+                   dengan stream copy (opsi 'images_per_segment', 'workers',
+                   'still_fast_path' untuk segmen diam tanpa MoviePy)
+    - 'moviepy'  : default; jika ada segmen diam (dan 'still_fast_path' tidak
+                   dimatikan) timeline dirender lewat pipeline segmen: segmen
+                   diam dengan fast path, segmen bergerak tetap dengan MoviePy
+    render_options['writer'] = 'stream' mem-pipe frame ke ffmpeg dari beberapa
+    thread producer (opsi 'frame_workers') alih-alih write_videofile;
+    'shared' menghitung frame di beberapa proses ke ring shared memory.
+    render_options['size'] = (lebar, tinggi) kanvas render, default 1280x720;
+    'fps', 'preset' dan 'crf' menimpa pengaturan encode default (30, medium, 23).
+    render_options['lazy_timeline'] membuat klip MoviePy tepat sebelum dipakai
+    (default otomatis untuk >= Config.LAZY_TIMELINE_MIN_IMAGES gambar).
+    """
+    render_options = render_options or {}
+    
+    if not image_paths:
+        return False, "Tidak ada gambar untuk dibuat video."
     
+    # Validasi semua file gambar ada
+    valid_images = existing_images(image_paths)
     if not valid_images:
         return False, "Tidak ada gambar yang valid ditemukan."
     
-    print(f"Creating video with MoviePy: {len(valid_images)} images for {audio_duration:.2f} seconds")
+    plan = build_render_plan(valid_images, audio_path, audio_duration, effects_config, render_options)
+    return render_plan(plan, output_path, use_gpu, render_options)
+
+def build_render_plan(image_paths, audio_path, audio_duration, effects_config, render_options=None):
+    """Tentukan gambar, durasi (frame), efek dan transisi tanpa merender apa pun.
+
+    Durasi audio diambil dari probe header (di-cache) jika tersedia.
+    """
+    render_options = render_options or {}
+    try:
+        audio_info = audio_service.get_audio_info(audio_path)
+    except Exception as e:
+        print(f"Error probing audio, using given duration: {e}")
+        audio_info = {}
+    audio_duration = audio_info.get('duration') or audio_duration
+    fps = render_options.get('fps', 30)
+    return RenderPlan(
+        plan_segments(image_paths, audio_duration, effects_config, fps),
+        audio={'path': audio_path, 'duration': audio_duration, 'codec': audio_info.get('codec')},
+        fps=fps,
+        size=render_options.get('size') or DEFAULT_VIDEO_SIZE,
+        zoom_quality=effects_config.get('zoom_quality', DEFAULT_ZOOM_QUALITY),
+        preset=render_options.get('preset', 'medium'),
+        crf=render_options.get('crf', 23),
+        effects_config=effects_config,
+    )
+
+def render_plan(plan, output_path, use_gpu=False, render_options=None):
+    """Render RenderPlan dengan backend dari render_options (lihat create_video_with_effects).
+
+    Ukuran, fps, preset dan crf diambil dari plan. plan.audio['path'] boleh
+    berupa video (mis. file preview): track audionya dipakai dengan stream
+    copy jika sudah AAC.
+
+    render_options['live_path'] (lihat live_render.start): video ditulis dulu
+    sebagai MP4 terfragmentasi ke path itu agar bisa ditonton selagi dirender,
+    lalu di-remux (stream copy) ke output_path.
+    """
+    render_options = render_options or {}
+    if not plan.segments:
+        return False, "Render plan tidak berisi segmen."
+    
+    # Semua intermediate job di workspace sendiri (bisa tmpfs), dihapus setelah selesai
+    with RenderWorkspace('render_') as workspace:
+        work_dir = workspace.path
+        audio_path = plan.audio.get('path')
+        # Audio disiapkan sekali (stream copy atau satu kali transcode ke AAC)
+        try:
+            prepared_audio = audio_service.prepare_audio(audio_path, work_dir)
+            audio_codec = 'copy'
+        except Exception as e:
+            print(f"Audio preparation failed, encoding original upload during render: {e}")
+            prepared_audio = audio_path
+            audio_codec = 'aac'
+        workspace.check()
+        
+        live_path = render_options.get('live_path')
+        if not live_path:
+            return _render_video(plan, prepared_audio, output_path, use_gpu, render_options, work_dir, audio_codec)
+        
+        success, message = _render_video(plan, prepared_audio, live_path, use_gpu, render_options, work_dir, audio_codec)
+        if success:
+            try:
+                live_render.remux_to_mp4(live_path, output_path, plan.duration)
+            except Exception as e:
+                return False, str(e)
+        return success, message
+
+def _use_still_fast_path(segments, render_options, live):
+    """True jika render default (MoviePy, writer bawaan) sebaiknya lewat pipeline segmen.
+
+    Hanya jika ada segmen diam. Writer 'stream'/'shared' dan output live
+    tetap satu proses ffmpeg untuk seluruh timeline, jadi segmen diam di
+    sana dirender seperti segmen lain.
+    """
+    return (
+        render_options.get('backend', 'moviepy') == 'moviepy'
+        and render_options.get('writer', 'moviepy') == 'moviepy'
+        and not live
+        and render_options.get('still_fast_path', True)
+        and any(segment['effect'] == 'still' for segment in segments)
+    )
+
+def _render_video(plan, audio_path, output_path, use_gpu, render_options, work_dir, audio_codec='copy'):
+    """Render plan ke output_path.
+
+    audio_path adalah audio yang sudah disiapkan prepare_audio; audio_codec
+    'copy' berarti audio hanya di-mux, tidak di-encode ulang.
+    """
+    size = plan.size
+    fps = plan.fps
+    preset = plan.preset
+    crf = plan.crf
+    segments = plan.segments
+    audio_duration = plan.duration
+    zoom_quality = plan.zoom_quality
+    cache = get_image_cache(size)
+    # Output live harus ditulis progresif oleh satu proses ffmpeg (MP4 terfragmentasi)
+    live = bool(render_options.get('live_path'))
+    ffmpeg_params = live_render.fragment_params(fps) if live else None
+    # Keyframe di awal setiap segmen agar render ulang inkremental bisa memotong
+    # segmen yang tidak berubah dari video ini dengan stream copy
+    keyframes = ffmpeg_backend.segment_start_frames(segments)
+    
+    if render_options.get('backend') == 'ffmpeg':
+        success, message = ffmpeg_backend.render_with_ffmpeg(
+            segments, audio_path, output_path, audio_duration, use_gpu, fps=fps, size=size,
+            preset=preset, crf=crf, zoom_quality=zoom_quality,
+            audio_codec=audio_codec, work_dir=work_dir, ffmpeg_params=ffmpeg_params
+        )
+        if success:
+            return True, message
+        print(f"ffmpeg backend not used, falling back to MoviePy: {message}")
+    elif render_options.get('backend') == 'segments' and live:
+        print("Live render: segment backend only writes the output at the end, using streaming writer")
+    elif render_options.get('backend') == 'segments':
+        cache.prefetch(plan.images)
+        success, message = segment_renderer.render_segments_parallel(
+            segments, audio_path, output_path, audio_duration, use_gpu, fps=fps, size=size,
+            preset=preset, crf=crf, zoom_quality=zoom_quality,
+            images_per_segment=render_options.get('images_per_segment', 1),
+            max_workers=render_options.get('workers'),
+            still_fast_path=render_options.get('still_fast_path', True),
+            audio_codec=audio_codec, work_dir=work_dir
+        )
+        if success:
+            return True, message
+        print(f"Segment-parallel render failed, falling back to single-pass MoviePy: {message}")
+    elif _use_still_fast_path(segments, render_options, live):
+        # Segmen diam tanpa MoviePy (gambar didecode sekali lalu diulang oleh filter loop);
+        # rangkaian segmen bergerak di antaranya tetap dirender MoviePy
+        cache.prefetch(plan.images)
+        success, message = segment_renderer.render_segments_parallel(
+            segments, audio_path, output_path, audio_duration, use_gpu, fps=fps, size=size,
+            preset=preset, crf=crf, zoom_quality=zoom_quality, images_per_segment=len(segments),
+            max_workers=render_options.get('workers'), audio_codec=audio_codec, work_dir=work_dir
+        )
+        if success:
+            return True, message
+        print(f"Still-segment fast path failed, falling back to single-pass MoviePy: {message}")
+    
+    if render_options.get('writer') == 'shared':
+        # Frame dihitung paralel di beberapa proses (lepas dari GIL), tanpa salinan ke encoder
+        try:
+            codec = shared_frames.render_segments_shared(
+                segments, output_path, fps=fps, size=size, zoom_quality=zoom_quality,
+                codecs=encoder_registry.registry.fallback_chain(use_gpu), preset=preset, crf=crf,
+                processes=render_options.get('frame_workers'),
+                audio_path=audio_path, audio_codec=audio_codec, ffmpeg_params=ffmpeg_params, keyframes=keyframes,
+                # Output live harus satu file progresif: tanpa potongan yang bisa dilanjutkan
+                work_dir=None if live else work_dir
+            )
+            return True, f"Video berhasil dibuat dengan {codec} (frame paralel)."
+        except Exception as e:
+            print(f"Frame-parallel render failed, falling back to MoviePy: {e}")
+    
+    # Timeline panjang: klip dibuat lazy agar memori tidak tumbuh dengan jumlah gambar
+    lazy = render_options.get('lazy_timeline', len(segments) >= Config.LAZY_TIMELINE_MIN_IMAGES)
+    
+    # Decode & normalisasi semua gambar secara paralel sebelum render
+    cache.prefetch(plan.images, keep_arrays=not lazy)
+    
+    print(f"Creating video with MoviePy: {len(segments)} images for {audio_duration:.2f} seconds"
+          f"{' (lazy timeline)' if lazy else ''}")
     
     try:
-        # Load audio
-        audio_clip = AudioFileClip(audio_path)
-        actual_duration = audio_clip.duration
+        # Durasi dari probe header yang sudah di-cache
+        actual_duration = audio_duration
         print(f"Audio duration: {actual_duration:.2f} seconds")
         
-        # Hitung durasi per gambar agar total video = durasi audio
-        duration_per_image = actual_duration / len(valid_images)
-        print(f"Duration per image: {duration_per_image:.2f} seconds")
+        # Durasi tiap gambar dari plan (dalam frame) agar total video = durasi audio
+        print(f"Duration per image: {audio_duration / len(segments):.2f} seconds")
         
         # Create video clips from images
         video_clips = []
-        
-        for i, img_path in enumerate(valid_images):
-            print(f"Processing image {i+1}/{len(valid_images)}: {os.path.basename(img_path)}")
-            
-            try:
-                # Load image as video clip
-                img_clip = ImageClip(img_path, duration=duration_per_image)
-                
-                # Resize to target resolution (1280x720)
-                img_clip = img_clip.resize(height=720)
-                
-                # Center crop if needed to maintain aspect ratio
-                if img_clip.w > 1280:
-                    img_clip = img_clip.crop(x_center=img_clip.w/2, width=1280)
-                
-                # Apply effects based on configuration
-                if effects_config.get('enabled', False):
-                    img_clip = apply_visual_effects(img_clip, effects_config, i)
-                
-                # Add fade transitions
-                if i > 0:  # Not first clip
-                    img_clip = img_clip.crossfadein(0.5)
-                if i < len(valid_images) - 1:  # Not last clip
-                    img_clip = img_clip.crossfadeout(0.5)
-                
+        timeline = []
+        
+        for i, segment in enumerate(segments):
+            img_path = segment['image']
+            duration = segment['frames'] / fps
+            if lazy:
+                entry = {'factory': functools.partial(
+                    _build_timeline_clip, img_path, duration, segment['effect'], zoom_quality, size, fps
+                )}
+            else:
+                print(f"Processing image {i+1}/{len(segments)}: {os.path.basename(img_path)}")
+                img_clip = _build_timeline_clip(img_path, duration, segment['effect'], zoom_quality, size, fps)
                 video_clips.append(img_clip)
-                
-            except Exception as e:
-                print(f"Error processing image {img_path}: {e}")
-                # Create a black clip as fallback
-                black_clip = ColorClip(size=(1280, 720), color=(0,0,0), duration=duration_per_image)
-                video_clips.append(black_clip)
-        
-        if not video_clips:
+                entry = {'clip': img_clip}
+            
+            entry.update({
+                'duration': duration,
+                'fade_in': segment.get('fade_in', False),
+                'fade_out': segment.get('fade_out', False)
+            })
+            timeline.append(entry)
+        
+        if not timeline:
             return False, "Gagal memproses gambar apa pun."
         
-        print("Concatenating video clips...")
-        # Concatenate all video clips
-        final_video = concatenate_videoclips(video_clips, method="compose")
+        print("Composing timeline...")
+        # Hanya jendela crossfade yang di-blend; frame lain diteruskan langsung
+        final_video = compose_timeline(
+            timeline, size=size, max_live_clips=Config.LAZY_TIMELINE_LIVE_CLIPS,
+            memory_budget=MemoryBudget(Config.RENDER_MEMORY_LIMIT_BYTES) if lazy else None
+        )
+        compositor = final_video.compositor
         
         # Ensure video duration matches audio duration
         if final_video.duration > actual_duration:
             final_video = final_video.subclip(0, actual_duration)
         elif final_video.duration < actual_duration:
             # Extend last frame if needed
-            last_frame = final_video.get_frame(final_video.duration - 0.1)
+            last_frame = final_video.get_frame(final_video.duration - 0.1).copy()
             extension = ImageClip(last_frame, duration=actual_duration - final_video.duration)
             final_video = concatenate_videoclips([final_video, extension])
         
-        # Set audio
-        final_video = final_video.set_audio(audio_clip)
-        
         print(f"Rendering video to: {output_path}")
         print(f"Final video duration: {final_video.duration:.2f} seconds")
         
-        # Render video with appropriate codec
-        codec = 'libx264'
-        if use_gpu:
-            # Try GPU acceleration
-            try:
-                final_video.write_videofile(
-                    output_path,
-                    codec='h264_nvenc',
-                    audio_codec='aac',
-                    temp_audiofile='temp-audio.m4a',
-                    remove_temp=True,
-                    fps=30,
-                    preset='fast',
-                    ffmpeg_params=['-crf', '23']
-                )
-                print("Video rendered successfully with GPU acceleration")
-            except Exception as e:
-                print(f"GPU rendering failed: {e}")
-                print("Falling back to CPU rendering...")
-                codec = 'libx264'
-        
-        if codec == 'libx264':
-            final_video.write_videofile(
-                output_path,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile='temp-audio.m4a',
-                remove_temp=True,
-                fps=30,
-                preset='medium',
-                ffmpeg_params=['-crf', '23']
+        # Encoder dipilih dari registry sebelum render dimulai
+        codecs = encoder_registry.registry.fallback_chain(use_gpu)
+        if len(codecs) > 1 and not live:
+            # Render per potongan: jika GPU gagal di tengah, hanya sisanya yang diulang
+            used_codecs = frame_writer.write_clip_resumable(
+                final_video, output_path, codecs, work_dir, fps=fps, preset=preset, crf=crf,
+                audio_path=audio_path, audio_codec=audio_codec, workers=render_options.get('frame_workers'),
+                keyframes=keyframes
             )
-            print("Video rendered successfully with CPU")
+            print(f"Video rendered successfully with {' + '.join(used_codecs)}")
+        else:
+            # Output live harus satu MP4 progresif, jadi tidak bisa dilanjutkan per potongan:
+            # encoder berikutnya menulis ulang dari frame pertama
+            last_error = None
+            for codec in codecs:
+                try:
+                    _write_final_video(final_video, output_path, audio_path, codec, preset, crf, fps,
+                                       render_options, work_dir, audio_codec, ffmpeg_params, keyframes)
+                    print(f"Video rendered successfully with {codec}")
+                    break
+                except Exception as e:
+                    print(f"Render with {codec} failed: {e}")
+                    last_error = e
+            else:
+                raise last_error
         
         # Clean up
         final_video.close()
-        audio_clip.close()
+        compositor.close()
         for clip in video_clips:
             clip.close()
+        if lazy:
+            print(f"Lazy timeline: {compositor.clips_built} clips built, "
+                  f"peak RSS {compositor.memory_budget.peak_bytes / (1024 * 1024):.0f} MB")
         
         return True, "Video berhasil dibuat dengan MoviePy."
         
@@ -159,10 +418,10 @@ def create_video_with_effects(image_paths, audio_path, output_path, audio_durati
         traceback.print_exc()
         
         # Fallback to simple method
-        return create_simple_moviepy_video(valid_images, audio_path, output_path, audio_duration)
+        return create_simple_moviepy_video(plan.images, audio_path, output_path, audio_duration, work_dir, audio_codec, size)
 
-def apply_visual_effects(clip, effects_config, image_index):
-    """Apply visual effects to image clip based on configuration."""
+def choose_effect(effects_config, rng=random):
+    """Pilih efek untuk satu gambar: 'zoom_in', 'zoom_out', 'fade' atau 'still'."""
     
     # Get effect probabilities
     zoom_in_prob = effects_config.get('zoom_in', 20)
@@ -173,88 +432,94 @@ def apply_visual_effects(clip, effects_config, image_index):
     # Normalize probabilities
     total_prob = zoom_in_prob + zoom_out_prob + still_prob + fade_prob
     if total_prob == 0:
-        return clip
+        return 'still'
     
     # Random selection based on probabilities
-    rand_val = random.randint(1, 100)
+    rand_val = rng.randint(1, 100)
     
     if rand_val <= zoom_in_prob:
-        # Zoom in effect
-        return apply_zoom_in_effect(clip)
+        return 'zoom_in'
     elif rand_val <= zoom_in_prob + zoom_out_prob:
-        # Zoom out effect
-        return apply_zoom_out_effect(clip)
+        return 'zoom_out'
     elif rand_val <= zoom_in_prob + zoom_out_prob + fade_prob:
-        # Fade effect
+        return 'fade'
+    else:
+        return 'still'
+
+def apply_effect(clip, effect, zoom_quality=DEFAULT_ZOOM_QUALITY, fps=30):
+    """Terapkan efek yang sudah dipilih ke image clip (fps = fps render, untuk lintasan zoom)."""
+    if effect == 'zoom_in':
+        return apply_zoom_in_effect(clip, zoom_quality, fps)
+    elif effect == 'zoom_out':
+        return apply_zoom_out_effect(clip, zoom_quality, fps)
+    elif effect == 'fade':
         return apply_fade_effect(clip)
     else:
         # Still image (no effect)
         return clip
 
-def apply_zoom_in_effect(clip):
+def _write_final_video(final_video, output_path, audio_path, codec, preset, crf, fps, render_options, work_dir,
+                       audio_codec='copy', ffmpeg_params=None, keyframes=()):
+    """Encode video final tanpa audio, lalu mux audio yang sudah disiapkan.
+
+    Dengan ffmpeg_params (output live) selalu memakai streaming writer agar
+    file ditulis progresif bersama audionya. keyframes: indeks frame yang
+    dipaksa menjadi keyframe (awal setiap segmen).
+    """
+    keyframe_params = ffmpeg_backend.keyframe_params(keyframes, fps)
+    if render_options.get('writer') == 'stream' or ffmpeg_params:
+        # Frame dihitung paralel dan di-pipe langsung ke ffmpeg
+        return frame_writer.write_clip_streaming(
+            final_video, output_path, fps=fps, codec=codec, preset=preset, crf=crf,
+            audio_path=audio_path, audio_codec=audio_codec, workers=render_options.get('frame_workers'),
+            ffmpeg_params=(ffmpeg_params or []) + keyframe_params
+        )
+    video_only_path = os.path.join(work_dir, 'video_only.mp4')
+    final_video.write_videofile(
+        video_only_path,
+        codec=codec,
+        audio=False,
+        fps=fps,
+        preset=preset,
+        ffmpeg_params=['-crf', str(crf)] + keyframe_params
+    )
+    audio_service.mux_audio(video_only_path, audio_path, output_path, final_video.duration, audio_codec)
+
+def apply_visual_effects(clip, effects_config, image_index):
+    """Apply visual effects to image clip based on configuration."""
+    effect = effect_for_image(effects_config, image_index)
+    zoom_quality = effects_config.get('zoom_quality', DEFAULT_ZOOM_QUALITY)
+    return apply_effect(clip, effect, zoom_quality)
+
+def _zoom_source(clip):
+    """Ambil array sumber untuk engine zoom (sekali per klip)."""
+    if isinstance(clip, ImageClip):
+        return clip.img
+    return clip.get_frame(0)
+
+def _zoom_clip(clip, start_zoom, end_zoom, quality=DEFAULT_ZOOM_QUALITY, fps=30):
+    """Zoom linear dari start_zoom ke end_zoom sepanjang durasi klip.
+
+    fps harus sama dengan fps render: lintasan punya satu crop per frame,
+    jadi fps lain membuat zoom melompat atau berhenti sebelum akhir klip.
+    """
+    engine = KenBurnsZoom(_zoom_source(clip), clip.duration, start_zoom, end_zoom, fps=fps, quality=quality)
+    return clip.fl(lambda get_frame, t: engine.get_frame(t))
+
+def apply_zoom_in_effect(clip, quality=DEFAULT_ZOOM_QUALITY, fps=30):
     """Apply zoom in effect to clip."""
     try:
-        def zoom_in(get_frame, t):
-            frame = get_frame(t)
-            # Calculate zoom factor (1.0 to 1.3 over duration)
-            zoom_factor = 1.0 + (t / clip.duration) * 0.3
-            
-            # Get frame dimensions
-            h, w = frame.shape[:2]
-            
-            # Calculate crop dimensions
-            crop_h = int(h / zoom_factor)
-            crop_w = int(w / zoom_factor)
-            
-            # Calculate crop position (center)
-            start_h = (h - crop_h) // 2
-            start_w = (w - crop_w) // 2
-            
-            # Crop and resize
-            cropped = frame[start_h:start_h+crop_h, start_w:start_w+crop_w]
-            
-            # Resize back to original size
-            from PIL import Image
-            pil_img = Image.fromarray(cropped)
-            resized = pil_img.resize((w, h), Image.LANCZOS)
-            
-            return np.array(resized)
-        
-        return clip.fl(zoom_in, apply_to=['mask'])
+        # Zoom factor 1.0 -> 1.3 sepanjang durasi klip
+        return _zoom_clip(clip, 1.0, 1.3, quality, fps)
     except Exception as e:
         print(f"Error applying zoom in effect: {e}")
         return clip
 
-def apply_zoom_out_effect(clip):
+def apply_zoom_out_effect(clip, quality=DEFAULT_ZOOM_QUALITY, fps=30):
     """Apply zoom out effect to clip."""
     try:
-        def zoom_out(get_frame, t):
-            frame = get_frame(t)
-            # Calculate zoom factor (1.3 to 1.0 over duration)
-            zoom_factor = 1.3 - (t / clip.duration) * 0.3
-            
-            # Get frame dimensions
-            h, w = frame.shape[:2]
-            
-            # Calculate crop dimensions
-            crop_h = int(h / zoom_factor)
-            crop_w = int(w / zoom_factor)
-            
-            # Calculate crop position (center)
-            start_h = (h - crop_h) // 2
-            start_w = (w - crop_w) // 2
-            
-            # Crop and resize
-            cropped = frame[start_h:start_h+crop_h, start_w:start_w+crop_w]
-            
-            # Resize back to original size
-            from PIL import Image
-            pil_img = Image.fromarray(cropped)
-            resized = pil_img.resize((w, h), Image.LANCZOS)
-            
-            return np.array(resized)
-        
-        return clip.fl(zoom_out, apply_to=['mask'])
+        # Zoom factor 1.3 -> 1.0 sepanjang durasi klip
+        return _zoom_clip(clip, 1.3, 1.0, quality, fps)
     except Exception as e:
         print(f"Error applying zoom out effect: {e}")
         return clip
@@ -268,40 +533,30 @@ def apply_fade_effect(clip):
         print(f"Error applying fade effect: {e}")
         return clip
 
-def create_simple_moviepy_video(image_paths, audio_path, output_path, audio_duration):
+def create_simple_moviepy_video(image_paths, audio_path, output_path, audio_duration, work_dir=None, audio_codec='aac',
+                                size=DEFAULT_VIDEO_SIZE):
     """Simple fallback method using MoviePy."""
+    # Dipanggil langsung (tanpa work_dir job): pakai workspace sendiri
+    workspace = None if work_dir else RenderWorkspace('simple_')
     try:
         print("Using simple MoviePy fallback method...")
         
-        # Load audio
-        audio_clip = AudioFileClip(audio_path)
-        
         # Use first image for entire duration
         first_image = image_paths[0]
-        video_clip = ImageClip(first_image, duration=audio_clip.duration)
-        video_clip = video_clip.resize(height=720)
-        
-        # Center crop if needed
-        if video_clip.w > 1280:
-            video_clip = video_clip.crop(x_center=video_clip.w/2, width=1280)
-        
-        # Set audio
-        final_video = video_clip.set_audio(audio_clip)
+        video_clip = ImageClip(get_image_cache(size).load(first_image), duration=audio_duration)
         
-        # Render
-        final_video.write_videofile(
-            output_path,
+        # Render video saja, audio di-mux terpisah (stream copy jika sudah AAC)
+        video_only_path = os.path.join(work_dir or workspace.path, 'simple_video_only.mp4')
+        video_clip.write_videofile(
+            video_only_path,
             codec='libx264',
-            audio_codec='aac',
-            temp_audiofile='temp-audio.m4a',
-            remove_temp=True,
+            audio=False,
             fps=30,
             preset='fast'
         )
+        audio_service.mux_audio(video_only_path, audio_path, output_path, audio_duration, audio_codec)
         
         # Clean up
-        final_video.close()
-        audio_clip.close()
         video_clip.close()
         
         return True, "Video berhasil dibuat dengan metode sederhana MoviePy."
@@ -309,9 +564,25 @@ def create_simple_moviepy_video(image_paths, audio_path, output_path, audio_dura
     except Exception as e:
         print(f"Error in simple MoviePy method: {e}")
         return False, f"Gagal membuat video: {str(e)}"
+    finally:
+        if workspace:
+            workspace.cleanup()
+
+def advanced_zoom_range(effect_type, duration):
+    """Zoom (awal, akhir) metode advanced: 2% per detik, tidak pernah di bawah 1.0.
+
+    Zoom < 1.0 berarti crop lebih besar dari gambar (KenBurnsZoom hanya
+    memotongnya ke 1.0), jadi zoom out berhenti di 1.0 untuk gambar > 10 detik.
+    """
+    change = ADVANCED_ZOOM_PER_SECOND * duration
+    if effect_type == 'zoom_in':
+        return 1.0, 1.0 + change
+    return 1.2, max(1.0, 1.2 - change)
 
 def create_advanced_moviepy_video(image_paths, audio_path, output_path, audio_duration, effects_config):
     """Advanced MoviePy video creation with sophisticated effects."""
+    # Audio sementara MoviePy di workspace job, bukan di direktori kerja proses
+    workspace = RenderWorkspace('advanced_')
     try:
         print("Creating advanced MoviePy video with sophisticated effects...")
         
@@ -322,22 +593,18 @@ def create_advanced_moviepy_video(image_paths, audio_path, output_path, audio_du
         clips = []
         
         for i, img_path in enumerate(image_paths):
+            rng = effect_rng(effects_config, i)
             # Create image clip
-            img_clip = ImageClip(img_path, duration=duration_per_image)
-            img_clip = img_clip.resize(height=720)
-            
-            # Center crop if needed
-            if img_clip.w > 1280:
-                img_clip = img_clip.crop(x_center=img_clip.w/2, width=1280)
+            img_clip = ImageClip(image_cache.load(img_path), duration=duration_per_image)
             
             # Apply random effects
             if effects_config.get('enabled', False):
-                effect_type = random.choice(['zoom_in', 'zoom_out', 'pan_left', 'pan_right', 'still'])
+                effect_type = rng.choice(['zoom_in', 'zoom_out', 'pan_left', 'pan_right', 'still'])
                 
-                if effect_type == 'zoom_in':
-                    img_clip = img_clip.resize(lambda t: 1 + 0.02*t)
-                elif effect_type == 'zoom_out':
-                    img_clip = img_clip.resize(lambda t: 1.2 - 0.02*t)
+                # Zoom lewat KenBurnsZoom (ukuran kanvas tetap); resize() MoviePy
+                # memakai Image.ANTIALIAS yang sudah dihapus di Pillow 10
+                if effect_type in ('zoom_in', 'zoom_out'):
+                    img_clip = _zoom_clip(img_clip, *advanced_zoom_range(effect_type, duration_per_image))
                 elif effect_type == 'pan_left':
                     img_clip = img_clip.set_position(lambda t: (-10*t, 'center'))
                 elif effect_type == 'pan_right':
@@ -358,10 +625,11 @@ def create_advanced_moviepy_video(image_paths, audio_path, output_path, audio_du
             output_path,
             codec='libx264',
             audio_codec='aac',
-            temp_audiofile='temp-audio.m4a',
+            temp_audiofile=workspace.file('temp-audio.m4a'),
             remove_temp=True,
             fps=30,
-            preset='medium'
+            preset='medium',
+            ffmpeg_params=['-movflags', '+faststart']
         )
         
         # Clean up
@@ -375,3 +643,5 @@ def create_advanced_moviepy_video(image_paths, audio_path, output_path, audio_du
     except Exception as e:
         print(f"Error in advanced MoviePy method: {e}")
         return False, f"Gagal membuat video advanced: {str(e)}"
+    finally:
+        workspace.cleanup()
@@ -0,0 +1,157 @@
+import os
+import atexit
+import shutil
+import tempfile
+import threading
+from config import Config
+
+OWNER_FILE = '.owner'
+
+class WorkspaceFullError(RuntimeError):
+    """Isi workspace job melebihi batas SCRATCH_MAX_BYTES."""
+
+class RenderWorkspace:
+    """Folder scratch terisolasi untuk satu job render.
+
+    Semua intermediate job (audio yang disiapkan, file segmen, potongan,
+    filtergraph, audio sementara MoviePy) ditulis di sini, bukan di
+    direktori kerja proses, sehingga beberapa job bisa berjalan bersamaan.
+    Root bisa diarahkan ke tmpfs lewat RENDER_SCRATCH_DIR.
+
+    Workspace dengan parent adalah subfolder workspace lain (mis. segmen di
+    dalam job) dan ikut dihitung dalam kuota parent. Workspace root mencatat
+    PID pemiliknya; folder dari proses yang sudah mati dibersihkan oleh
+    sweep_stale_workspaces() saat startup.
+    """
+
+    def __init__(self, prefix='render_', parent=None, root=None, max_bytes=None):
+        self.parent = parent
+        self.max_bytes = max_bytes if max_bytes is not None else (0 if parent else Config.SCRATCH_MAX_BYTES)
+        self.peak_bytes = 0
+        if parent:
+            self.path = tempfile.mkdtemp(prefix=prefix, dir=parent)
+        else:
+            root = _usable_root(root or Config.SCRATCH_FOLDER, self.max_bytes)
+            self.path = tempfile.mkdtemp(prefix=prefix, dir=root)
+            with open(os.path.join(self.path, OWNER_FILE), 'w') as f:
+                f.write(str(os.getpid()))
+            _register(self)
+
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+    def subdir(self, name):
+        path = os.path.join(self.path, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def usage_bytes(self):
+        total = 0
+        for folder, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                try:
+                    total += os.lstat(os.path.join(folder, filename)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def check(self):
+        """Catat pemakaian saat ini; WorkspaceFullError jika melebihi kuota.
+
+        Untuk workspace dengan parent, yang diperiksa adalah workspace root-nya.
+        """
+        if self.parent:
+            root = _root_of(self.path)
+            return root.check() if root else self.usage_bytes()
+        usage = self.usage_bytes()
+        self.peak_bytes = max(self.peak_bytes, usage)
+        if self.max_bytes and usage > self.max_bytes:
+            raise WorkspaceFullError(
+                f"Workspace {os.path.basename(self.path)} memakai {usage / (1024 * 1024):.1f} MB, "
+                f"melebihi batas {self.max_bytes / (1024 * 1024):.0f} MB"
+            )
+        return usage
+
+    def cleanup(self):
+        if not os.path.isdir(self.path):
+            return
+        if not self.parent:
+            self.peak_bytes = max(self.peak_bytes, self.usage_bytes())
+            print(f"Workspace {os.path.basename(self.path)} cleaned up "
+                  f"(peak {self.peak_bytes / (1024 * 1024):.1f} MB)")
+        shutil.rmtree(self.path, ignore_errors=True)
+        _unregister(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+def _usable_root(root, max_bytes):
+    """Root scratch; kembali ke folder temp sistem jika root tidak cukup ruang."""
+    try:
+        os.makedirs(root, exist_ok=True)
+        if not max_bytes or shutil.disk_usage(root).free >= max_bytes:
+            return root
+        print(f"Warning: Scratch folder {root} has less than {max_bytes / (1024 * 1024):.0f} MB free, "
+              f"using system temp folder")
+    except OSError as e:
+        print(f"Warning: Scratch folder {root} not usable ({e}), using system temp folder")
+    fallback = os.path.join(tempfile.gettempdir(), 'video_scratch')
+    os.makedirs(fallback, exist_ok=True)
+    return fallback
+
+# Workspace root yang masih hidup di proses ini, dibersihkan saat proses keluar
+_active = set()
+_active_lock = threading.Lock()
+
+def _register(workspace):
+    with _active_lock:
+        _active.add(workspace)
+
+def _unregister(workspace):
+    with _active_lock:
+        _active.discard(workspace)
+
+@atexit.register
+def _cleanup_active():
+    for workspace in list(_active):
+        workspace.cleanup()
+
+def _root_of(path):
+    with _active_lock:
+        for workspace in _active:
+            if path.startswith(workspace.path + os.sep):
+                return workspace
+    return None
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def sweep_stale_workspaces(root=None):
+    """Hapus workspace yang ditinggalkan proses yang sudah mati (crash/SIGKILL)."""
+    root = root or Config.SCRATCH_FOLDER
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            with open(os.path.join(path, OWNER_FILE)) as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        if pid != os.getpid() and not _pid_alive(pid):
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    if removed:
+        print(f"Removed {removed} stale render workspace(s) from {root}")
+    return removed
@@ -0,0 +1,123 @@
+import time
+import numpy as np
+from PIL import Image
+
+# Tingkat kualitas resampling yang tersedia untuk efek zoom
+# - fast     : nearest-neighbour, gather indeks murni numpy
+# - balanced : bilinear dengan crop subpixel langsung dari sumber (default)
+# - high     : LANCZOS dengan crop subpixel (kualitas setara metode lama)
+ZOOM_QUALITY_TIERS = ('fast', 'balanced', 'high')
+DEFAULT_ZOOM_QUALITY = 'balanced'
+
+def zoom_trajectory(duration, fps, start_zoom, end_zoom, frame_size):
+    """Hitung lintasan crop (x, y, lebar, tinggi) untuk setiap frame klip.
+
+    Zoom diinterpolasi linear dari start_zoom ke end_zoom (minimal 1.0) dan
+    crop selalu berada di tengah. Nilai float dipertahankan agar zoom halus tanpa
+    'jitter' akibat pembulatan ukuran crop ke piksel.
+    """
+    if min(start_zoom, end_zoom) < 1.0:
+        # Zoom < 1.0 berarti crop lebih besar dari gambar; tidak ada piksel di luar sumber
+        print(f"Warning: Zoom {start_zoom:.2f} -> {end_zoom:.2f} below 1.0, clamping to 1.0")
+        start_zoom, end_zoom = max(start_zoom, 1.0), max(end_zoom, 1.0)
+
+    w, h = frame_size
+    frame_count = max(1, int(round(duration * fps)))
+    progress = np.arange(frame_count, dtype=np.float64) / fps / max(duration, 1e-6)
+    zoom = start_zoom + (end_zoom - start_zoom) * np.clip(progress, 0.0, 1.0)
+
+    crop_w = w / zoom
+    crop_h = h / zoom
+    x0 = (w - crop_w) / 2.0
+    y0 = (h - crop_h) / 2.0
+    return np.stack([x0, y0, crop_w, crop_h], axis=1)
+
+def _nearest_taps(start, length, out_size, src_size):
+    """Indeks sumber nearest-neighbour untuk satu sumbu."""
+    pos = start + (np.arange(out_size, dtype=np.float32) + 0.5) * (length / out_size)
+    return np.clip(pos.astype(np.intp), 0, src_size - 1)
+
+class KenBurnsZoom:
+    """Renderer zoom/pan untuk satu sumber gambar diam.
+
+    Seluruh lintasan crop dihitung sekali di awal dan sumber di-cache sekali
+    (tidak ada konversi numpy -> PIL per frame). Setiap frame di-resample
+    dengan kernel sesuai tingkat kualitas.
+    """
+
+    def __init__(self, source, duration, start_zoom, end_zoom, fps=30, quality=DEFAULT_ZOOM_QUALITY):
+        if quality not in ZOOM_QUALITY_TIERS:
+            print(f"Warning: Unknown zoom quality '{quality}', using '{DEFAULT_ZOOM_QUALITY}'")
+            quality = DEFAULT_ZOOM_QUALITY
+
+        self.source = np.ascontiguousarray(source[:, :, :3], dtype=np.uint8)
+        self.height, self.width = self.source.shape[:2]
+        self.duration = duration
+        self.fps = fps
+        self.quality = quality
+        self.trajectory = zoom_trajectory(duration, fps, start_zoom, end_zoom, (self.width, self.height))
+
+        # Sumber PIL dibuat sekali; resize memakai argumen box sehingga crop
+        # dan resample terjadi dalam satu kernel C tanpa salinan per frame
+        self._source_pil = None
+        if quality != 'fast':
+            self._source_pil = Image.fromarray(self.source)
+        self._resample = Image.LANCZOS if quality == 'high' else Image.BILINEAR
+
+    def frame_index(self, t):
+        """Konversi waktu klip ke indeks frame pada lintasan."""
+        index = int(round(t * self.fps))
+        return min(max(index, 0), len(self.trajectory) - 1)
+
+    def get_frame(self, t):
+        """Frame hasil zoom pada waktu t (detik, relatif terhadap klip)."""
+        x0, y0, crop_w, crop_h = self.trajectory[self.frame_index(t)]
+
+        if self.quality == 'fast':
+            return self._resample_nearest(x0, y0, crop_w, crop_h)
+
+        resized = self._source_pil.resize(
+            (self.width, self.height), self._resample,
+            box=(x0, y0, x0 + crop_w, y0 + crop_h)
+        )
+        return np.asarray(resized)
+
+    def _resample_nearest(self, x0, y0, crop_w, crop_h):
+        ys = _nearest_taps(y0, crop_h, self.height, self.height)
+        xs = _nearest_taps(x0, crop_w, self.width, self.width)
+        return self.source.take(ys, axis=0).take(xs, axis=1)
+
+def legacy_zoom_frame(frame, zoom_factor):
+    """Implementasi lama (crop integer + LANCZOS PIL per frame), untuk pembanding."""
+    h, w = frame.shape[:2]
+    crop_h = int(h / zoom_factor)
+    crop_w = int(w / zoom_factor)
+    start_h = (h - crop_h) // 2
+    start_w = (w - crop_w) // 2
+    cropped = frame[start_h:start_h+crop_h, start_w:start_w+crop_w]
+    pil_img = Image.fromarray(cropped)
+    return np.array(pil_img.resize((w, h), Image.LANCZOS))
+
+def benchmark_zoom(frame_size=(1280, 720), duration=2.0, fps=30):
+    """Ukur frame per detik metode lama vs setiap tingkat kualitas engine."""
+    w, h = frame_size
+    rng = np.random.default_rng(0)
+    source = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+    times = np.arange(int(duration * fps)) / fps
+
+    results = {}
+    start = time.perf_counter()
+    for t in times:
+        legacy_zoom_frame(source, 1.0 + (t / duration) * 0.3)
+    results['legacy'] = len(times) / (time.perf_counter() - start)
+
+    for quality in ZOOM_QUALITY_TIERS:
+        engine = KenBurnsZoom(source, duration, 1.0, 1.3, fps=fps, quality=quality)
+        start = time.perf_counter()
+        for t in times:
+            engine.get_frame(t)
+        results[quality] = len(times) / (time.perf_counter() - start)
+
+    for name, value in results.items():
+        print(f"{name:>9}: {value:7.1f} fps ({value / results['legacy']:.2f}x)")
+    return results
@@ -0,0 +1,41 @@
+import os
+import sys
+import wave
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Cache gambar/segmen dan scratch di folder sementara per test."""
+    monkeypatch.setattr(Config, 'IMAGE_CACHE_FOLDER', str(tmp_path / 'cache' / 'frames'))
+    monkeypatch.setattr(Config, 'SEGMENT_CACHE_FOLDER', str(tmp_path / 'cache' / 'segments'))
+    monkeypatch.setattr(Config, 'SCRATCH_FOLDER', str(tmp_path / 'scratch'))
+    from services import video_service, segment_renderer
+    monkeypatch.setattr(video_service, '_image_caches', {})
+    monkeypatch.setattr(segment_renderer, '_segment_cache', None)
+
+def make_image(path, color, size=(400, 240)):
+    Image.new('RGB', size, color).save(path)
+    return str(path)
+
+def make_silent_wav(path, duration, sample_rate=8000):
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(b'\x00\x00' * int(round(duration * sample_rate)))
+    return str(path)
+
+@pytest.fixture
+def media(tmp_path):
+    """Empat gambar berbeda dan audio hening 3.7 detik."""
+    images = [make_image(tmp_path / f"image_{i}.jpg", (60 * i, 100, 200 - 40 * i)) for i in range(4)]
+    return {
+        'images': images,
+        'audio': make_silent_wav(tmp_path / 'audio.wav', 3.7),
+        'duration': 3.7,
+    }
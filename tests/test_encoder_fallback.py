@@ -0,0 +1,123 @@
+import os
+import re
+import subprocess
+import sys
+import pytest
+from services import video_service, ffmpeg_backend
+
+FPS = 10
+SIZE = (320, 180)
+# Potongan 2 detik = 20 frame: encoder palsu gagal di tengah potongan kedua
+FAIL_AFTER_FRAMES = 25
+
+EFFECTS = {'enabled': True, 'zoom_in': 50, 'zoom_out': 50, 'still': 0, 'fade_transition': 0, 'seed': 3}
+
+# ffmpeg palsu: mengaku punya h264_nvenc (diteruskan ke libx264), lolos probe,
+# tetapi setiap encode h264_nvenc berhenti setelah FAIL_AFTER_FRAMES frame dengan error
+# (kecuali output yang namanya memuat env FAKE_NVENC_OK)
+FAKE_FFMPEG = '''#!{python}
+import os, subprocess, sys
+REAL = {real!r}
+FAIL_AFTER = {fail_after}
+args = sys.argv[1:]
+if '-encoders' in args:
+    result = subprocess.run([REAL] + args, capture_output=True, text=True)
+    sys.stdout.write(result.stdout + ' V....D h264_nvenc           NVIDIA NVENC H.264 encoder (fake)\\n')
+    sys.exit(result.returncode)
+nvenc = 'h264_nvenc' in args
+args = ['libx264' if arg == 'h264_nvenc' else '-crf' if arg == '-cq' else arg for arg in args]
+if not nvenc or args[-1] == '-' or os.environ.get('FAKE_NVENC_OK', '\\0') in args[-1]:
+    sys.exit(subprocess.call([REAL] + args))
+args = args[:-1] + ['-frames:v', str(FAIL_AFTER), args[-1]]
+if '-i' in args and args[args.index('-i') + 1] == '-':
+    width, height = map(int, args[args.index('-s') + 1].split('x'))
+    frame_bytes = width * height * 3
+    process = subprocess.Popen([REAL] + args, stdin=subprocess.PIPE)
+    for _ in range(FAIL_AFTER):
+        process.stdin.write(sys.stdin.buffer.read(frame_bytes))
+    process.stdin.close()
+    process.wait()
+else:
+    subprocess.call([REAL] + args)
+sys.stderr.write('fake nvenc: encoder lost\\n')
+sys.exit(1)
+'''
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    real = ffmpeg_backend.get_ffmpeg_binary()
+    path = tmp_path / 'fake_ffmpeg'
+    path.write_text(FAKE_FFMPEG.format(python=sys.executable, real=real, fail_after=FAIL_AFTER_FRAMES))
+    path.chmod(0o755)
+    monkeypatch.setenv('FFMPEG_BINARY', str(path))
+    return real
+
+def decoded_frames(ffmpeg_binary, video_path):
+    result = subprocess.run(
+        [ffmpeg_binary, '-hide_banner', '-i', video_path, '-map', '0:v', '-f', 'null', '-'],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    return int(re.findall(r'frame=\s*(\d+)', result.stderr)[-1])
+
+@pytest.mark.parametrize('render_options', [{}, {'writer': 'shared', 'frame_workers': 2}, {'backend': 'ffmpeg'}],
+                         ids=['moviepy', 'shared', 'ffmpeg'])
+def test_nvenc_failure_resumes_from_last_complete_chunk(media, tmp_path, capsys, fake_ffmpeg, render_options):
+    render_options = dict(size=SIZE, fps=FPS, preset='ultrafast', **render_options)
+    plan = video_service.build_render_plan(
+        media['images'], media['audio'], media['duration'], EFFECTS, render_options
+    )
+    output_path = str(tmp_path / 'video.mp4')
+
+    success, message = video_service.render_plan(plan, output_path, True, render_options)
+
+    assert success, message
+    output = capsys.readouterr().out
+    assert 'h264_nvenc=ok' in output
+    assert 'Resumed from frame 20 with libx264, kept 20 frames from h264_nvenc' in output
+    assert 'Re-encoded 1 chunk(s) with libx264 so the stream-copy join uses one encoder' in output
+    assert 'falling back' not in output
+    total_frames = sum(segment['frames'] for segment in plan.segments)
+    assert decoded_frames(fake_ffmpeg, output_path) == total_frames
+    assert os.path.getsize(output_path) > 0
+
+def test_live_render_restarts_with_next_encoder(media, tmp_path, capsys, fake_ffmpeg):
+    live_path = str(tmp_path / 'live.mp4')
+    render_options = dict(size=SIZE, fps=FPS, preset='ultrafast', live_path=live_path)
+    plan = video_service.build_render_plan(
+        media['images'], media['audio'], media['duration'], EFFECTS, render_options
+    )
+    output_path = str(tmp_path / 'video.mp4')
+
+    success, message = video_service.render_plan(plan, output_path, True, render_options)
+
+    assert success, message
+    assert message == "Video berhasil dibuat dengan MoviePy."
+    output = capsys.readouterr().out
+    assert 'Render with h264_nvenc failed' in output
+    assert 'Video rendered successfully with libx264' in output
+    total_frames = sum(segment['frames'] for segment in plan.segments)
+    assert decoded_frames(fake_ffmpeg, live_path) == total_frames
+    assert os.path.getsize(output_path) > 0
+
+def test_segments_from_different_encoders_are_rerendered_before_join(media, tmp_path, capsys, monkeypatch,
+                                                                     fake_ffmpeg):
+    # Segmen diam di-encode lewat ffmpeg palsu dengan h264_nvenc yang berhasil; segmen zoom
+    # lewat write_videofile MoviePy yang tidak punya GPU, jadi jatuh ke libx264
+    monkeypatch.setenv('FAKE_NVENC_OK', 'segment_')
+    effects_config = {'enabled': True, 'zoom_in': 50, 'zoom_out': 0, 'still': 50, 'fade_transition': 0, 'seed': 1}
+    render_options = dict(size=SIZE, fps=FPS, preset='ultrafast', backend='segments', workers=1)
+    plan = video_service.build_render_plan(
+        media['images'], media['audio'], media['duration'], effects_config, render_options
+    )
+    stills = sum(1 for segment in plan.segments if segment['effect'] == 'still')
+    assert 0 < stills < len(plan.segments)
+    output_path = str(tmp_path / 'video.mp4')
+
+    success, message = video_service.render_plan(plan, output_path, True, render_options)
+
+    assert success, message
+    output = capsys.readouterr().out
+    assert f"Segments used h264_nvenc, libx264: re-rendering {stills} segment(s) with libx264" in output
+    total_frames = sum(segment['frames'] for segment in plan.segments)
+    assert decoded_frames(fake_ffmpeg, output_path) == total_frames
@@ -0,0 +1,29 @@
+import re
+import subprocess
+from services.pipeline_render import PipelinedRender
+from services import ffmpeg_backend
+
+EFFECTS = {'enabled': True, 'zoom_in': 50, 'zoom_out': 50, 'still': 0, 'fade_transition': 0, 'seed': 3}
+
+def test_finish_fills_images_the_queue_never_reported(media, tmp_path):
+    # Path perkiraan (seperti queue_image_path) berbeda dari path yang benar-benar disimpan
+    predicted = [str(tmp_path / f"predicted_{i}.jpg") for i in range(len(media['images']))]
+    render_options = {'size': (320, 180), 'fps': 10, 'preset': 'ultrafast', 'workers': 1}
+    pipeline = PipelinedRender(predicted, media['audio'], media['duration'], EFFECTS, render_options)
+
+    # Sistem antrian berhenti setelah dua gambar: gambar 2 dan 3 tidak pernah dilaporkan
+    pipeline.image_ready(0, media['images'][0])
+    pipeline.image_ready(1, media['images'][1])
+    output_path = str(tmp_path / 'video.mp4')
+    success, message = pipeline.finish(output_path)
+
+    assert success, message
+    assert [segment['image'] for segment in pipeline.plan.segments] == [
+        media['images'][0], media['images'][1], media['images'][1], media['images'][1]
+    ]
+    result = subprocess.run(
+        [ffmpeg_backend.get_ffmpeg_binary(), '-hide_banner', '-i', output_path, '-map', '0:v', '-f', 'null', '-'],
+        capture_output=True, text=True
+    )
+    frames = int(re.findall(r'frame=\s*(\d+)', result.stderr)[-1])
+    assert frames == sum(segment['frames'] for segment in pipeline.plan.segments)
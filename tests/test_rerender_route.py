@@ -0,0 +1,50 @@
+import io
+import os
+import pytest
+from flask import Flask
+from config import Config
+from routes.main_routes import main_bp
+from services import rerender_service
+from services.file_service import FileService
+
+SESSION = 'abc123'
+
+@pytest.fixture
+def client(tmp_path):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(OUTPUT_FOLDER=str(tmp_path / 'outputs'), IMAGES_FOLDER=str(tmp_path / 'images'))
+    app.register_blueprint(main_bp)
+    os.makedirs(app.config['OUTPUT_FOLDER'])
+
+    # Video final dengan timeline tiga gambar (isi video tidak dibaca oleh validasi)
+    filename = f"video_{SESSION}.mp4"
+    open(os.path.join(app.config['OUTPUT_FOLDER'], filename), 'wb').close()
+    timeline = [{'image': f"image_{i}.jpg", 'frames': 30, 'effect': 'still'} for i in range(3)]
+    FileService(app.config['OUTPUT_FOLDER']).add_file_metadata(filename, {'timeline': timeline})
+    return app.test_client()
+
+def saved_images(tmp_path):
+    folder = tmp_path / 'images' / SESSION
+    return sorted(os.listdir(folder)) if folder.exists() else []
+
+@pytest.mark.parametrize('remove', ['3', '0,1,2', 'x'])
+def test_invalid_removals_are_rejected_before_uploads_are_saved(client, tmp_path, remove):
+    response = client.post(f"/rerender/{SESSION}", data={
+        'remove': remove, 'image_0': (io.BytesIO(b'image'), 'new.jpg')
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 400
+    assert saved_images(tmp_path) == []
+
+def test_failed_rerender_deletes_saved_replacements(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(rerender_service, 'rerender_session',
+                        lambda output_path, timeline, *args, **kwargs: (False, 'encode gagal', timeline))
+
+    response = client.post(f"/rerender/{SESSION}", data={
+        'image_1': (io.BytesIO(b'image'), 'new.jpg')
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 500
+    assert response.get_json()['error'] == 'encode gagal'
+    assert saved_images(tmp_path) == []
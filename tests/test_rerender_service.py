@@ -0,0 +1,49 @@
+import pytest
+from conftest import make_image
+from services import video_service, rerender_service, ffmpeg_backend, audio_service
+
+FPS = 10
+SIZE = (320, 180)
+
+# Hanya zoom: tidak ada segmen diam, jadi backend default tetap satu writer MoviePy
+ZOOM_EFFECTS = {'enabled': True, 'zoom_in': 50, 'zoom_out': 50, 'still': 0, 'fade_transition': 0, 'seed': 3}
+
+def render(media, output_path, **render_options):
+    render_options = dict(size=SIZE, fps=FPS, preset='ultrafast', **render_options)
+    plan = video_service.build_render_plan(
+        media['images'], media['audio'], media['duration'], ZOOM_EFFECTS, render_options
+    )
+    success, message = video_service.render_plan(plan, str(output_path), False, render_options)
+    assert success, message
+    return plan
+
+@pytest.mark.parametrize('render_options', [{}, {'writer': 'stream'}, {'backend': 'ffmpeg'}],
+                         ids=['moviepy', 'stream', 'ffmpeg'])
+def test_output_has_keyframe_at_every_segment_start(media, tmp_path, render_options):
+    output_path = tmp_path / 'video.mp4'
+    plan = render(media, output_path, **render_options)
+
+    keyframes = rerender_service.keyframe_indices(str(output_path), FPS)
+    assert set(ffmpeg_backend.segment_start_frames(plan.segments)) <= set(keyframes)
+
+@pytest.mark.parametrize('render_options', [{}, {'backend': 'ffmpeg'}], ids=['moviepy', 'ffmpeg'])
+def test_rerender_copies_unchanged_segments(media, tmp_path, monkeypatch, render_options):
+    output_path = tmp_path / 'video.mp4'
+    plan = render(media, output_path, **render_options)
+    duration = audio_service.probe_audio(str(output_path))['duration']
+
+    copied = []
+    cut_segment = rerender_service.cut_segment
+    monkeypatch.setattr(rerender_service, 'cut_segment',
+                        lambda *args, **kwargs: copied.append(args[1]) or cut_segment(*args, **kwargs))
+
+    replacement = make_image(tmp_path / 'replacement.jpg', (255, 255, 0))
+    success, message, timeline = rerender_service.rerender_session(
+        str(output_path), plan.segments, {1: replacement}, fps=FPS, size=SIZE, preset='ultrafast'
+    )
+
+    assert success, message
+    assert len(copied) == 3
+    assert '1 segmen dirender ulang' in message
+    assert timeline[1]['image'] == replacement
+    assert audio_service.probe_audio(str(output_path))['duration'] == pytest.approx(duration, abs=0.1)
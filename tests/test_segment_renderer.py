@@ -0,0 +1,56 @@
+import re
+import subprocess
+from services import video_service, segment_renderer, ffmpeg_backend, rerender_service
+
+FPS = 10
+SIZE = (320, 180)
+
+def segment(effect):
+    return {'image': f"{effect}.jpg", 'frames': 10, 'effect': effect}
+
+def test_group_segments_splits_still_segments_out_of_motion_runs():
+    segments = [segment(effect) for effect in ('zoom_in', 'zoom_out', 'still', 'fade', 'zoom_in', 'zoom_out', 'still')]
+
+    groups = segment_renderer.group_segments(segments, images_per_segment=2, split_still=True)
+
+    assert [[item['effect'] for item in group] for group in groups] == [
+        ['zoom_in', 'zoom_out'], ['still'], ['fade', 'zoom_in'], ['zoom_out'], ['still']
+    ]
+    assert segment_renderer.group_segments(segments, images_per_segment=2) == [
+        segments[0:2], segments[2:4], segments[4:6], segments[6:7]
+    ]
+
+def test_default_backend_renders_still_segments_with_fast_path(media, tmp_path, monkeypatch):
+    effects_config = {'enabled': True, 'zoom_in': 50, 'zoom_out': 0, 'still': 50, 'fade_transition': 0, 'seed': 1}
+    render_options = {'size': SIZE, 'fps': FPS, 'preset': 'ultrafast', 'workers': 1}
+    plan = video_service.build_render_plan(
+        media['images'], media['audio'], media['duration'], effects_config, render_options
+    )
+    effects = [item['effect'] for item in plan.segments]
+    assert 'still' in effects and 'zoom_in' in effects
+
+    # Segmen dirender di process pool: catat panggilan ke file, bukan ke list
+    log_path = tmp_path / 'still_renders.txt'
+    render_still_segment = segment_renderer.render_still_segment
+
+    def spy(segment, *args, **kwargs):
+        with open(log_path, 'a') as f:
+            f.write(segment['image'] + '\n')
+        return render_still_segment(segment, *args, **kwargs)
+
+    monkeypatch.setattr(segment_renderer, 'render_still_segment', spy)
+    output_path = str(tmp_path / 'video.mp4')
+
+    success, message = video_service.render_plan(plan, output_path, False, render_options)
+
+    assert success, message
+    assert sorted(log_path.read_text().split()) == sorted(
+        item['image'] for item in plan.segments if item['effect'] == 'still'
+    )
+    result = subprocess.run(
+        [ffmpeg_backend.get_ffmpeg_binary(), '-hide_banner', '-i', output_path, '-map', '0:v', '-f', 'null', '-'],
+        capture_output=True, text=True
+    )
+    assert int(re.findall(r'frame=\s*(\d+)', result.stderr)[-1]) == sum(item['frames'] for item in plan.segments)
+    keyframes = rerender_service.keyframe_indices(output_path, FPS)
+    assert set(ffmpeg_backend.segment_start_frames(plan.segments)) <= set(keyframes)
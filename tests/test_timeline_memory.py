@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from PIL import Image
+from moviepy.editor import ColorClip
+from conftest import make_silent_wav
+from services.memory_budget import MemoryBudget, MemoryLimitExceeded
+from services.timeline_compositor import compose_timeline, MEMORY_CHECK_FRAMES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZE = (640, 360)
+SECONDS_PER_IMAGE = 0.3
+# Puncak RSS 4N gambar boleh naik paling banyak sekian persen dari N gambar
+RSS_TOLERANCE = 15
+
+# Render di proses baru agar puncak RSS (ru_maxrss) hanya milik render ini;
+# folder relatif Config (cache, data) berada di cwd = folder sementara test
+CHILD = '''
+import json, resource, sys
+sys.path.insert(0, {root!r})
+from services import video_service
+images, audio, duration = json.loads(sys.argv[1])
+render_options = {{'size': {size!r}, 'fps': 10, 'preset': 'ultrafast',
+                  'lazy_timeline': True, 'still_fast_path': False}}
+effects = {{'enabled': True, 'zoom_in': 40, 'zoom_out': 30, 'still': 30, 'fade_transition': 30, 'seed': 5}}
+plan = video_service.build_render_plan(images, audio, duration, effects, render_options)
+success, message = video_service.render_plan(plan, 'video.mp4', False, render_options)
+print('RESULT ' + json.dumps({{'success': success, 'message': message,
+                              'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+'''
+
+def render_peak_rss(folder, count):
+    folder.mkdir()
+    rng = np.random.default_rng(count)
+    images = []
+    for i in range(count):
+        # Gambar berbeda (noise) agar cache tidak menggabungkan entri
+        path = str(folder / f"image_{i}.jpg")
+        Image.fromarray(rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8)).save(path)
+        images.append(path)
+    duration = round(count * SECONDS_PER_IMAGE, 3)
+    audio = make_silent_wav(folder / 'audio.wav', duration)
+
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD.format(root=ROOT, size=SIZE), json.dumps([images, audio, duration])],
+        capture_output=True, text=True, cwd=str(folder), timeout=600
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith('RESULT ')]
+    assert lines, result.stderr[-2000:]
+    data = json.loads(lines[-1][len('RESULT '):])
+    assert data['success'], data['message']
+    return data['peak_rss_mb']
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='ru_maxrss dalam KB hanya di Linux')
+def test_lazy_timeline_peak_rss_is_flat_from_n_to_4n_images(tmp_path):
+    small = render_peak_rss(tmp_path / 'small', 6)
+    large = render_peak_rss(tmp_path / 'large', 24)
+
+    growth = (large - small) / small * 100
+    assert growth <= RSS_TOLERANCE, f"peak RSS {small:.0f} -> {large:.0f} MB ({growth:+.1f}%)"
+
+def test_memory_budget_is_checked_while_encoding_frames():
+    clip = ColorClip(size=(64, 36), color=(0, 0, 0), duration=10)
+    budget = MemoryBudget(1)  # 1 byte: setiap pemeriksaan melewati batas
+    video = compose_timeline([{'clip': clip, 'duration': 10}], size=(64, 36), memory_budget=budget)
+
+    # Klip sudah ada (tidak dibuat ulang), jadi hanya pemeriksaan di jalur frame yang bisa gagal
+    with pytest.raises(MemoryLimitExceeded):
+        for index in range(MEMORY_CHECK_FRAMES):
+            video.get_frame(index / 30)
+    assert budget.peak_bytes > 0
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from moviepy.editor import ImageClip
+from services import video_service
+
+@pytest.mark.parametrize('effect_type', ['zoom_in', 'zoom_out'])
+@pytest.mark.parametrize('quality', ['fast', 'balanced', 'high'])
+def test_advanced_zoom_renders_images_longer_than_ten_seconds(effect_type, quality):
+    duration = 15.0
+    start_zoom, end_zoom = video_service.advanced_zoom_range(effect_type, duration)
+    assert min(start_zoom, end_zoom) >= 1.0
+
+    source = np.random.default_rng(0).integers(0, 256, (90, 160, 3), dtype=np.uint8)
+    clip = video_service._zoom_clip(ImageClip(source, duration=duration), start_zoom, end_zoom, quality)
+
+    for t in (0.0, duration / 2, duration):
+        frame = clip.get_frame(t)
+        assert frame.shape == source.shape
+        assert frame.dtype == np.uint8
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from moviepy.editor import ImageClip
+from services import video_service
+from services.zoom_engine import ZOOM_QUALITY_TIERS, KenBurnsZoom, legacy_zoom_frame, zoom_trajectory
+
+WIDTH, HEIGHT = 320, 180
+# Rata-rata selisih absolut per kanal (0-255) terhadap metode lama; crop subpixel
+# engine dan crop integer metode lama berbeda sedikit di tepi detail
+LEGACY_TOLERANCE = 3.0
+
+@pytest.fixture
+def source():
+    """Gambar halus (gradien + gelombang): selisih resampling terukur, bukan noise."""
+    y, x = np.mgrid[0:HEIGHT, 0:WIDTH]
+    return np.stack([
+        128 + 100 * np.sin(x / 23.0),
+        128 + 100 * np.cos(y / 17.0),
+        (x + y) * 255 // (WIDTH + HEIGHT),
+    ], axis=2).astype(np.uint8)
+
+@pytest.mark.parametrize('quality', ZOOM_QUALITY_TIERS)
+def test_every_tier_returns_frames_of_source_shape(source, quality):
+    engine = KenBurnsZoom(source, 2.0, 1.0, 1.3, fps=10, quality=quality)
+
+    for t in (0.0, 0.55, 1.0, 2.0, 5.0):
+        frame = engine.get_frame(t)
+        assert frame.shape == source.shape
+        assert frame.dtype == np.uint8
+
+def test_trajectory_crops_are_centered_from_start_to_end_zoom():
+    fps, duration = 10, 2.0
+    trajectory = zoom_trajectory(duration, fps, 1.0, 1.3, (WIDTH, HEIGHT))
+
+    assert len(trajectory) == 20
+    np.testing.assert_allclose(trajectory[0], [0, 0, WIDTH, HEIGHT])
+    # Frame terakhir ada di t = 1.9 detik: zoom 1.0 + 0.3 * 19/20
+    end_zoom = 1.0 + 0.3 * 19 / 20
+    np.testing.assert_allclose(trajectory[-1][2:], [WIDTH / end_zoom, HEIGHT / end_zoom])
+    np.testing.assert_allclose(trajectory[:, 0] * 2 + trajectory[:, 2], WIDTH)
+    np.testing.assert_allclose(trajectory[:, 1] * 2 + trajectory[:, 3], HEIGHT)
+
+@pytest.mark.parametrize('quality', ZOOM_QUALITY_TIERS)
+def test_first_frame_at_zoom_one_is_the_source(source, quality):
+    engine = KenBurnsZoom(source, 1.0, 1.0, 1.3, fps=10, quality=quality)
+
+    np.testing.assert_array_equal(engine.get_frame(0.0), source)
+
+@pytest.mark.parametrize('quality', ZOOM_QUALITY_TIERS)
+def test_tiers_stay_close_to_legacy_zoom(source, quality):
+    fps, duration = 10, 2.0
+    engine = KenBurnsZoom(source, duration, 1.0, 1.3, fps=fps, quality=quality)
+
+    for index, (_, _, crop_w, _) in enumerate(engine.trajectory):
+        legacy = legacy_zoom_frame(source, WIDTH / crop_w)
+        difference = np.abs(engine.get_frame(index / fps).astype(np.int16) - legacy).mean()
+        assert difference < LEGACY_TOLERANCE, f"frame {index}: {difference:.2f}"
+
+@pytest.mark.parametrize('quality', ZOOM_QUALITY_TIERS)
+def test_zoom_below_one_is_clamped_to_full_frame(source, quality, capsys):
+    engine = KenBurnsZoom(source, 1.0, 1.0, 0.8, fps=10, quality=quality)
+
+    assert 'below 1.0' in capsys.readouterr().out
+    np.testing.assert_allclose(engine.trajectory, [[0, 0, WIDTH, HEIGHT]] * 10)
+    np.testing.assert_array_equal(engine.get_frame(1.0), source)
+
+def test_zoom_clip_follows_render_fps(source):
+    # Preview 12 fps: setiap frame memakai crop ke-n dari lintasan 12 fps, bukan 30 fps
+    fps = 12
+    clip = video_service._zoom_clip(ImageClip(source, duration=1.0), 1.0, 1.3, 'fast', fps=fps)
+    expected = KenBurnsZoom(source, 1.0, 1.0, 1.3, fps=fps, quality='fast')
+    at_30_fps = KenBurnsZoom(source, 1.0, 1.0, 1.3, fps=30, quality='fast')
+
+    for index in range(fps):
+        np.testing.assert_array_equal(clip.get_frame(index / fps), expected.get_frame(index / fps))
+    assert not np.array_equal(clip.get_frame(11 / fps), at_30_fps.get_frame(11 / fps))